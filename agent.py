@@ -0,0 +1,316 @@
+# agent.py
+# Inti pipeline tanya-jawab tanpa Streamlit: dipakai UI (main.py), mode batch (batch_qa.py), dan benchmark
+
+import os
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.documents import Document
+
+from retriever import FaissRetriever
+from semantic_cache import SemanticCache
+from clients import get_chat_model
+from context_builder import CONTEXT_TOKEN_BUDGET, DOCUMENT_CONTEXT_SHARE, build_context
+from faq_index import FAQ_ANSWER_LANGUAGE, FaqMatch
+from tools.google_tools import get_google_search_results
+from tools.translate_tools import get_translation_service
+import tracing
+
+if TYPE_CHECKING:
+    # Hanya untuk anotasi: stack splitter LangChain baru dimuat saat PDF pertama diunggah
+    from document_index import DocumentIndex
+
+PDF_TOP_K = 4
+FAQ_TOP_K = 3
+
+# Batas waktu per tahap (detik) agar p95 tidak menjadi jumlah semua tahap
+EMBED_TIMEOUT = 8.0
+SEARCH_TIMEOUT = 3.0
+WEB_SEARCH_TIMEOUT = 10.0
+FAQ_TRANSLATE_TIMEOUT = 2.0  # hanya untuk index FAQ lama tanpa terjemahan dari build
+
+# Ditampilkan (callback_handler), dikembalikan, dan disimpan ke riwayat jika stream Gemini kosong
+EMPTY_ANSWER = "Maaf, saya tidak mendapat respon yang valid."
+
+# Executor khusus (bukan default executor): asyncio.run() tidak ikut menunggu thread yang
+# sudah ditinggalkan karena timeout, misalnya pencarian Google yang macet
+_stage_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="agent-stage")
+
+_answer_cache: Optional[SemanticCache] = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache() -> SemanticCache:
+    # Satu cache untuk seluruh proses, dipakai bersama oleh semua sesi (UI maupun batch)
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticCache()
+        return _answer_cache
+
+def get_context_key(pdf_hash: Optional[str] = None, include_faq: bool = False) -> str:
+    if not pdf_hash:
+        return "database"
+    return f"pdf:{pdf_hash}+database" if include_faq else f"pdf:{pdf_hash}"
+
+def stream_answer(llm: BaseChatModel, prompt: str, callbacks: List[BaseCallbackHandler]) -> str:
+    """Panggil Gemini dalam mode streaming; token diteruskan ke callback, jawaban dirakit dari stream"""
+    parts = []
+    with tracing.span("llm_generate", prompt_chars=len(prompt)) as llm_span:
+        start = time.perf_counter()
+        for chunk in llm.stream(prompt, config={"callbacks": callbacks}):
+            if not parts:
+                llm_span["attributes"]["time_to_first_token"] = time.perf_counter() - start
+            parts.append(str(chunk.content))
+            # Gemini mengirim jumlah token (usage_metadata) di chunk streaming
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage:
+                llm_span["attributes"].update(
+                    input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens")
+                )
+        llm_span["attributes"]["stream_chunks"] = len(parts)
+        llm_span["attributes"]["handler_tokens"] = sum(getattr(cb, "token_count", 0) for cb in callbacks)
+        answer = "".join(parts)
+        if not answer.strip():
+            llm_span["attributes"]["empty_response"] = True
+            return EMPTY_ANSWER
+    return answer
+
+def _resolve_api_key(api_key: Optional[str]) -> str:
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("API key Gemini belum diisi (parameter api_key atau GEMINI_API_KEY)")
+    return api_key
+
+def _history_section(conversation_context: str) -> str:
+    # Riwayat percakapan sudah dibatasi token oleh TokenBudgetMemory
+    return f"""
+            --- RIWAYAT PERCAKAPAN ---
+            {conversation_context}
+            --- AKHIR RIWAYAT ---
+""" if conversation_context.strip() else ""
+
+def build_document_prompt(user_input: str, doc_chunks: List[Document], faq_docs: List[Document],
+                          conversation_context: str = "") -> str:
+    # Hanya kalimat relevan dari chunk dokumen, bukan seluruh isi PDF; FAQ memakai sisa anggaran
+    document_budget = int(CONTEXT_TOKEN_BUDGET * DOCUMENT_CONTEXT_SHARE) if faq_docs else CONTEXT_TOKEN_BUDGET
+    pdf = build_context(user_input, doc_chunks, document_budget)
+    pdf_context = pdf.text
+    faq_context = build_context(user_input, faq_docs, CONTEXT_TOKEN_BUDGET - pdf.tokens).text if faq_docs else ""
+    faq_section = f"""
+            --- DATABASE ---
+            {faq_context}
+            --- AKHIR DATABASE ---
+""" if faq_context.strip() else ""
+
+    return f"""
+            Kamu adalah asisten kesehatan mental. Berdasarkan kutipan dokumen berikut, jawab pertanyaan pengguna:
+
+            --- DOKUMEN ---
+            {pdf_context}
+            --- AKHIR DOKUMEN ---
+{faq_section}{_history_section(conversation_context)}
+            Pertanyaan: {user_input}
+            """
+
+def build_database_prompt(user_input: str, faq_docs: List[Document], conversation_context: str = "") -> str:
+    context = build_context(user_input, faq_docs).text
+    return f"""
+            Kamu adalah asisten kesehatan mental. Berdasarkan data berikut, jawab pertanyaan pengguna:
+
+            --- DATABASE ---
+            {context}
+            --- AKHIR DATABASE ---
+{_history_section(conversation_context)}
+            Pertanyaan: {user_input}
+            """
+
+def format_faq_answer(match: FaqMatch, target_language: Optional[str] = None) -> Tuple[str, bool]:
+    """Jawaban kurasi FAQ dalam FAQ_ANSWER_LANGUAGE + apakah bahasanya sudah sesuai. Terjemahan diambil dari
+    index FAQ (dibuat saat build); tanpa itu API terjemahan dipanggil berbatas waktu, lalu teks asli dipakai"""
+    answer, question = match.answer, match.question
+    target_language = FAQ_ANSWER_LANGUAGE if target_language is None else target_language
+    localized = True
+    if target_language in match.translations:
+        answer, question = match.translations[target_language]
+    elif target_language:
+        future = _stage_executor.submit(tracing.wrap_context(get_translation_service().try_translate_batch),
+                                        [answer, question], target_language)
+        try:
+            translated_answer, translated_question = future.result(timeout=FAQ_TRANSLATE_TIMEOUT)
+        except FutureTimeoutError:
+            # Terjemahan tetap selesai di latar belakang dan masuk cache disk untuk pertanyaan berikutnya
+            print(f"⏱️ Terjemahan FAQ melewati batas {FAQ_TRANSLATE_TIMEOUT} detik, memakai teks asli")
+            translated_answer = translated_question = None
+        localized = translated_answer is not None
+        answer = translated_answer if localized else answer
+        question = translated_question if translated_question is not None else question
+    return f"{answer}\n\n*Sumber: FAQ — \"{question}\"*", localized
+
+@dataclass
+class RetrievalResult:
+    query_embedding: Optional[List[float]] = None
+    doc_chunks: List[Document] = field(default_factory=list)
+    faq_docs: List[Document] = field(default_factory=list)
+    cached_answer: Optional[str] = None
+    fallback_answer: Optional[str] = None
+    faq_match: Optional[FaqMatch] = None
+    degraded: bool = False  # embedding/pencarian gagal atau timeout: jawaban tidak boleh di-cache
+
+async def _run_stage(func, *args, timeout: float, default=None):
+    """Jalankan fungsi blocking di thread dengan batas waktu; timeout/error -> default"""
+    try:
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(_stage_executor, tracing.wrap_context(func), *args), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        print(f"⏱️ Tahap {getattr(func, '__name__', func)} melewati batas {timeout} detik")
+    except Exception as e:
+        print(f"❌ Error pada tahap {getattr(func, '__name__', func)}: {str(e)}")
+    return default
+
+def _web_search(query: str):
+    return _run_stage(get_google_search_results, query, timeout=WEB_SEARCH_TIMEOUT)
+
+async def retrieve_context_async(user_input: str, retriever: FaissRetriever, doc_index: Optional["DocumentIndex"],
+                                 include_faq: bool, context_key: str, use_cache: bool = True) -> RetrievalResult:
+    """Embedding + pencarian berbatas waktu. Pencarian web (kuota Google & rate limiter) hanya dipakai
+    jika retrieval gagal: thread yang sudah mulai tidak bisa dibatalkan, jadi tidak ada pencarian spekulatif."""
+    answer_cache = get_answer_cache()
+    result = RetrievalResult()
+    web_task = None
+
+    try:
+        result.query_embedding = await _run_stage(retriever.embed_query, user_input, timeout=EMBED_TIMEOUT)
+
+        if use_cache and result.query_embedding is not None:
+            result.cached_answer = answer_cache.get_similar(result.query_embedding, context_key)
+            if result.cached_answer is not None:
+                return result
+
+        # Jalur cepat: query yang hampir sama dengan pertanyaan FAQ dijawab dari jawaban kurasi
+        if doc_index is None and result.query_embedding is not None:
+            result.faq_match = retriever.match_faq(result.query_embedding)
+            if result.faq_match is not None:
+                return result
+
+        # Tanpa embedding (API lambat/mati) dokumen PDF tidak bisa dicari, tetapi FAQ masih
+        # bisa dijawab lewat jalur cepat BM25 lokal di dalam hybrid_search
+        search_faq = doc_index is None or include_faq
+        if doc_index is None and result.query_embedding is None:
+            # Retrieval sudah gagal sebagian: pencarian web dimulai bersamaan dengan BM25
+            web_task = asyncio.create_task(_web_search(user_input))
+        doc_search = (_run_stage(doc_index.search_by_vector, result.query_embedding, PDF_TOP_K,
+                                 timeout=SEARCH_TIMEOUT)
+                      if doc_index and result.query_embedding is not None else asyncio.sleep(0, result=[]))
+        faq_search = (_run_stage(retriever.hybrid_search, user_input, FAQ_TOP_K, result.query_embedding,
+                                 timeout=SEARCH_TIMEOUT)
+                      if search_faq else asyncio.sleep(0, result=[]))
+        doc_chunks, faq_docs = await asyncio.gather(doc_search, faq_search)
+        # None = tahap pencarian timeout/error (bukan sekadar tidak ada hasil)
+        result.degraded = result.query_embedding is None or doc_chunks is None or faq_docs is None
+        result.doc_chunks, result.faq_docs = doc_chunks or [], faq_docs or []
+
+        has_context = any(doc.page_content.strip() for doc in result.doc_chunks + result.faq_docs)
+        if doc_index is None and not has_context:
+            result.fallback_answer = await (web_task or _web_search(user_input))
+        return result
+    finally:
+        if web_task is not None and not web_task.done():
+            web_task.cancel()
+
+def run_agent(user_input: str, retriever: FaissRetriever, doc_index: Optional["DocumentIndex"] = None,
+              include_faq: bool = False, callback_handler: Optional[BaseCallbackHandler] = None,
+              llm: Optional[BaseChatModel] = None, conversation_context: str = "",
+              api_key: Optional[str] = None, notify: Optional[Callable[[str], None]] = None) -> str:
+    """Satu giliran chat, dicatat sebagai satu trace (timeline per tahap).
+    Tanpa Streamlit: api_key (atau GEMINI_API_KEY) untuk LLM, notify untuk pesan status ke UI."""
+    with tracing.start_trace("chat_turn", query_chars=len(user_input), has_document=doc_index is not None):
+        answer = _run_agent(user_input, retriever, doc_index, include_faq, callback_handler, llm,
+                            conversation_context, api_key, notify)
+        tracing.set_attributes(answer_chars=len(answer))
+        return answer
+
+def _run_agent(user_input: str, retriever: FaissRetriever, doc_index: Optional["DocumentIndex"],
+               include_faq: bool, callback_handler: Optional[BaseCallbackHandler],
+               llm: Optional[BaseChatModel], conversation_context: str = "",
+               api_key: Optional[str] = None, notify: Optional[Callable[[str], None]] = None) -> str:
+    answer_cache = get_answer_cache()
+    context_key = get_context_key(doc_index.content_hash if doc_index else None, include_faq)
+    # Cache jawaban dipakai bersama semua sesi, jadi hanya berisi jawaban tanpa riwayat: jawaban yang
+    # dibangun dari riwayat bisa memuat cerita pribadi pengguna dan tidak disimpan. Giliran lanjutan tetap
+    # boleh membaca (entri tidak memuat riwayat siapa pun), agar pertanyaan yang berdiri sendiri tetap hit.
+    store_answer = not conversation_context.strip()
+
+    # 1. Exact-match pada query ternormalisasi (tanpa embedding, tanpa LLM)
+    cached_answer = answer_cache.get_exact(user_input, context_key)
+    if cached_answer is not None:
+        tracing.increment("answer_cache", result="exact_hit")
+        tracing.set_attributes(route="cache_exact")
+        return cached_answer
+
+    # 2. Embedding, cache semantik, pencarian FAISS dan fallback web secara asinkron
+    retrieval = asyncio.run(retrieve_context_async(user_input, retriever, doc_index, include_faq, context_key))
+    query_embedding = retrieval.query_embedding
+    if retrieval.cached_answer is not None:
+        tracing.increment("answer_cache", result="semantic_hit")
+        tracing.set_attributes(route="cache_semantic")
+        # Tidak di-put ulang: entri baru akan memulai TTL dari awal sehingga jawaban lama tidak pernah kedaluwarsa
+        return retrieval.cached_answer
+    tracing.increment("answer_cache", result="miss")
+
+    if retrieval.faq_match is not None:
+        tracing.set_attributes(route="faq_direct", faq_score=round(retrieval.faq_match.score, 3))
+        answer, localized = format_faq_answer(retrieval.faq_match)
+        # Jawaban kurasi FAQ tidak bergantung riwayat, aman dipakai sesi lain; teks asli (terjemahan
+        # terlambat/gagal) tidak di-cache agar pertanyaan berikutnya mendapat versi terjemahan
+        if localized:
+            answer_cache.put(user_input, query_embedding, context_key, answer)
+        return answer
+
+    # Client Gemini dipakai ulang lintas request; hanya callback yang baru per request
+    callbacks = [callback_handler] if callback_handler is not None else []
+    notify = notify or print
+
+    # Jawaban dari retrieval yang gagal sebagian (mis. hanya BM25 tanpa embedding) tidak disimpan
+    # selama TTL; pertanyaan yang sama berikutnya dicoba lagi dengan retrieval lengkap
+    cache_answer = store_answer and not retrieval.degraded
+    if retrieval.degraded:
+        tracing.set_attributes(degraded=True)
+
+    try:
+        if doc_index:
+            if not retrieval.doc_chunks:
+                # Index dokumen selalu mengembalikan top-k; kosong berarti embedding/pencarian gagal
+                tracing.set_attributes(route="document_unavailable")
+                return "Maaf, dokumen Anda tidak bisa dicari saat ini. Silakan coba lagi sebentar lagi."
+            prompt = build_document_prompt(user_input, retrieval.doc_chunks, retrieval.faq_docs, conversation_context)
+            tracing.set_attributes(route="llm_document")
+            answer = stream_answer(llm or get_chat_model(_resolve_api_key(api_key)), prompt, callbacks=callbacks)
+            if cache_answer and answer != EMPTY_ANSWER:
+                answer_cache.put(user_input, query_embedding, context_key, answer)
+            return answer
+
+        if any(doc.page_content.strip() for doc in retrieval.faq_docs):
+            prompt = build_database_prompt(user_input, retrieval.faq_docs, conversation_context)
+            tracing.set_attributes(route="llm_database")
+            answer = stream_answer(llm or get_chat_model(_resolve_api_key(api_key)), prompt, callbacks=callbacks)
+            if cache_answer and answer != EMPTY_ANSWER:
+                answer_cache.put(user_input, query_embedding, context_key, answer)
+            return answer
+
+        tracing.set_attributes(route="web_fallback")
+        notify("🔍 Jawaban tidak ditemukan di database. Mencoba mencari dari internet...")
+        if retrieval.fallback_answer is not None:
+            return retrieval.fallback_answer
+        return "Maaf, pencarian internet sedang lambat atau tidak tersedia. Silakan coba lagi sebentar lagi."
+
+    except Exception as e:
+        tracing.set_attributes(route="error", error=str(e))
+        return f"❌ Terjadi kesalahan: {str(e)}"
@@ -0,0 +1,197 @@
+# batch_qa.py
+# Mode tanya-jawab massal tanpa UI (evaluasi malam hari / pra-generasi jawaban FAQ):
+# embedding query per batch, pencarian FAISS sebagai satu query matriks, panggilan LLM paralel
+# di bawah batas konkurensi & rate limit, hasil ditulis bertahap ke JSONL dan bisa dilanjutkan.
+# Rute sama dengan agent (UI): jawaban FAQ langsung tanpa LLM, lalu pencarian di semua shard
+# (MultiIndexRetriever). Sengaja tidak ada fallback web dan cache jawaban: hasil batch untuk evaluasi.
+#
+# Contoh:
+#   python batch_qa.py data/Mental_Health_FAQ.csv --column Questions --output data/batch_answers.jsonl
+#   python batch_qa.py pertanyaan.jsonl --concurrency 8 --rate 4
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import pandas as pd
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+
+import tracing
+from agent import FAQ_TOP_K, build_database_prompt, format_faq_answer
+from clients import get_chat_model
+from faq_index import FaqMatch
+from multi_index import MultiIndexRetriever
+from retriever import FaissRetriever
+from tools.translate_tools import RateLimiter
+
+DEFAULT_OUTPUT = "data/batch_answers.jsonl"
+QUERY_BATCH_SIZE = 64
+LLM_CONCURRENCY = 4
+LLM_RATE_PER_SECOND = 2.0
+MAX_RETRIES = 4
+BASE_DELAY = 2.0
+QUESTION_COLUMNS = ("question", "Questions", "Question", "pertanyaan")
+
+
+def question_id(question: str) -> str:
+    return hashlib.sha256(question.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def load_questions(path: str, column: Optional[str] = None) -> List[Tuple[str, str]]:
+    """[(id, pertanyaan), ...] dari CSV atau JSONL ({"id"?, "question"}); id default = hash pertanyaan"""
+    if path.endswith((".jsonl", ".ndjson")):
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+    else:
+        rows = pd.read_csv(path).fillna("").to_dict("records")
+
+    questions, seen = [], set()
+    for row in rows:
+        key = column or next((c for c in QUESTION_COLUMNS if c in row), None)
+        if key is None:
+            raise ValueError(f"❌ Kolom pertanyaan tidak ditemukan (coba --column); kolom tersedia: {list(row)}")
+        question = str(row.get(key, "")).strip()
+        if not question:
+            continue
+        qid = str(row.get("id") or question_id(question))
+        if qid not in seen:
+            seen.add(qid)
+            questions.append((qid, question))
+    return questions
+
+
+def load_done_ids(output_path: str) -> Set[str]:
+    """Id yang sudah punya jawaban di file output (untuk resume); baris rusak terakhir diabaikan"""
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("answer") is not None or record.get("route") == "no_context":
+                done.add(record["id"])
+    return done
+
+
+def _invoke_with_backoff(llm: BaseChatModel, prompt: str, rate_limiter: RateLimiter) -> str:
+    for attempt in range(MAX_RETRIES):
+        rate_limiter.acquire()
+        try:
+            with tracing.span("llm_generate", prompt_chars=len(prompt)):
+                return str(llm.invoke(prompt).content)
+        except Exception as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            delay = BASE_DELAY * (2 ** attempt) + random.uniform(0, 1)
+            print(f"⏳ Panggilan LLM gagal ({str(e)}), mencoba lagi dalam {delay:.1f} detik...")
+            time.sleep(delay)
+
+
+def _answer_one(qid: str, question: str, docs: List[Document], llm: BaseChatModel,
+                rate_limiter: RateLimiter, faq_match: Optional[FaqMatch] = None) -> Dict:
+    start = time.perf_counter()
+    record = {"id": qid, "question": question, "answer": None, "route": "llm_database", "error": None,
+              "sources": [doc.id or doc.metadata.get("chunk_id") for doc in docs]}
+    if faq_match is not None:
+        # Sama seperti agent: pertanyaan yang cocok dengan FAQ dijawab dengan jawaban kurasi, tanpa LLM
+        record["route"], record["sources"] = "faq_direct", [f"faq:{faq_match.question_id}"]
+        record["answer"], _ = format_faq_answer(faq_match)
+    elif not any(doc.page_content.strip() for doc in docs):
+        # Mode batch tidak memakai fallback web: jawaban dari internet tidak cocok untuk evaluasi
+        record["route"] = "no_context"
+    else:
+        try:
+            record["answer"] = _invoke_with_backoff(llm, build_database_prompt(question, docs), rate_limiter)
+        except Exception as e:
+            record["route"], record["error"] = "error", str(e)
+    record["latency_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(input_path: str, output_path: str = DEFAULT_OUTPUT, column: Optional[str] = None,
+              retriever: Optional[Union[MultiIndexRetriever, FaissRetriever]] = None,
+              llm: Optional[BaseChatModel] = None, batch_size: int = QUERY_BATCH_SIZE,
+              concurrency: int = LLM_CONCURRENCY,
+              rate_per_second: float = LLM_RATE_PER_SECOND, resume: bool = True, k: int = FAQ_TOP_K) -> Dict:
+    load_dotenv()
+    questions = load_questions(input_path, column)
+    done = load_done_ids(output_path) if resume else set()
+    pending = [(qid, q) for qid, q in questions if qid not in done]
+    print(f"🔄 {len(pending)} pertanyaan diproses ({len(questions) - len(pending)} sudah terjawab sebelumnya)")
+    counts = {"total": len(questions), "processed": 0, "answered": 0, "faq_direct": 0,
+              "no_context": 0, "errors": 0}
+    if not pending:
+        return counts
+
+    # Shard yang sama dengan UI (FAQ + pedoman + layanan bantuan); shard yang belum dibangun dilewati
+    retriever = retriever or MultiIndexRetriever()
+    if llm is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("❌ GEMINI_API_KEY tidak ditemukan di .env")
+        llm = get_chat_model(api_key)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    rate_limiter = RateLimiter(rate_per_second, burst=concurrency)
+    write_lock = threading.Lock()
+    start = time.perf_counter()
+
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-llm") as executor:
+        for batch_start in range(0, len(pending), batch_size):
+            batch = pending[batch_start:batch_start + batch_size]
+            texts = [q for _, q in batch]
+            with tracing.start_trace("batch_qa", questions=len(batch)):
+                # Satu panggilan embed & satu query matriks FAISS untuk seluruh batch
+                embeddings = retriever.embed_queries(texts)
+                results = retriever.hybrid_search_batch(texts, embeddings, k=k)
+                faq_matches = [retriever.match_faq(embedding) for embedding in embeddings]
+
+            futures = [executor.submit(_answer_one, qid, q, docs, llm, rate_limiter, faq_match)
+                       for (qid, q), docs, faq_match in zip(batch, results, faq_matches)]
+            for future in as_completed(futures):
+                record = future.result()
+                with write_lock:
+                    # Ditulis & di-flush per jawaban, jadi proses yang terhenti bisa dilanjutkan
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                counts["processed"] += 1
+                counts["answered"] += int(record["answer"] is not None)
+                counts["faq_direct"] += int(record["route"] == "faq_direct")
+                counts["no_context"] += int(record["route"] == "no_context")
+                counts["errors"] += int(record["route"] == "error")
+            print(f"✅ {counts['processed']}/{len(pending)} pertanyaan selesai")
+
+    counts["wall_seconds"] = round(time.perf_counter() - start, 2)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jawab banyak pertanyaan sekaligus dari file CSV/JSONL")
+    parser.add_argument("input", help="File CSV atau JSONL berisi pertanyaan")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="File JSONL hasil (ditambahkan bertahap)")
+    parser.add_argument("--column", help="Nama kolom/field pertanyaan (default: deteksi otomatis)")
+    parser.add_argument("--batch-size", type=int, default=QUERY_BATCH_SIZE, help="Pertanyaan per batch embedding")
+    parser.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="Panggilan LLM paralel maksimum")
+    parser.add_argument("--rate", type=float, default=LLM_RATE_PER_SECOND, help="Panggilan LLM per detik")
+    parser.add_argument("--top-k", type=int, default=FAQ_TOP_K)
+    parser.add_argument("--no-resume", action="store_true", help="Tulis ulang output dari awal")
+    args = parser.parse_args()
+    summary = run_batch(args.input, args.output, column=args.column, batch_size=args.batch_size,
+                        concurrency=args.concurrency, rate_per_second=args.rate,
+                        resume=not args.no_resume, k=args.top_k)
+    print(json.dumps(summary, indent=2))
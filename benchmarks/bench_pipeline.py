@@ -0,0 +1,227 @@
+# benchmarks/bench_pipeline.py
+# Benchmark & load test offline untuk pipeline chat (agent.run_agent, FaissRetriever.search, ekstraksi PDF)
+#
+# Contoh:
+#   python -m benchmarks.bench_pipeline --users 8 --queries 200 --llm-latency 0.3
+#   python -m benchmarks.bench_pipeline --pdf laporan.pdf --json hasil.json
+#   python -m benchmarks.bench_pipeline --history   # tiap user membawa riwayat percakapan (giliran lanjutan)
+
+import os
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from langchain_community.vectorstores import FAISS
+
+import agent
+import tracing
+from conversation_memory import TokenBudgetMemory
+from create_index import CSV_PATH, load_chunks, save_index
+from embedding_cache import CachedEmbeddings
+from faq_index import FaqAnswerIndex, load_faq_rows
+from mental_health_processor import MentalHealthDocumentProcessor
+from retriever import FaissRetriever
+from benchmarks.stubs import StubChatModel, StubEmbeddings
+from tools.google_tools import FakeSearchProvider, set_search_provider
+
+
+class StageTimer:
+    """Kumpulkan durasi per tahap dari banyak thread sekaligus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        timed.__name__ = getattr(func, "__name__", stage)
+        return timed
+
+    def wrap_stream(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            first = True
+            for chunk in func(*args, **kwargs):
+                if first:
+                    self.record(f"{stage}.first_token", time.perf_counter() - start)
+                    first = False
+                yield chunk
+            self.record(stage, time.perf_counter() - start)
+        return timed
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+    }
+
+
+def build_query_corpus(csv_path: str, n_queries: int, seed: int = 42) -> List[str]:
+    """Pertanyaan FAQ + variasi hampir-duplikat (huruf kecil, tanpa tanda baca, awalan)"""
+    questions = [q for q in pd.read_csv(csv_path).fillna("")["Questions"].tolist() if q.strip()]
+    rng = random.Random(seed)
+    variants = [
+        lambda q: q,
+        lambda q: q.lower().rstrip("?"),
+        lambda q: f"tolong jelaskan: {q}",
+    ]
+    return [rng.choice(variants)(rng.choice(questions)) for _ in range(n_queries)]
+
+
+def build_stub_retriever(embeddings, workdir: str) -> FaissRetriever:
+    chunks = load_chunks(CSV_PATH)
+    vectorstore = FAISS.from_documents(chunks, embeddings, ids=[c.metadata["chunk_id"] for c in chunks])
+    index_dir = os.path.join(workdir, "faiss_index")
+    save_index(vectorstore, index_dir)
+
+    # Index jawaban FAQ dengan embedding stub yang sama, agar jalur jawaban langsung ikut terukur
+    faq_dir = os.path.join(workdir, "faq_index")
+    rows = load_faq_rows(CSV_PATH)
+    FaqAnswerIndex.build(rows, embeddings.embed_queries([q for _, q, _ in rows])).save(faq_dir)
+    return FaissRetriever(index_path=index_dir, embeddings=embeddings, faq_index_path=faq_dir)
+
+
+def bench_chat(args, timer: StageTimer) -> Dict:
+    stub_embeddings = StubEmbeddings(latency=args.embed_latency, batch_latency=args.embed_latency)
+    embeddings = CachedEmbeddings(stub_embeddings, namespace="stub", cache_path=None)
+    llm = StubChatModel(first_token_latency=args.llm_latency, token_latency=args.token_latency)
+    llm.stream = timer.wrap_stream("llm", llm.stream)
+    search_provider = FakeSearchProvider(latency=args.web_latency)
+    search_provider.search = timer.wrap("web_search", search_provider.search)
+    search_service = set_search_provider(search_provider)
+    agent.FAQ_ANSWER_LANGUAGE = ""  # tanpa terjemahan (butuh jaringan)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        retriever = build_stub_retriever(embeddings, workdir)
+        retriever.embed_query = timer.wrap("embed_query", retriever.embed_query)
+        retriever.hybrid_search = timer.wrap("faq_search", retriever.hybrid_search)
+
+        answer_cache = agent.get_answer_cache()
+        answer_cache.invalidate()
+        if args.no_answer_cache:
+            answer_cache.max_entries = 0
+
+        queries = build_query_corpus(CSV_PATH, args.queries)
+        per_user = [queries[i::args.users] for i in range(args.users)]
+
+        def simulated_user(user_queries: List[str]) -> None:
+            # --history: seperti UI, giliran setelah yang pertama membawa konteks percakapan
+            memory = TokenBudgetMemory(f"bench-{id(user_queries)}", persist=False) if args.history else None
+            for query in user_queries:
+                start = time.perf_counter()
+                answer = agent.run_agent(query, retriever, llm=llm,
+                                         conversation_context=memory.get_prompt_context() if memory else "")
+                timer.record("run_agent", time.perf_counter() - start)
+                if memory:
+                    memory.add_turn("user", query)
+                    memory.add_turn("assistant", answer)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as executor:
+            list(executor.map(simulated_user, per_user))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            "users": args.users,
+            "history": args.history,
+            "queries": len(queries),
+            "wall_seconds": elapsed,
+            "throughput_qps": len(queries) / elapsed if elapsed else 0.0,
+            "python_peak_mb": peak / (1024 * 1024),
+            "answer_cache": answer_cache.get_stats(),
+            "embedding_cache": embeddings.get_stats(),
+            "web_search": search_service.get_stats(),
+        }
+
+
+def bench_pdf(args, timer: StageTimer) -> Dict:
+    processor = MentalHealthDocumentProcessor()
+    pages = 0
+    for _ in range(args.pdf_runs):
+        with open(args.pdf, "rb") as f:
+            start = time.perf_counter()
+            result = processor.extract_text_from_pdf(f)
+            timer.record("pdf_extract", time.perf_counter() - start)
+        pages = result.get("pages_read", 0)
+    return {"pdf": args.pdf, "pages": pages, "runs": args.pdf_runs}
+
+
+def print_report(report: Dict) -> None:
+    print("\n=== Ringkasan ===")
+    for key, value in report["summary"].items():
+        print(f"{key:<18} {value}")
+    print("\n=== Latensi per tahap (ms) ===")
+    print(f"{'tahap':<18} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<18} {stats['count']:>6} {stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline chatbot (backend stub lokal)")
+    parser.add_argument("--users", type=int, default=4, help="Jumlah user simulasi yang berjalan bersamaan")
+    parser.add_argument("--queries", type=int, default=100, help="Total query yang diputar ulang")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Latensi stub embedding (detik)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Latensi token pertama stub LLM (detik)")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Latensi per token stub LLM (detik)")
+    parser.add_argument("--web-latency", type=float, default=0.5, help="Latensi stub pencarian web (detik)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Matikan cache jawaban semantik")
+    parser.add_argument("--history", action="store_true",
+                        help="Simulasikan percakapan: giliran lanjutan membawa riwayat (jawaban tidak di-cache)")
+    parser.add_argument("--pdf", help="File PDF untuk benchmark ekstraksi")
+    parser.add_argument("--pdf-runs", type=int, default=3)
+    parser.add_argument("--skip-chat", action="store_true", help="Hanya jalankan benchmark PDF")
+    parser.add_argument("--json", help="Simpan laporan lengkap ke file JSON")
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    summary = {}
+    if not args.skip_chat:
+        summary.update(bench_chat(args, timer))
+    if args.pdf:
+        summary.update(bench_pdf(args, timer))
+    summary["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    report = {
+        "summary": summary,
+        "stages": {stage: percentiles(values) for stage, values in sorted(timer.durations.items())},
+        "tracing": tracing.get_metrics(),
+    }
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Laporan disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main_cli()
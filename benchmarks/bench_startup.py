@@ -0,0 +1,137 @@
+# benchmarks/bench_startup.py
+# Benchmark import-time & cold start: tiap modul diimpor di proses Python baru (python -X importtime),
+# lalu waktu memuat FaissRetriever dari index di disk diukur terpisah
+#
+# Contoh:
+#   python -m benchmarks.bench_startup --runs 5
+#   python -m benchmarks.bench_startup --top 15 --json startup.json
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modul yang menentukan waktu run pertama Streamlit, plus fitur yang seharusnya dimuat belakangan
+MODULES = (
+    "main",
+    "agent",
+    "retriever",
+    "clients",
+    "mental_health_processor",
+    "document_index",
+    "tools.google_tools",
+    "tools.translate_tools",
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+COLD_START_SNIPPET = """
+import time
+start = time.perf_counter()
+from benchmarks.stubs import StubEmbeddings
+from retriever import FaissRetriever
+imported = time.perf_counter()
+retriever = FaissRetriever(index_path={index_path!r}, embeddings=StubEmbeddings())
+retriever.warm_up()
+loaded = time.perf_counter()
+print(imported - start, loaded - imported)
+"""
+
+
+def _run_python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True)
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """(detik kumulatif modul, [(nama, self_detik, kumulatif_detik), ...]) dari satu proses baru"""
+    proc = _run_python(["-X", "importtime", "-c", f"import {module}"])
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import gagal")
+    entries = []
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        entries.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6))
+        if name == module:
+            total = int(cumulative_us) / 1e6
+    return total, entries
+
+
+def measure_cold_start(index_path: str) -> Tuple[float, float]:
+    proc = _run_python(["-c", COLD_START_SNIPPET.format(index_path=index_path)])
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "cold start gagal")
+    imported, loaded = proc.stdout.strip().splitlines()[-1].split()
+    return float(imported), float(loaded)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    arr = np.asarray(values) * 1000
+    return {"runs": len(values), "median_ms": float(np.median(arr)), "min_ms": float(arr.min()),
+            "max_ms": float(arr.max())}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark waktu import & cold start aplikasi")
+    parser.add_argument("--runs", type=int, default=3, help="Pengulangan per modul (proses baru tiap kali)")
+    parser.add_argument("--modules", nargs="*", default=list(MODULES))
+    parser.add_argument("--index", default="data/faiss_index", help="Index untuk mengukur muat retriever")
+    parser.add_argument("--top", type=int, default=10, help="Tampilkan N import termahal saat 'import main'")
+    parser.add_argument("--json", help="Simpan laporan lengkap ke file JSON")
+    args = parser.parse_args()
+
+    report = {"imports": {}, "slowest_main_imports": [], "cold_start": {}}
+    print(f"{'modul':<28} {'median':>9} {'min':>9} {'max':>9}  (ms, {args.runs} proses)")
+    for module in args.modules:
+        try:
+            runs = [measure_import(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:<28} ❌ {str(e)}")
+            report["imports"][module] = {"error": str(e)}
+            continue
+        stats = summarize([total for total, _ in runs])
+        report["imports"][module] = stats
+        print(f"{module:<28} {stats['median_ms']:>9.1f} {stats['min_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+        if module == "main":
+            # Import langsung (bukan transitif) termahal dari run terakhir
+            slowest = sorted(runs[-1][1], key=lambda entry: entry[1], reverse=True)[:args.top]
+            report["slowest_main_imports"] = [
+                {"module": name, "self_ms": self_s * 1000, "cumulative_ms": cumulative * 1000}
+                for name, self_s, cumulative in slowest
+            ]
+
+    if report["slowest_main_imports"]:
+        print(f"\n=== {args.top} import termahal (self time) saat 'import main' ===")
+        for entry in report["slowest_main_imports"]:
+            print(f"{entry['module']:<40} {entry['self_ms']:>9.1f} ms")
+
+    if os.path.exists(os.path.join(ROOT, args.index)):
+        try:
+            runs = [measure_cold_start(args.index) for _ in range(args.runs)]
+            report["cold_start"] = {
+                "import": summarize([imported for imported, _ in runs]),
+                "retriever_load": summarize([loaded for _, loaded in runs]),
+            }
+            print(f"\nCold start retriever: import {report['cold_start']['import']['median_ms']:.1f} ms, "
+                  f"muat index {report['cold_start']['retriever_load']['median_ms']:.1f} ms (median)")
+        except RuntimeError as e:
+            print(f"\n❌ Cold start retriever gagal: {str(e)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Laporan disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main_cli()
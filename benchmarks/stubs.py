@@ -0,0 +1,72 @@
+# benchmarks/stubs.py
+# Backend lokal (tanpa jaringan) untuk benchmark: embedding deterministik & LLM kalengan
+# (pencarian web palsu: tools.google_tools.FakeSearchProvider)
+
+import re
+import time
+import hashlib
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class StubEmbeddings(Embeddings):
+    """Vektor bag-of-words ter-hash: query yang mirip menghasilkan vektor yang mirip,
+    sehingga cache semantik dan threshold retriever tetap berperilaku realistis"""
+
+    def __init__(self, dim: int = 1024, latency: float = 0.0, batch_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency              # detik per panggilan embed_query
+        self.batch_latency = batch_latency  # detik per panggilan embed_documents
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] % 2 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.batch_latency:
+            time.sleep(self.batch_latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._vector(text)
+
+
+@dataclass
+class StubChunk:
+    content: str
+
+
+class StubChatModel:
+    """Pengganti ChatGoogleGenerativeAI: jawaban kalengan dengan latensi yang bisa diatur"""
+
+    def __init__(self, first_token_latency: float = 0.3, token_latency: float = 0.01,
+                 answer: str = "Ini adalah jawaban simulasi dari asisten kesehatan mental. " * 8):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.tokens = answer.split(" ")
+
+    def stream(self, prompt: str, config=None, **kwargs) -> Iterator[StubChunk]:
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(self.tokens):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield StubChunk(token + " ")
+
+    def invoke(self, prompt: str, config=None, **kwargs) -> StubChunk:
+        return StubChunk("".join(chunk.content for chunk in self.stream(prompt, config)))
+
@@ -0,0 +1,106 @@
+# bm25_index.py
+# Index kata kunci lokal (BM25) untuk istilah persis seperti "DSM-5", nama obat, nomor hotline
+
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BM25_FILE = "bm25.json"
+
+# Token boleh mengandung '-' / '.' di tengah agar "DSM-5" atau "119.1" tetap utuh
+TOKEN_PATTERN = re.compile(r"\w+(?:[-.]\w+)*")
+STOPWORDS = frozenset("""
+    apa itu yang dan di ke dari untuk dengan pada adalah ini ada tidak bisa saya kamu anda
+    bagaimana cara kenapa mengapa apakah atau juga akan dalam oleh sebagai saat jika
+    the a an and or of to in is are was be it this that for on with as what how why
+    do does can i you my your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+@dataclass
+class CorpusStats:
+    """Statistik korpus (jumlah dokumen, panjang rata-rata, document frequency per term).
+    Beberapa index yang memakai statistik gabungan yang sama menghasilkan skor yang bisa dibandingkan."""
+    n_docs: int
+    avg_length: float
+    doc_freqs: Dict[str, int]
+
+    @classmethod
+    def combine(cls, indexes: List["BM25Index"], terms: Iterable[str]) -> "CorpusStats":
+        terms = set(terms)
+        n_docs = sum(len(index.doc_ids) for index in indexes)
+        total_length = sum(index.total_length for index in indexes)
+        return cls(
+            n_docs=n_docs,
+            avg_length=total_length / n_docs if n_docs else 0.0,
+            doc_freqs={term: sum(len(index.postings.get(term, ())) for index in indexes) for term in terms},
+        )
+
+
+class BM25Index:
+    """BM25 Okapi sederhana; disimpan sebagai JSON (bukan pickle)"""
+
+    def __init__(self, doc_ids: List[str], doc_lengths: List[int],
+                 postings: Dict[str, List[List[int]]], k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.postings = postings  # term -> [[indeks_dokumen, frekuensi], ...]
+        self.k1 = k1
+        self.b = b
+        self.total_length = sum(doc_lengths)
+        self.avg_length = self.total_length / len(doc_lengths) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, documents: List[Tuple[str, str]], **kwargs) -> "BM25Index":
+        """documents: [(doc_id, teks), ...] dengan doc_id sama seperti di vector store"""
+        doc_ids, doc_lengths = [], []
+        postings: Dict[str, List[List[int]]] = defaultdict(list)
+        for doc_index, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                postings[term].append([doc_index, freq])
+        return cls(doc_ids, doc_lengths, dict(postings), **kwargs)
+
+    def search(self, query: str, k: int = 10, min_score: float = 0.0,
+               stats: Optional[CorpusStats] = None) -> List[Tuple[str, float]]:
+        """stats: statistik korpus gabungan (lihat CorpusStats.combine); default statistik index ini"""
+        if not self.doc_ids:
+            return []
+        n_docs = stats.n_docs if stats else len(self.doc_ids)
+        avg_length = stats.avg_length if stats else self.avg_length
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            doc_freq = stats.doc_freqs.get(term, len(postings)) if stats else len(postings)
+            idf = math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            for doc_index, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / avg_length)
+                scores[doc_index] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[i], score) for i, score in ranked if score >= min_score]
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1, "b": self.b,
+                "doc_ids": self.doc_ids, "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["doc_ids"], data["doc_lengths"], data["postings"], k1=data["k1"], b=data["b"])
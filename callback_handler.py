@@ -2,65 +2,74 @@
 import time
 from typing import Any, Dict, List
 import streamlit as st
-from langchain.callbacks.base import BaseCallbackHandler
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent import EMPTY_ANSWER
 
 class GeminiCallbackHandler(BaseCallbackHandler):
-    def __init__(self, max_update_rate: float = 0.3):
+    def __init__(self, max_update_rate: float = 0.1):
         self.response = ""
-        self.last_update = time.time()
+        self.last_update = 0.0
         self.last_token_time = time.time()
         self.container = st.empty()
         self.max_update_rate = max_update_rate
         self.token_count = 0
-        
-    def on_llm_start(self, serialized: Dict[str, Any], 
+        self.rendered = False
+        self.start_time = None
+        self.first_token_time = None
+
+    def on_llm_start(self, serialized: Dict[str, Any],
                     prompts: List[str], **kwargs: Any) -> None:
         """Sederhanakan animasi loading"""
+        self.start_time = time.time()
         with self.container:
             st.markdown("⚠️ <i>Mempersiapkan respon...</i>", unsafe_allow_html=True)
 
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        """Optimasi update rate dengan dynamic delay"""
+        """Tampilkan token secara bertahap, dibatasi agar tidak re-render di setiap token"""
+        current_time = time.time()
+        if self.first_token_time is None:
+            self.first_token_time = current_time
         self.response += token
         self.token_count += 1
-        
-        current_time = time.time()
+        self.last_token_time = current_time
+
         elapsed = current_time - self.last_update
-        
-        # Dynamic update rate berdasarkan panjang token
-        dynamic_delay = max(
-            self.max_update_rate, 
-            0.5 - min(self.token_count * 0.01, 0.4)  # Lebih cepat saat token banyak
-        )
-        
-        if elapsed >= dynamic_delay:
+
+        # Dynamic update rate berdasarkan panjang respon: teks panjang lebih mahal dirender ulang
+        dynamic_delay = max(self.max_update_rate, min(len(self.response) / 20000, 0.5))
+
+        # Token pertama langsung ditampilkan (time-to-first-token = latensi yang dirasakan user)
+        if self.token_count == 1 or elapsed >= dynamic_delay:
             self._update_display(False)
             self.last_update = current_time
-            self.last_token_time = current_time
 
     def on_llm_end(self, response, **kwargs: Any) -> None:
         """Handle response kosong"""
         if not self.response.strip():
-            self.response = "Maaf, saya tidak mendapat respon yang valid."
+            # Mode non-streaming: ambil teks dari hasil akhir
+            try:
+                self.response = response.generations[0][0].text
+            except (AttributeError, IndexError):
+                pass
+        if not self.response.strip():
+            self.response = EMPTY_ANSWER
         self._update_display(True)
-        
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.container.empty()
+
+    @property
+    def time_to_first_token(self):
+        if self.start_time is None or self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
     def _update_display(self, final: bool):
-        """Format yang lebih bersih dengan batasan panjang"""
-        truncated = (self.response[:200] + '...') if len(self.response) > 200 else self.response
-        
+        """Render respon lengkap (tanpa dipotong) sebagai markdown"""
         with self.container:
             if final:
-                st.markdown(f"""
-                <div class='assistant-response'>
-                    <div class='response-header'>💡 Respon</div>
-                    <div class='response-content'>{truncated}</div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(self.response)
+                self.rendered = True
             else:
-                cursor = "▌" if (time.time() - self.last_token_time) < 0.5 else "&nbsp;"
-                st.markdown(f"""
-                <div class='assistant-response'>
-                    <div class='response-header'>🔄 Memproses</div>
-                    <div class='response-content'>{truncated}{cursor}</div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(self.response + "▌")
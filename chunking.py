@@ -0,0 +1,148 @@
+# chunking.py
+# Tahap chunking untuk create_index.py: potong jawaban FAQ di batas paragraf/kalimat dengan panjang
+# berbasis token (tiktoken), pertanyaan dipakai sebagai judul tiap chunk, chunk identik dibuang
+
+import re
+import hashlib
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from tokens import count_tokens, truncate_to_tokens
+
+if TYPE_CHECKING:
+    # Hanya untuk anotasi: DataFrame dibuat pemanggil (create_index.py)
+    import pandas as pd
+
+CHUNK_TOKENS = 300     # panjang maksimum isi chunk (tanpa judul)
+OVERLAP_TOKENS = 40    # kalimat terakhir chunk sebelumnya diulang sampai batas ini
+MIN_CHUNK_TOKENS = 20  # sisa yang lebih pendek digabung ke chunk sebelumnya
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n|\n')
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in PARAGRAPH_SPLIT.split(text) if p.strip()]
+
+
+def _split_oversized(unit: str, max_tokens: int) -> List[str]:
+    """Unit yang melebihi max_tokens dipecah ke kalimat, lalu (jika masih terlalu panjang) per token"""
+    if count_tokens(unit) <= max_tokens:
+        return [unit]
+    sentences = split_sentences(unit)
+    if len(sentences) > 1:
+        return [part for sentence in sentences for part in _split_oversized(sentence, max_tokens)]
+    parts, rest = [], unit
+    while rest:
+        head = truncate_to_tokens(rest, max_tokens)
+        if not head:
+            break
+        parts.append(head.strip())
+        rest = rest[len(head):].strip()
+    return [p for p in parts if p]
+
+
+def pack_units(units: List[str], max_tokens: int = CHUNK_TOKENS,
+               overlap_tokens: int = OVERLAP_TOKENS) -> List[str]:
+    """Gabungkan unit (paragraf/kalimat) berurutan sampai max_tokens, dengan overlap kalimat utuh"""
+    units = [part for unit in units for part in _split_oversized(unit, max_tokens)]
+    chunks: List[str] = []
+    current: List[str] = []
+    for unit in units:
+        # Yang dihitung teks gabungan, bukan jumlah per unit: spasi & token di batas unit ikut terhitung
+        if current and count_tokens(" ".join(current + [unit])) > max_tokens:
+            chunks.append(" ".join(current))
+            # Bawa unit terakhir sebagai overlap agar konteks antar chunk tidak terputus
+            carry: List[str] = []
+            for previous in reversed(current):
+                if count_tokens(" ".join([previous] + carry)) > overlap_tokens:
+                    break
+                carry.insert(0, previous)
+            if carry and count_tokens(" ".join(carry + [unit])) > max_tokens:
+                carry = []
+            current = carry
+        current.append(unit)
+
+    if current:
+        tail = " ".join(current)
+        if chunks and count_tokens(tail) < MIN_CHUNK_TOKENS:
+            chunks[-1] = f"{chunks[-1]} {tail}"
+        else:
+            chunks.append(tail)
+    return chunks
+
+
+def paragraph_chunker(text: str, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS) -> List[str]:
+    return pack_units(split_paragraphs(text), max_tokens, overlap_tokens)
+
+
+def sentence_chunker(text: str, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS) -> List[str]:
+    return pack_units(split_sentences(text), max_tokens, overlap_tokens)
+
+
+Chunker = Callable[[str, int, int], List[str]]
+
+CHUNKERS: Dict[str, Chunker] = {
+    "paragraph": paragraph_chunker,
+    "sentence": sentence_chunker,
+}
+
+
+def chunk_faq(df: "pd.DataFrame", chunker: str = "paragraph", max_tokens: int = CHUNK_TOKENS,
+              overlap_tokens: int = OVERLAP_TOKENS) -> List[Document]:
+    """Satu baris FAQ -> satu atau beberapa chunk "pertanyaan + potongan jawaban".
+    Question_ID hanya disimpan di metadata (tidak ikut di-embed)."""
+    if chunker not in CHUNKERS:
+        raise ValueError(f"❌ Chunker tidak dikenal: {chunker} (pilih: {', '.join(CHUNKERS)})")
+    split = CHUNKERS[chunker]
+
+    chunks: Dict[str, Document] = {}
+    for i, row in df.fillna("").iterrows():
+        question = str(row.get("Questions", "")).strip()
+        answer = str(row.get("Answers", "")).strip()
+        if not answer and not question:
+            continue
+        parts = split(answer, max_tokens, overlap_tokens) if answer else [""]
+        for part_index, part in enumerate(parts):
+            # Pertanyaan sebagai judul: tiap potongan jawaban tetap tahu konteks pertanyaannya
+            text = f"{question}\n{part}".strip()
+            chunk_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if chunk_id in chunks:
+                continue  # chunk identik cukup di-embed sekali
+            chunks[chunk_id] = Document(page_content=text, metadata={
+                "chunk_id": chunk_id,
+                "question": question,
+                "question_id": str(row.get("Question_ID", i)),
+                "chunk_index": part_index,
+                "tokens": count_tokens(text),
+            })
+    return list(chunks.values())
+
+
+def chunk_report(chunks: List[Document]) -> Dict[str, float]:
+    tokens = np.asarray([doc.metadata.get("tokens") or count_tokens(doc.page_content) for doc in chunks])
+    if not len(tokens):
+        return {"chunks": 0}
+    return {
+        "chunks": int(len(tokens)),
+        "total_tokens": int(tokens.sum()),
+        "mean_tokens": float(tokens.mean()),
+        "p95_tokens": float(np.percentile(tokens, 95)),
+        "max_tokens": int(tokens.max()),
+        "min_tokens": int(tokens.min()),
+    }
+
+
+def print_chunk_report(report: Dict[str, float], label: Optional[str] = None) -> None:
+    print(f"📊 Chunk{f' ({label})' if label else ''}: {report['chunks']} chunk", end="")
+    if report["chunks"]:
+        print(f", total {report['total_tokens']} token, rata-rata {report['mean_tokens']:.0f}, "
+              f"p95 {report['p95_tokens']:.0f}, min {report['min_tokens']}, maks {report['max_tokens']}")
+    else:
+        print()
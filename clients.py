@@ -0,0 +1,105 @@
+# clients.py
+# Registry client model: dibuat sekali per (API key, konfigurasi) lalu dipakai ulang lintas request
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple
+
+import httpx
+
+from embedding_cache import CachedEmbeddings
+
+if TYPE_CHECKING:
+    # Hanya untuk anotasi: SDK tetap dimuat lambat di dalam factory
+    import cohere
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+# SDK Cohere / Gemini (berat) diimpor di dalam factory: baru dimuat saat client pertama dibuat
+
+COHERE_EMBED_MODEL = "embed-multilingual-v3.0"
+GEMINI_MODEL = "gemini-1.5-flash"
+MAX_CLIENTS = 32  # LRU: key API yang jarang dipakai tidak menumpuk selama server hidup
+
+# Satu pool koneksi HTTP untuk semua panggilan Cohere (hemat TLS handshake)
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+_lock = threading.RLock()  # reentrant: factory boleh memanggil get_* lain
+_clients: "OrderedDict[Tuple, Any]" = OrderedDict()
+_setup_seconds: Dict[Tuple, float] = {}
+_stats = {"created": 0, "reused": 0, "evicted": 0, "setup_seconds": 0.0, "saved_seconds": 0.0}
+
+
+def _key_id(api_key: str) -> str:
+    # API key tidak disimpan mentah sebagai kunci registry
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _get_or_create(key: Tuple, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        if key in _clients:
+            _clients.move_to_end(key)
+            _stats["reused"] += 1
+            _stats["saved_seconds"] += _setup_seconds[key]
+            return _clients[key]
+
+        start = time.perf_counter()
+        client = factory()
+        elapsed = time.perf_counter() - start
+
+        _clients[key] = client
+        _setup_seconds[key] = elapsed
+        _stats["created"] += 1
+        _stats["setup_seconds"] += elapsed
+        while len(_clients) > MAX_CLIENTS:
+            # Tidak di-close: pemanggil lama mungkin masih memegang client ini
+            old_key, _ = _clients.popitem(last=False)
+            _setup_seconds.pop(old_key, None)
+            _stats["evicted"] += 1
+        return client
+
+
+def get_http_client() -> httpx.Client:
+    return _get_or_create(("httpx",), lambda: httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT))
+
+
+def get_cohere_client(api_key: str) -> "cohere.Client":
+    def factory():
+        import cohere
+        return cohere.Client(api_key=api_key, httpx_client=get_http_client())
+    return _get_or_create(("cohere", _key_id(api_key)), factory)
+
+
+def get_cohere_embeddings(api_key: str, model: str = COHERE_EMBED_MODEL) -> CachedEmbeddings:
+    """Embeddings Cohere (dengan cache) yang dipakai bersama retriever, index dokumen, dan create_index"""
+    def factory():
+        from langchain_cohere import CohereEmbeddings
+        return CachedEmbeddings(
+            CohereEmbeddings(
+                client=get_cohere_client(api_key),
+                model=model,
+                async_client=None
+            ),
+            namespace=f"cohere:{model}"
+        )
+    return _get_or_create(("cohere-embeddings", _key_id(api_key), model), factory)
+
+
+def get_chat_model(api_key: str, model: str = GEMINI_MODEL, temperature: float = 0.2) -> "ChatGoogleGenerativeAI":
+    """Model Gemini tanpa callback; callback diberikan per request lewat config"""
+    def factory():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=temperature,
+            convert_system_message_to_human=True
+        )
+    return _get_or_create(("gemini", _key_id(api_key), model, temperature), factory)
+
+
+def get_client_stats() -> Dict[str, float]:
+    with _lock:
+        return {**_stats, "clients": len(_clients)}
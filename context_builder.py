@@ -0,0 +1,109 @@
+# context_builder.py
+# Perakitan konteks prompt sebelum panggilan LLM: chunk yang tumpang tindih dibuang, hanya kalimat
+# yang relevan dengan query yang diambil, dan total konteks dibatasi anggaran token yang tegas
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Set
+
+from langchain_core.documents import Document
+
+from mental_health_processor import SENTENCE_SPLIT, KeywordMatcher
+from tokens import count_tokens, truncate_to_tokens
+import tracing
+
+# Anggaran token konteks per prompt (perkiraan tiktoken); riwayat percakapan dianggarkan terpisah
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+DOCUMENT_CONTEXT_SHARE = 0.7   # porsi anggaran untuk kutipan PDF saat FAQ ikut disertakan
+MAX_SENTENCES_PER_DOC = 4      # kalimat relevan maksimum per chunk (di luar kalimat pembuka)
+SHORT_DOC_TOKENS = 80          # chunk sependek ini dikirim utuh, tidak diringkas
+
+QUERY_TERM = re.compile(r"\w{3,}", re.UNICODE)
+STOPWORDS = frozenset((
+    # Indonesia
+    "ada", "apa", "apakah", "bagaimana", "bisa", "dan", "dari", "dengan", "untuk", "yang", "ini", "itu",
+    "saya", "aku", "kamu", "anda", "kenapa", "mengapa", "saat", "atau", "jika", "kalau", "pada", "tidak",
+    "juga", "akan", "sudah", "harus", "sangat", "lebih", "seperti", "karena", "dalam", "tentang", "adalah",
+    # Inggris
+    "the", "and", "for", "are", "what", "how", "why", "can", "you", "your", "with", "that", "this",
+    "from", "have", "has", "was", "were", "does", "not", "about", "who", "when", "which", "should",
+))
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    tokens: int
+    source_tokens: int
+    docs_used: int
+
+
+def query_matcher(query: str) -> KeywordMatcher:
+    """Kata kunci dari query (tanpa stopword); tidak memakai get_keyword_matcher agar cache tidak
+    tumbuh per query"""
+    terms = [term for term in QUERY_TERM.findall(query.lower()) if term not in STOPWORDS]
+    return KeywordMatcher(terms)
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(sentence.lower().split())
+
+
+def _select_sentences(text: str, matcher: KeywordMatcher, max_sentences: int) -> List[str]:
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+    if len(sentences) <= 1 or count_tokens(text) <= SHORT_DOC_TOKENS:
+        return sentences
+    # Kalimat pembuka (judul pertanyaan FAQ / awal paragraf) menjaga konteks kutipan
+    lead, rest = sentences[0], sentences[1:]
+    _, relevant = matcher.analyze(" ".join(rest), max_sentences=max_sentences)
+    if not relevant:
+        # Query lintas bahasa (Indonesia vs FAQ berbahasa Inggris) sering tanpa kata yang sama;
+        # chunk tetap relevan secara semantik, jadi ambil kalimat awal
+        relevant = rest[:max_sentences]
+    return [lead] + [s.strip() for s in relevant]
+
+
+def build_context(query: str, docs: List[Document], max_tokens: int = CONTEXT_TOKEN_BUDGET,
+                  max_sentences: int = MAX_SENTENCES_PER_DOC) -> BuiltContext:
+    """Gabungkan dokumen (urutan peringkat) menjadi konteks ringkas yang tidak melebihi max_tokens"""
+    with tracing.span("context_build", docs=len(docs), budget=max_tokens) as build_span:
+        matcher = query_matcher(query)
+        seen: Set[str] = set()
+        blocks: List[str] = []
+        used_tokens = source_tokens = 0
+
+        for doc in docs:
+            content = doc.page_content.strip()
+            if not content:
+                continue
+            source_tokens += count_tokens(content)
+            kept: List[str] = []
+            for sentence in _select_sentences(content, matcher, max_sentences):
+                key = _normalize(sentence)
+                if key in seen:
+                    continue  # overlap antar chunk (kalimat yang diulang chunker) dikirim sekali saja
+                # Pemisah (spasi antar kalimat, baris kosong antar blok) ikut dihitung
+                separator = " " if kept else ("\n\n" if blocks else "")
+                tokens = count_tokens(separator + sentence)
+                if used_tokens + tokens > max_tokens:
+                    if not blocks and not kept and max_tokens > 0:
+                        # Kalimat pertama dokumen teratas lebih panjang dari anggaran: potong saja
+                        sentence = truncate_to_tokens(sentence, max_tokens).strip()
+                        kept.append(sentence)
+                        used_tokens += count_tokens(sentence)
+                    break
+                seen.add(key)
+                kept.append(sentence)
+                used_tokens += tokens
+            if kept:
+                blocks.append(" ".join(kept))
+
+        text = "\n\n".join(blocks)
+        if count_tokens(text) > max_tokens:
+            # Jumlah per kalimat tetap perkiraan (token bisa bergabung di batas kalimat): potong sisanya
+            text = truncate_to_tokens(text, max_tokens).strip()
+        used_tokens = count_tokens(text)
+        build_span["attributes"].update(source_tokens=source_tokens, context_tokens=used_tokens,
+                                        docs_used=len(blocks))
+    return BuiltContext(text, used_tokens, source_tokens, len(blocks))
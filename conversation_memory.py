@@ -0,0 +1,148 @@
+# conversation_memory.py
+# Memori percakapan beranggaran token: jendela giliran terbaru + ringkasan bergulir giliran lama,
+# riwayat mentah dipindahkan ke ChatHistoryStore (SQLite) agar memori & ukuran prompt sesi panjang tetap konstan
+
+import os
+import re
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from tokens import count_tokens, truncate_to_tokens
+from tools.save_history import ChatHistoryStore, get_history_store
+
+WINDOW_TOKENS = 1200        # anggaran giliran terbaru yang dikirim utuh
+SUMMARY_TOKENS = 300        # anggaran ringkasan giliran lama
+SUMMARIZE_BATCH_TOKENS = 600  # giliran lama dikumpulkan dulu, lalu diringkas sekaligus
+# Riwayat mentah percakapan konseling hanya ditulis ke disk jika diaktifkan secara eksplisit
+PERSIST_HISTORY = os.getenv("CHAT_HISTORY_PERSIST", "false").lower() == "true"
+
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+ROLE_LABELS = {"user": "Pengguna", "assistant": "Asisten"}
+
+
+def extractive_summarizer(previous_summary: str, turns: List[Dict[str, str]]) -> str:
+    """Ringkasan tanpa LLM: kalimat pertama tiap giliran lama"""
+    lines = [previous_summary] if previous_summary else []
+    for turn in turns:
+        first_sentence = re.split(r'(?<=[.!?])\s+', turn["content"].strip(), maxsplit=1)[0]
+        lines.append(f"{ROLE_LABELS.get(turn['role'], turn['role'])}: {first_sentence[:200]}")
+    return "\n".join(lines)
+
+
+def make_llm_summarizer(llm) -> Summarizer:
+    """Ringkasan bergulir dengan LLM (satu panggilan per batch giliran lama)"""
+    def summarize(previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        transcript = "\n".join(f"{ROLE_LABELS.get(t['role'], t['role'])}: {t['content']}" for t in turns)
+        prompt = f"""
+        Perbarui ringkasan percakapan konseling berikut secara singkat (maksimal 5 kalimat).
+        Pertahankan fakta penting tentang pengguna, keluhan, dan saran yang sudah diberikan.
+
+        Ringkasan sebelumnya:
+        {previous_summary or "(belum ada)"}
+
+        Percakapan baru:
+        {transcript}
+
+        Ringkasan baru:
+        """
+        try:
+            return str(llm.invoke(prompt).content).strip()
+        except Exception as e:
+            print(f"❌ Gagal meringkas percakapan: {str(e)}")
+            return extractive_summarizer(previous_summary, turns)
+    return summarize
+
+
+class TokenBudgetMemory:
+    """Pengganti ConversationBufferMemory dengan ukuran prompt yang terbatas"""
+
+    def __init__(self, session_id: str, window_tokens: int = WINDOW_TOKENS,
+                 summary_tokens: int = SUMMARY_TOKENS, history_store: Optional[ChatHistoryStore] = None,
+                 persist: bool = PERSIST_HISTORY):
+        self.session_id = session_id
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        # Penulisan ke disk dilakukan thread latar belakang store, bukan di giliran chat
+        self.history_store = (history_store or get_history_store()) if persist else None
+
+        self.summary = ""
+        self._window: deque = deque()   # giliran terbaru: {"role", "content", "tokens"}
+        self._window_token_count = 0
+        self._pending: List[Dict] = []  # sudah keluar jendela, belum diringkas: {"role", "content", "tokens"}
+        self._pending_tokens = 0
+        self._generation = 0  # naik saat clear(), ringkasan yang sedang dibuat untuk riwayat lama dibuang
+        self._lock = threading.Lock()
+        self._summarize_lock = threading.Lock()
+
+    def add_turn(self, role: str, content: str) -> None:
+        tokens = count_tokens(content)
+        with self._lock:
+            self._window.append({"role": role, "content": content, "tokens": tokens})
+            self._window_token_count += tokens
+            # Sisakan minimal satu giliran di jendela walau melebihi anggaran
+            while self._window_token_count > self.window_tokens and len(self._window) > 1:
+                old = self._window.popleft()
+                self._window_token_count -= old["tokens"]
+                self._pending.append(old)
+                self._pending_tokens += old["tokens"]
+        if self.history_store is not None:
+            self.history_store.append(self.session_id, role, content)
+
+    def maybe_summarize(self, summarizer: Summarizer = extractive_summarizer, force: bool = False) -> bool:
+        """Lipat giliran lama ke ringkasan. Aman dijalankan di thread latar belakang: satu ringkasan
+        per memori pada satu waktu, dan giliran lama tetap ada di prompt sampai ringkasannya siap."""
+        if not self._summarize_lock.acquire(blocking=False):
+            return False  # ringkasan lain sedang berjalan; giliran ini ikut diringkas berikutnya
+        try:
+            with self._lock:
+                if not self._pending or (self._pending_tokens < SUMMARIZE_BATCH_TOKENS and not force):
+                    return False
+                pending, previous, generation = list(self._pending), self.summary, self._generation
+
+            summary = truncate_to_tokens(summarizer(previous, pending), self.summary_tokens, keep_end=True)
+            with self._lock:
+                if generation != self._generation:
+                    return False  # riwayat dihapus selagi meringkas
+                self.summary = summary
+                # Giliran yang keluar jendela selama meringkas tetap menunggu batch berikutnya
+                self._pending = self._pending[len(pending):]
+                self._pending_tokens = sum(t["tokens"] for t in self._pending)
+            return True
+        finally:
+            self._summarize_lock.release()
+
+    def get_prompt_context(self) -> str:
+        """Teks riwayat untuk prompt: ringkasan + giliran lama yang belum diringkas + jendela terbaru"""
+        with self._lock:
+            parts = []
+            summary = self.summary
+            if self._pending:
+                # Belum sempat diringkas LLM: pakai ringkasan ekstraktif sementara
+                summary = truncate_to_tokens(extractive_summarizer(summary, self._pending),
+                                             self.summary_tokens, keep_end=True)
+            if summary:
+                parts.append(f"Ringkasan percakapan sebelumnya:\n{summary}")
+            if self._window:
+                parts.append("Percakapan terakhir:\n" + "\n".join(
+                    f"{ROLE_LABELS.get(t['role'], t['role'])}: {t['content']}" for t in self._window
+                ))
+            return "\n\n".join(parts)
+
+    def clear(self) -> None:
+        """Lupakan percakapan, termasuk riwayat sesi ini yang sudah tersimpan di disk"""
+        with self._lock:
+            self.summary = ""
+            self._window.clear()
+            self._window_token_count = 0
+            self._pending, self._pending_tokens = [], 0
+            self._generation += 1
+        if self.history_store is not None:
+            self.history_store.delete_session(self.session_id)
+
+    def load_history(self, limit: Optional[int] = None) -> List[Dict]:
+        """Baca riwayat mentah sesi ini dari disk"""
+        if self.history_store is None:
+            return []
+        return self.history_store.get_session(self.session_id, limit=limit)
@@ -1,61 +1,322 @@
 # ✅ create_index.py (VERSI FINAL, TANPA ERROR)
 # Membuat FAISS index dari CSV dengan Cohere + LangChain + User-Agent aman
+# Mode default inkremental: hanya chunk baru/berubah yang di-embed, lalu index dipublikasikan secara atomik
+# (folder versi baru + file penunjuk, lihat index_pointer.py)
 
 import os
-import shutil
+import json
+import time
+import random
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
-import cohere
 from dotenv import load_dotenv
-from langchain_cohere import CohereEmbeddings
 from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import CharacterTextSplitter
 from langchain.schema import Document
+from embedding_cache import CachedEmbeddings
+from clients import get_cohere_embeddings
+from mmap_store import is_mmap_index, load_mmap_index_as_faiss, save_mmap_index
+from index_types import INDEX_TYPES, build_index, print_recall_report, recall_report
+from bm25_index import BM25_FILE, BM25Index
+from faq_index import FAQ_ANSWER_LANGUAGE, FAQ_INDEX_DIR, FaqAnswerIndex, load_faq_rows
+from index_pointer import new_version_dir, publish_index_dir, resolve_index_dir
+from chunking import (CHUNKERS, CHUNK_TOKENS, OVERLAP_TOKENS, chunk_faq, chunk_report, paragraph_chunker,
+                      print_chunk_report)
+from multi_index import DEFAULT_SHARDS
 
-def create_faiss_index():
+CSV_PATH = "data/Mental_Health_FAQ.csv"
+INDEX_DIR = "data/faiss_index"
+MANIFEST_FILE = "manifest.json"
+INDEX_FORMATS = ("mmap", "pickle")  # mmap: index.faiss + docstore.sqlite (tanpa pickle)
+
+EMBED_BATCH_SIZE = 96   # batas teks per panggilan embed Cohere
+EMBED_WORKERS = 4
+MAX_RETRIES = 6
+BASE_DELAY = 2.0
+DEFAULT_CHUNKER = "paragraph"
+GUIDELINES_DIR = "data/guidelines"  # pedoman klinis: .txt / .md / .pdf
+SHARD_SOURCES = ("guidelines", "resources")
+
+def load_chunks(csv_path: str = CSV_PATH, chunker: str = DEFAULT_CHUNKER,
+                max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS) -> List[Document]:
+    """Baca CSV dan potong per baris FAQ (pertanyaan sebagai judul), id chunk = hash isi chunk"""
+    df = pd.read_csv(csv_path).fillna("")
+    return chunk_faq(df, chunker=chunker, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    message = str(error).lower()
+    return status == 429 or "too many requests" in message or "rate limit" in message
+
+def _embed_batch_with_backoff(embeddings: CachedEmbeddings, texts: List[str]) -> List[List[float]]:
+    for attempt in range(MAX_RETRIES):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if not _is_rate_limit_error(e) or attempt == MAX_RETRIES - 1:
+                raise
+            delay = BASE_DELAY * (2 ** attempt) + random.uniform(0, 1)
+            print(f"⏳ Rate limit Cohere, mencoba lagi dalam {delay:.1f} detik...")
+            time.sleep(delay)
+
+def embed_in_batches(embeddings: CachedEmbeddings, docs: List[Document],
+                     batch_size: int = EMBED_BATCH_SIZE, max_workers: int = EMBED_WORKERS) -> Dict[str, List[float]]:
+    """Embed chunk per batch secara paralel. Setiap batch yang selesai langsung tersimpan
+    di cache embedding (SQLite), sehingga build yang crash cukup dijalankan ulang untuk melanjutkan."""
+    batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+    vectors: Dict[str, List[float]] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_embed_batch_with_backoff, embeddings, [d.page_content for d in batch]): batch
+            for batch in batches
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            batch = futures[future]
+            for doc, vector in zip(batch, future.result()):
+                vectors[doc.metadata["chunk_id"]] = vector
+            print(f"🔄 Batch embedding {done}/{len(batches)} selesai")
+    return vectors
+
+def _read_manifest(index_dir: str) -> Dict:
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def report_index_recall(vectorstore: FAISS, embeddings: CachedEmbeddings, csv_path: str = CSV_PATH,
+                        n_queries: int = 100, k: int = 3) -> None:
+    """Laporan recall-vs-latensi tiap tipe index terhadap flat, memakai pertanyaan FAQ sebagai query"""
+    questions = pd.read_csv(csv_path).fillna("")["Questions"].tolist()[:n_queries]
+    queries = np.array([embeddings.embed_query(q) for q in questions if q.strip()], dtype=np.float32)
+    vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    print(f"📊 Recall@{k} terhadap index flat ({len(queries)} query, {len(vectors)} vektor):")
+    print_recall_report(recall_report(vectors, queries, k=k))
+
+def create_faq_index(embeddings: CachedEmbeddings, csv_path: str = CSV_PATH,
+                     index_dir: str = FAQ_INDEX_DIR) -> None:
+    """Index pertanyaan FAQ untuk jalur jawaban langsung. Pertanyaan di-embed sebagai query
+    (bukan dokumen) agar sebanding dengan query pengguna; yang sudah ada diambil dari cache."""
+    rows = load_faq_rows(csv_path)
+    if not rows:
+        print("⚠️ Tidak ada pasangan Questions/Answers untuk index FAQ")
+        return
+    vectors = embeddings.embed_queries([question for _, question, _ in rows])
+    faq_index = FaqAnswerIndex.build(rows, vectors)
+    if FAQ_ANSWER_LANGUAGE:
+        # Diterjemahkan di sini, bukan saat menjawab; cache terjemahan membuat build ulang tanpa panggilan API
+        from tools.translate_tools import get_translation_service
+        translated = faq_index.add_translations(FAQ_ANSWER_LANGUAGE, get_translation_service().try_translate_batch)
+        print(f"🌐 {translated}/{len(rows)} jawaban FAQ diterjemahkan ke '{FAQ_ANSWER_LANGUAGE}'")
+    new_dir = new_version_dir(index_dir)
+    faq_index.save(new_dir)
+    publish_index_dir(new_dir, index_dir)
+    print(f"✅ Index FAQ ({len(rows)} pertanyaan) disimpan ke folder: {index_dir}")
+
+def save_index(vectorstore: FAISS, index_dir: str, index_format: str = "mmap") -> None:
+    """Tulis vektor + docstore dalam format yang dipilih, plus index BM25 pendampingnya"""
+    if index_format == "mmap":
+        save_mmap_index(vectorstore, index_dir)
+    else:
+        vectorstore.save_local(index_dir)
+    # Index kata kunci lokal dengan doc_id yang sama seperti vector store (untuk pencarian hybrid)
+    BM25Index.build([
+        (doc_id, vectorstore.docstore.search(doc_id).page_content)
+        for _, doc_id in sorted(vectorstore.index_to_docstore_id.items())
+    ]).save(os.path.join(index_dir, BM25_FILE))
+
+def create_faiss_index(incremental: bool = True, batch_size: int = EMBED_BATCH_SIZE,
+                       max_workers: int = EMBED_WORKERS, index_format: str = "mmap",
+                       index_type: str = "flat", report: bool = False, build_faq: bool = True,
+                       chunker: str = DEFAULT_CHUNKER, chunk_tokens: int = CHUNK_TOKENS):
     load_dotenv()
 
     # ✅ Set user agent via ENV (bukan di parameter)
     os.environ["LANGCHAIN_USER_AGENT"] = "mental-health-chatbot"
 
     # Path ke file dan index
-    csv_path = "data/Mental_Health_FAQ.csv"
-    index_dir = "data/faiss_index"
+    csv_path = CSV_PATH
+    index_dir = INDEX_DIR
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"❌ Tipe index tidak dikenal: {index_type} (pilih: {', '.join(INDEX_TYPES)})")
+    if index_format not in INDEX_FORMATS:
+        raise ValueError(f"❌ Format index tidak dikenal: {index_format} (pilih: {', '.join(INDEX_FORMATS)})")
 
     # Validasi file CSV
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"❌ File CSV tidak ditemukan: {csv_path}")
 
-    # Hapus index lama jika ada
-    if os.path.exists(index_dir):
-        shutil.rmtree(index_dir)
-    os.makedirs(index_dir, exist_ok=True)
-
     # Ambil API Key
     cohere_api_key = os.getenv("COHERE_API_KEY")
     if not cohere_api_key:
         raise ValueError("❌ COHERE_API_KEY tidak ditemukan di file .env")
 
-    # Baca dan gabungkan data
-    df = pd.read_csv(csv_path).fillna("")
-    df["combined"] = df.astype(str).agg(" ".join, axis=1)
-    docs = [Document(page_content=text) for text in df["combined"].tolist()]
-
-    # Split teks jadi chunks
-    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
-
-    # Embeddings & vectorstore
-    cohere_client = cohere.Client(api_key=cohere_api_key)
-    embeddings = CohereEmbeddings(
-        client=cohere_client,
-        model="embed-multilingual-v3.0",  # ✅ WAJIB
-        async_client=None
-    )
+    chunks = load_chunks(csv_path, chunker=chunker, max_tokens=chunk_tokens)
+    print_chunk_report(chunk_report(chunks), label=f"{chunker}, maks {chunk_tokens} token")
+    current_ids = {doc.metadata["chunk_id"] for doc in chunks}
+    # ✅ Chunk yang sudah pernah di-embed diambil dari cache disk, bukan dari API
+    embeddings = get_cohere_embeddings(cohere_api_key)
+    if build_faq:
+        create_faq_index(embeddings, csv_path)
+
+    # Muat index lama hanya jika dibangun oleh mode inkremental (punya manifest).
+    # Index terkuantisasi (IVF/PQ/HNSW/SQ8) selalu dibangun ulang dari vektor penuh; chunk yang
+    # tidak berubah tetap tidak memanggil API karena vektornya diambil dari cache embedding.
+    current_dir = resolve_index_dir(index_dir)
+    manifest = _read_manifest(current_dir)
+    vectorstore = None
+    if incremental and manifest and manifest.get("index_type", "flat") == "flat" and index_type == "flat":
+        if is_mmap_index(current_dir):
+            vectorstore = load_mmap_index_as_faiss(current_dir, embeddings)
+        else:
+            vectorstore = FAISS.load_local(current_dir, embeddings, allow_dangerous_deserialization=True)
+    existing_ids = set(vectorstore.index_to_docstore_id.values()) if vectorstore else set()
 
-    vectorstore = FAISS.from_documents(chunks, embeddings)
-    vectorstore.save_local(index_dir)
+    new_docs = [doc for doc in chunks if doc.metadata["chunk_id"] not in existing_ids]
+    removed_ids = list(existing_ids - current_ids)
+    format_changed = vectorstore is not None and is_mmap_index(current_dir) != (index_format == "mmap")
+    if vectorstore and not new_docs and not removed_ids and not format_changed:
+        print(f"✅ FAISS index sudah up-to-date ({len(current_ids)} chunk)")
+        if report:
+            report_index_recall(vectorstore, embeddings, csv_path)
+        return
+
+    print(f"📦 {len(new_docs)} chunk baru/berubah, {len(removed_ids)} chunk dihapus")
+    vectors = embed_in_batches(embeddings, new_docs, batch_size=batch_size, max_workers=max_workers)
+
+    if removed_ids:
+        vectorstore.delete(removed_ids)
+    if new_docs:
+        text_embeddings = [(doc.page_content, vectors[doc.metadata["chunk_id"]]) for doc in new_docs]
+        metadatas = [doc.metadata for doc in new_docs]
+        ids = [doc.metadata["chunk_id"] for doc in new_docs]
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=ids)
+        else:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+    if report:
+        report_index_recall(vectorstore, embeddings, csv_path)
+
+    if index_type != "flat":
+        # Posisi vektor tetap sama, jadi index_to_docstore_id tidak perlu diubah
+        vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+        vectorstore.index = build_index(index_type, vectors)
+        print(f"🧮 Index {index_type} dilatih dengan {len(vectors)} vektor")
+
+    # Tulis ke folder versi baru dulu, app yang sedang berjalan tidak pernah melihat index setengah jadi
+    new_dir = new_version_dir(index_dir)
+    save_index(vectorstore, new_dir, index_format)
+    with open(os.path.join(new_dir, MANIFEST_FILE), "w") as f:
+        json.dump({"csv_path": csv_path, "index_type": index_type, "chunker": chunker,
+                   "chunk_tokens": chunk_tokens, "chunk_ids": sorted(current_ids)}, f)
+    publish_index_dir(new_dir, index_dir)
 
     print(f"✅ FAISS index berhasil disimpan ke folder: {index_dir}")
 
+def _chunk_source(text: str, title: str, metadata: Dict, max_tokens: int = CHUNK_TOKENS) -> List[Document]:
+    docs = []
+    for part_index, part in enumerate(paragraph_chunker(text, max_tokens)):
+        content = f"{title}\n{part}".strip()
+        chunk_id = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        docs.append(Document(page_content=content, metadata={
+            **metadata, "chunk_id": chunk_id, "chunk_index": part_index,
+        }))
+    return docs
+
+def load_resource_documents() -> List[Document]:
+    """Satu chunk per layanan bantuan di PROFESSIONAL_RESOURCES"""
+    from tools.pscyologist_tools import PROFESSIONAL_RESOURCES
+    docs = []
+    for resource in PROFESSIONAL_RESOURCES:
+        content = f"Sumber bantuan profesional: {resource}"
+        chunk_id = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        docs.append(Document(page_content=content, metadata={"chunk_id": chunk_id, "source": "resources"}))
+    return docs
+
+def load_guideline_documents(source_dir: str = GUIDELINES_DIR, max_tokens: int = CHUNK_TOKENS) -> List[Document]:
+    """Pedoman klinis dari folder: nama file sebagai judul, dipotong per paragraf berbasis token"""
+    if not os.path.isdir(source_dir):
+        raise FileNotFoundError(f"❌ Folder pedoman tidak ditemukan: {source_dir}")
+    docs: Dict[str, Document] = {}
+    for filename in sorted(os.listdir(source_dir)):
+        path = os.path.join(source_dir, filename)
+        title, ext = os.path.splitext(filename)
+        if ext.lower() in (".txt", ".md"):
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        elif ext.lower() == ".pdf":
+            from mental_health_processor import iter_pdf_pages
+            text = "\n\n".join(page_text for _, page_text in iter_pdf_pages(path))
+        else:
+            continue
+        for doc in _chunk_source(text, title.replace("_", " "), {"source": filename}, max_tokens):
+            docs.setdefault(doc.metadata["chunk_id"], doc)
+    return list(docs.values())
+
+def create_shard_index(name: str, source: Optional[str] = None, batch_size: int = EMBED_BATCH_SIZE,
+                       max_workers: int = EMBED_WORKERS, index_format: str = "mmap") -> None:
+    """Bangun satu shard untuk MultiIndexRetriever; app yang berjalan memuatnya ulang otomatis"""
+    load_dotenv()
+    cohere_api_key = os.getenv("COHERE_API_KEY")
+    if not cohere_api_key:
+        raise ValueError("❌ COHERE_API_KEY tidak ditemukan di file .env")
+    if name not in SHARD_SOURCES:
+        raise ValueError(f"❌ Shard tidak dikenal: {name} (pilih: {', '.join(SHARD_SOURCES)})")
+
+    docs = load_resource_documents() if name == "resources" else load_guideline_documents(source or GUIDELINES_DIR)
+    if not docs:
+        print(f"⚠️ Tidak ada dokumen untuk shard '{name}'")
+        return
+    print_chunk_report(chunk_report(docs), label=name)
+
+    embeddings = get_cohere_embeddings(cohere_api_key)
+    vectors = embed_in_batches(embeddings, docs, batch_size=batch_size, max_workers=max_workers)
+    vectorstore = FAISS.from_embeddings(
+        [(doc.page_content, vectors[doc.metadata["chunk_id"]]) for doc in docs], embeddings,
+        metadatas=[doc.metadata for doc in docs], ids=[doc.metadata["chunk_id"] for doc in docs]
+    )
+
+    index_dir = DEFAULT_SHARDS[name]
+    new_dir = new_version_dir(index_dir)
+    save_index(vectorstore, new_dir, index_format)
+    publish_index_dir(new_dir, index_dir)
+    print(f"✅ Shard '{name}' ({len(docs)} chunk) disimpan ke folder: {index_dir}")
+
 if __name__ == "__main__":
-    create_faiss_index()
+    parser = argparse.ArgumentParser(description="Bangun FAISS index dari Mental_Health_FAQ.csv")
+    parser.add_argument("--full", action="store_true", help="Bangun ulang penuh, abaikan index lama")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--format", choices=INDEX_FORMATS, default="mmap",
+                        help="mmap: index.faiss + docstore.sqlite (aman, tanpa pickle); pickle: format LangChain lama")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat",
+                        help="flat (eksak), ivf-flat, ivf-pq, hnsw, atau sq8 (int8)")
+    parser.add_argument("--report", action="store_true",
+                        help="Cetak recall@k dan latensi tiap tipe index dibanding flat")
+    parser.add_argument("--chunker", choices=sorted(CHUNKERS), default=DEFAULT_CHUNKER,
+                        help="Batas potongan: paragraph (paragraf, lalu kalimat) atau sentence (per kalimat)")
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS, help="Panjang maksimum chunk (token)")
+    parser.add_argument("--chunk-report", action="store_true", help="Cetak statistik chunk tanpa membangun index")
+    parser.add_argument("--shard", choices=SHARD_SOURCES,
+                        help="Bangun shard tambahan (guidelines dari --source, resources dari PROFESSIONAL_RESOURCES)")
+    parser.add_argument("--source", help=f"Folder pedoman untuk --shard guidelines (default: {GUIDELINES_DIR})")
+    parser.add_argument("--skip-faq", action="store_true", help="Jangan bangun ulang index jawaban FAQ")
+    args = parser.parse_args()
+    if args.chunk_report:
+        for name in sorted(CHUNKERS):
+            print_chunk_report(chunk_report(load_chunks(CSV_PATH, chunker=name, max_tokens=args.chunk_tokens)),
+                               label=f"{name}, maks {args.chunk_tokens} token")
+        raise SystemExit(0)
+    if args.shard:
+        create_shard_index(args.shard, source=args.source, batch_size=args.batch_size,
+                           max_workers=args.workers, index_format=args.format)
+        raise SystemExit(0)
+    create_faiss_index(incremental=not args.full, batch_size=args.batch_size, max_workers=args.workers,
+                       index_format=args.format, index_type=args.index_type, report=args.report,
+                       build_faq=not args.skip_faq, chunker=args.chunker, chunk_tokens=args.chunk_tokens)
@@ -0,0 +1,75 @@
+# document_index.py
+# Index vektor sementara untuk PDF yang diunggah: hanya chunk yang relevan yang dikirim ke Gemini
+
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+import tracing
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+MAX_CACHED_DOCUMENTS = 16
+
+_cache_lock = threading.Lock()
+_document_cache: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+
+
+class DocumentIndex:
+    """Index FAISS untuk satu dokumen, dibangun sekali saat upload"""
+
+    def __init__(self, content_hash: str, full_text: str, embeddings: Embeddings):
+        self.content_hash = content_hash
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        self.chunks = [
+            Document(page_content=text, metadata={"source": "pdf", "chunk": i})
+            for i, text in enumerate(splitter.split_text(full_text or ""))
+            if text.strip()
+        ]
+        if not self.chunks:
+            raise ValueError("Dokumen tidak mengandung teks yang bisa diindeks")
+        self.vectorstore = FAISS.from_documents(self.chunks, embeddings)
+
+    def search(self, query: str, k: int = 4) -> List[Document]:
+        try:
+            return self.vectorstore.similarity_search(query, k=k)
+        except Exception as e:
+            print(f"❌ Error saat mencari di dokumen: {str(e)}")
+            return []
+
+    def search_by_vector(self, embedding, k: int = 4) -> List[Document]:
+        try:
+            return self.vectorstore.similarity_search_by_vector(embedding, k=k)
+        except Exception as e:
+            print(f"❌ Error saat mencari di dokumen: {str(e)}")
+            return []
+
+
+def get_cached_document_index(content_hash: str) -> Optional[DocumentIndex]:
+    """Ambil index dokumen yang sudah pernah dibangun (upload ulang file yang sama)"""
+    with _cache_lock:
+        doc_index = _document_cache.get(content_hash)
+        if doc_index is not None:
+            _document_cache.move_to_end(content_hash)
+        return doc_index
+
+
+def build_document_index(content_hash: str, full_text: str, embeddings: Embeddings) -> DocumentIndex:
+    """Bangun index dokumen (atau pakai dari cache) berdasarkan hash isi file"""
+    doc_index = get_cached_document_index(content_hash)
+    if doc_index is not None:
+        return doc_index
+
+    with tracing.span("pdf_index") as index_span:
+        doc_index = DocumentIndex(content_hash, full_text, embeddings)
+        index_span["attributes"]["chunks"] = len(doc_index.chunks)
+    with _cache_lock:
+        _document_cache[content_hash] = doc_index
+        while len(_document_cache) > MAX_CACHED_DOCUMENTS:
+            _document_cache.popitem(last=False)
+    return doc_index
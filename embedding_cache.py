@@ -0,0 +1,84 @@
+# embedding_cache.py
+# Cache embedding dua lapis: LRU di memori + SQLite di disk (bertahan saat Streamlit restart)
+
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from kv_cache import KeyValueCache
+import tracing
+
+DEFAULT_CACHE_PATH = "data/embedding_cache.sqlite"
+QUERY_BATCH_SIZE = 96  # batas teks per request embed Cohere
+
+
+class CachedEmbeddings(Embeddings):
+    """Bungkus objek embeddings LangChain agar teks yang sama tidak pernah di-embed dua kali"""
+
+    def __init__(self, embeddings: Embeddings, namespace: str,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 max_memory_items: int = 4096):
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self._cache = KeyValueCache(
+            cache_path, table="embeddings", column="vector", column_type="BLOB",
+            max_memory_items=max_memory_items, label="cache embedding",
+            encode=lambda vector: np.asarray(vector, dtype=np.float32).tobytes(),
+            decode=lambda blob: np.frombuffer(blob, dtype=np.float32).tolist(),
+        )
+
+    # ---------- API Embeddings ----------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached(texts, kind="document",
+                                  compute=self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_cached([text], kind="query",
+                                  compute=lambda missing: [self.embeddings.embed_query(t) for t in missing])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Banyak query sekaligus; untuk Cohere cukup satu panggilan API per QUERY_BATCH_SIZE teks"""
+        return self._embed_cached(texts, kind="query", compute=self._embed_query_batch)
+
+    def get_stats(self) -> Dict[str, int]:
+        return self._cache.get_stats()
+
+    # ---------- internal ----------
+    def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        # CohereEmbeddings.embed() menerima input_type; backend lain di-embed satu per satu
+        embed = getattr(self.embeddings, "embed", None)
+        if not callable(embed):
+            return [self.embeddings.embed_query(text) for text in texts]
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), QUERY_BATCH_SIZE):
+            vectors.extend(embed(texts[start:start + QUERY_BATCH_SIZE], input_type="search_query"))
+        return vectors
+
+    def _embed_cached(self, texts: List[str], kind: str, compute) -> List[List[float]]:
+        # Query dan dokumen di-embed berbeda (input_type Cohere), jadi kuncinya dipisah
+        with tracing.span("embed", kind=kind, texts=len(texts)) as embed_span:
+            keys = [self._key(kind, text) for text in texts]
+            found = self._cache.get_many(keys)
+
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in found and key not in missing:
+                    missing[key] = text
+
+            embed_span["attributes"]["cache_misses"] = len(missing)
+            tracing.increment("embedding_cache", len(keys) - len(missing), result="hit")
+            tracing.increment("embedding_cache", len(missing), result="miss")
+            if missing:
+                with tracing.span("embed_api", texts=len(missing)):
+                    vectors = compute(list(missing.values()))
+                computed = dict(zip(missing.keys(), vectors))
+                self._cache.put_many(computed)
+                found.update(computed)
+
+        return [list(found[key]) for key in keys]
+
+    def _key(self, kind: str, text: str) -> str:
+        raw = f"{self.namespace}\x00{kind}\x00{text}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
@@ -0,0 +1,112 @@
+# faq_index.py
+# Index pertanyaan FAQ (kolom Questions) dengan jawaban kurasi per Question_ID: query yang sangat
+# mirip dengan pertanyaan FAQ langsung dijawab dari CSV tanpa memanggil LLM
+
+import os
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from index_pointer import resolve_index_dir
+
+FAQ_INDEX_DIR = "data/faq_index"
+FAQ_VECTORS_FILE = "questions.faiss"
+FAQ_ANSWERS_FILE = "answers.json"
+
+# Cosine similarity query vs pertanyaan FAQ; di bawah ini tetap lewat retrieval + LLM
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.85"))
+# Bahasa jawaban FAQ langsung (CSV berbahasa Inggris); kosongkan untuk mengirim teks asli.
+# Terjemahannya dibuat saat build index, jadi jalur jawaban tidak menunggu API terjemahan.
+FAQ_ANSWER_LANGUAGE = os.getenv("FAQ_ANSWER_LANGUAGE", "id")
+
+
+@dataclass
+class FaqMatch:
+    question_id: str
+    question: str
+    answer: str
+    score: float
+    translations: Dict[str, Tuple[str, str]] = field(default_factory=dict)  # bahasa -> (jawaban, pertanyaan)
+
+
+def load_faq_rows(csv_path: str) -> List[Tuple[str, str, str]]:
+    """[(Question_ID, Questions, Answers), ...]; baris tanpa pertanyaan/jawaban dilewati"""
+    # pandas (berat) hanya untuk build index; app cukup memuat index FAQ yang sudah jadi
+    import pandas as pd
+    df = pd.read_csv(csv_path).fillna("")
+    rows = []
+    for i, row in df.iterrows():
+        question, answer = str(row.get("Questions", "")).strip(), str(row.get("Answers", "")).strip()
+        if question and answer:
+            rows.append((str(row.get("Question_ID") or i), question, answer))
+    return rows
+
+
+class FaqAnswerIndex:
+    def __init__(self, index: faiss.Index, question_ids: List[str], questions: List[str], answers: dict,
+                 translations: Optional[dict] = None):
+        self.index = index
+        self.question_ids = question_ids
+        self.questions = questions
+        self.answers = answers  # Question_ID -> jawaban
+        self.translations = translations or {}  # bahasa -> {Question_ID: [jawaban, pertanyaan]}
+
+    @classmethod
+    def build(cls, rows: List[Tuple[str, str, str]], vectors: List[List[float]]) -> "FaqAnswerIndex":
+        matrix = np.asarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        index = faiss.IndexFlatIP(matrix.shape[1])
+        index.add(matrix)
+        return cls(index, [qid for qid, _, _ in rows], [q for _, q, _ in rows],
+                   {qid: answer for qid, _, answer in rows})
+
+    def add_translations(self, language: str,
+                         try_translate_batch: Callable[[List[str], str], List[Optional[str]]]) -> int:
+        """Terjemahkan semua jawaban + pertanyaan sekali (saat build); jumlah yang berhasil diterjemahkan.
+        try_translate_batch mengembalikan None untuk teks yang gagal (TranslationService.try_translate_batch)"""
+        answers = [self.answers[qid] for qid in self.question_ids]
+        translated = try_translate_batch(answers + self.questions, language)
+        pairs = {}
+        for i, qid in enumerate(self.question_ids):
+            answer, question = translated[i], translated[len(answers) + i]
+            # Terjemahan gagal tidak disimpan, agar dicoba lagi saat dipakai
+            if answer is not None and question is not None:
+                pairs[qid] = [answer, question]
+        self.translations[language] = pairs
+        return len(pairs)
+
+    def match(self, embedding, threshold: float = FAQ_MATCH_THRESHOLD) -> Optional[FaqMatch]:
+        if self.index.ntotal == 0:
+            return None
+        query = np.asarray([embedding], dtype=np.float32)
+        faiss.normalize_L2(query)
+        scores, positions = self.index.search(query, 1)
+        pos, score = int(positions[0][0]), float(scores[0][0])
+        if pos == -1 or score < threshold:
+            return None
+        question_id = self.question_ids[pos]
+        translations = {language: tuple(pairs[question_id])
+                        for language, pairs in self.translations.items() if question_id in pairs}
+        return FaqMatch(question_id, self.questions[pos], self.answers[question_id], score, translations)
+
+    def save(self, index_dir: str) -> None:
+        os.makedirs(index_dir, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(index_dir, FAQ_VECTORS_FILE))
+        with open(os.path.join(index_dir, FAQ_ANSWERS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"question_ids": self.question_ids, "questions": self.questions,
+                       "answers": self.answers, "translations": self.translations}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_dir: str = FAQ_INDEX_DIR) -> Optional["FaqAnswerIndex"]:
+        index_dir = resolve_index_dir(index_dir)
+        vectors_path = os.path.join(index_dir, FAQ_VECTORS_FILE)
+        answers_path = os.path.join(index_dir, FAQ_ANSWERS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(answers_path)):
+            return None
+        with open(answers_path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(faiss.read_index(vectors_path), data["question_ids"], data["questions"], data["answers"],
+                   data.get("translations"))
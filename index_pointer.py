@@ -0,0 +1,61 @@
+# index_pointer.py
+# Publikasi index secara atomik: tiap build ditulis ke folder versi baru "<index_dir>.v<ns>", lalu file
+# penunjuk "<index_dir>.current" diganti dengan os.replace (satu langkah atomik). Pembaca tidak pernah
+# melihat folder yang hilang atau setengah jadi; tanpa penunjuk, index_dir dipakai apa adanya.
+
+import os
+import time
+import shutil
+
+POINTER_SUFFIX = ".current"
+KEEP_VERSIONS = 2  # versi aktif + sebelumnya (mungkin masih sedang dimuat proses lain)
+
+
+def pointer_path(index_dir: str) -> str:
+    return f"{index_dir}{POINTER_SUFFIX}"
+
+
+def resolve_index_dir(index_dir: str) -> str:
+    """Folder versi aktif; resolusi sekali per pemuatan agar semua file dibaca dari versi yang sama"""
+    for _ in range(3):
+        try:
+            with open(pointer_path(index_dir), encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            return index_dir
+        target = os.path.join(os.path.dirname(index_dir), name)
+        if name and os.path.isdir(target):
+            return target
+        # Versi yang baru dibaca bisa saja sudah dibersihkan oleh build berikutnya: baca ulang penunjuk
+    return index_dir
+
+
+def new_version_dir(index_dir: str) -> str:
+    """Folder kosong untuk build berikutnya; belum terlihat pembaca sampai publish_index_dir()"""
+    path = f"{index_dir}.v{time.time_ns()}"
+    os.makedirs(path)
+    return path
+
+
+def publish_index_dir(version_dir: str, index_dir: str, keep: int = KEEP_VERSIONS) -> None:
+    """Jadikan version_dir versi aktif index_dir dengan mengganti file penunjuk secara atomik"""
+    pointer = pointer_path(index_dir)
+    tmp_pointer = f"{pointer}.tmp{os.getpid()}"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(version_dir))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+    _remove_old_versions(index_dir, keep)
+
+
+def _remove_old_versions(index_dir: str, keep: int) -> None:
+    parent = os.path.dirname(index_dir) or "."
+    prefix = f"{os.path.basename(index_dir)}.v"
+    versions = sorted((name for name in os.listdir(parent)
+                       if name.startswith(prefix) and name[len(prefix):].isdigit()),
+                      key=lambda name: int(name[len(prefix):]))
+    active = os.path.basename(resolve_index_dir(index_dir))
+    for name in versions[:-keep]:
+        if name != active:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
@@ -0,0 +1,131 @@
+# index_types.py
+# Pilihan tipe index FAISS (flat / IVF / PQ / HNSW / int8) + parameter pencarian + laporan recall
+
+import math
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf-flat", "ivf-pq", "hnsw", "sq8")
+
+HNSW_M = 32
+PQ_SUBVECTORS = 64  # embed-multilingual-v3.0 = 1024 dimensi -> 16 dimensi per sub-vektor
+
+
+def _nlist(n_vectors: int) -> int:
+    # FAISS butuh ~39 vektor latih per centroid; 4*sqrt(n) adalah aturan praktis umum
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def index_factory_string(index_type: str, n_vectors: int, dim: int) -> str:
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf-flat":
+        return f"IVF{_nlist(n_vectors)},Flat"
+    if index_type == "ivf-pq":
+        m = PQ_SUBVECTORS if dim % PQ_SUBVECTORS == 0 else 1
+        nbits = max(1, min(8, int(math.log2(max(n_vectors, 2)))))  # codebook 2^nbits <= jumlah data latih
+        return f"IVF{_nlist(n_vectors)},PQ{m}x{nbits}"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "sq8":
+        return "SQ8"  # int8 scalar quantization: 4x lebih kecil dari float32
+    raise ValueError(f"❌ Tipe index tidak dikenal: {index_type} (pilih: {', '.join(INDEX_TYPES)})")
+
+
+def build_index(index_type: str, vectors: np.ndarray) -> faiss.Index:
+    """Bangun + latih index dari matriks vektor (urutan baris = posisi di docstore)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, index_factory_string(index_type, n_vectors, dim), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    enable_reconstruct(index)
+    return index
+
+
+def enable_reconstruct(index: faiss.Index) -> None:
+    """IVF butuh direct map agar reconstruct() (dipakai MMR) bisa mencari vektor per posisi;
+    direct map ikut tersimpan di file index, tipe lain tidak perlu apa-apa"""
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return
+    if ivf.direct_map.no():
+        ivf.make_direct_map()
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Atur nprobe (IVF) / efSearch (HNSW); diabaikan untuk tipe index yang tidak relevan"""
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+
+def search_parameters(index: faiss.Index, nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> Optional[faiss.SearchParameters]:
+    """nprobe / efSearch untuk satu panggilan search(); objek index bersama tidak diubah,
+    jadi aman dipakai dari banyak thread sekaligus"""
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if ef_search is not None and hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
+def recall_report(vectors: np.ndarray, queries: np.ndarray, k: int = 3,
+                  nprobe_values=(1, 4, 16), ef_search_values=(16, 64, 128)) -> List[Dict]:
+    """Bandingkan recall@k dan latensi tiap tipe index terhadap flat (pencarian eksak)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    flat = build_index("flat", vectors)
+    _, truth = flat.search(queries, k)
+
+    rows = []
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = build_index(index_type, vectors)
+        build_seconds = time.perf_counter() - start
+
+        if index_type.startswith("ivf"):
+            settings = [{"nprobe": v} for v in nprobe_values]
+        elif index_type == "hnsw":
+            settings = [{"ef_search": v} for v in ef_search_values]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            set_search_params(index, **params)
+            start = time.perf_counter()
+            _, found = index.search(queries, k)
+            search_seconds = time.perf_counter() - start
+
+            hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+            rows.append({
+                "index_type": index_type,
+                "params": params,
+                f"recall@{k}": hits / truth.size,
+                "ms_per_query": 1000 * search_seconds / len(queries),
+                "build_seconds": build_seconds,
+                "bytes": faiss.serialize_index(index).nbytes,
+            })
+    return rows
+
+
+def print_recall_report(rows: List[Dict]) -> None:
+    for row in rows:
+        recall_key = next(key for key in row if key.startswith("recall@"))
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items()) or "-"
+        print(
+            f"{row['index_type']:<9} {params:<14} {recall_key}={row[recall_key]:.3f}  "
+            f"{row['ms_per_query']:.3f} ms/query  build {row['build_seconds']:.2f} s  "
+            f"{row['bytes'] / 1024:.0f} KB"
+        )
@@ -0,0 +1,104 @@
+# kv_cache.py
+# Cache key-value dua lapis yang dipakai bersama: LRU di memori + satu tabel SQLite (WAL) di disk.
+# Dipakai cache embedding (vektor float32) dan cache terjemahan (teks); bertahan saat Streamlit restart.
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+SQLITE_MAX_PARAMS = 500  # batas parameter per query "IN (...)"
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class KeyValueCache:
+    """Tabel `table(key TEXT PRIMARY KEY, column column_type NOT NULL)`; encode/decode mengubah nilai
+    ke/dari kolom disk. Jika disk gagal dibuka, cache tetap jalan di memori saja."""
+
+    def __init__(self, cache_path: Optional[str], table: str, column: str, column_type: str = "TEXT",
+                 max_memory_items: int = 4096, label: str = "cache",
+                 encode: Callable[[Any], Any] = _identity, decode: Callable[[Any], Any] = _identity):
+        self.table = table
+        self.column = column
+        self.max_memory_items = max_memory_items
+        self.label = label
+        self._encode = encode
+        self._decode = decode
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._conn = self._open_db(cache_path, column_type) if cache_path else None
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Nilai untuk key yang ada di memori/disk; hit disk ikut dimasukkan ke LRU memori"""
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats["memory_hits"] += 1
+
+            remaining = list({k for k in keys if k not in found})
+            if remaining and self._conn is not None:
+                for start in range(0, len(remaining), SQLITE_MAX_PARAMS):
+                    batch = remaining[start:start + SQLITE_MAX_PARAMS]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT key, {self.column} FROM {self.table} WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, stored in rows:
+                        value = self._decode(stored)
+                        found[key] = value
+                        self._remember(key, value)
+                        self.stats["disk_hits"] += 1
+
+            self.stats["misses"] += len({k for k in keys if k not in found})
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+            if self._conn is not None:
+                try:
+                    with self._conn:
+                        self._conn.executemany(
+                            f"INSERT OR REPLACE INTO {self.table} (key, {self.column}) VALUES (?, ?)",
+                            [(key, self._encode(value)) for key, value in items.items()]
+                        )
+                except sqlite3.Error as e:
+                    print(f"❌ Gagal menyimpan {self.label}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "memory_size": len(self._memory)}
+
+    # ---------- internal ----------
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _open_db(self, cache_path: str, column_type: str) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(cache_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                         f"(key TEXT PRIMARY KEY, {self.column} {column_type} NOT NULL)")
+            return conn
+        except sqlite3.Error as e:
+            # Cache disk hanya optimasi: jika gagal, tetap jalan dengan cache memori saja
+            print(f"❌ {self.label.capitalize()} disk tidak tersedia: {str(e)}")
+            return None
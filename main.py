@@ -1,29 +1,21 @@
 # File utama aplikasi Chatbot Kesehatan Mental AI
 
 import os
+import uuid
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
 import streamlit as st
 
-# Import library LangChain dan lainnya
-from langchain_core.tools import Tool
-from langchain.memory import ConversationBufferMemory
-from langchain_google_genai import ChatGoogleGenerativeAI
-from google.api_core.exceptions import GoogleAPICallError
-from googlesearch import search
-from typing import Optional
-from langchain_cohere import CohereEmbeddings
-
-# Import komponen lokal
-from retriever import FaissRetriever
-from mental_health_processor import extract_mental_health_document
+# Import komponen lokal. Streamlit menjalankan ulang skrip ini di setiap interaksi, jadi hanya
+# modul yang dibutuhkan setiap giliran yang diimpor di sini; stack PDF, SDK Cohere/Gemini,
+# penerjemah dan pencarian web dimuat saat fiturnya pertama dipakai.
+from multi_index import MultiIndexRetriever
+from agent import get_answer_cache, run_agent
 from callback_handler import GeminiCallbackHandler
-
-# Import semua fungsi dari tools
-from tools.date_tools import show_current_date
-from tools.cooping_tools import get_coping_tips
-from tools.pscyologist_tools import get_professional_help
-from tools.save_history import save_chat_history
-from tools.translate_tools import TranslationService
+from clients import get_chat_model, get_client_stats
+from conversation_memory import TokenBudgetMemory, make_llm_summarizer
+import tracing
 
 # Load environment variables di awal
 load_dotenv()
@@ -32,66 +24,67 @@ def load_css():
     with open("style.css") as f:
         st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-def get_google_search_results(query: str) -> str:
+MAX_SESSION_MESSAGES = 50
+HISTORY_PREVIEW_MESSAGES = 20
+
+def load_retriever() -> MultiIndexRetriever:
+    # Shard FAQ, pedoman klinis, dan layanan bantuan; shard yang belum dibangun dilewati
+    retriever = MultiIndexRetriever()
+    retriever.warm_up()
+    return retriever
+
+@st.cache_resource
+def start_retriever_warmup() -> Future:
+    """Dimulai sekali per proses server (run pertama); UI sudah tampil selagi index dimuat"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retriever-warmup")
+    future = executor.submit(load_retriever)
+    executor.shutdown(wait=False)
+    return future
+
+@st.cache_resource
+def get_summarizer_executor() -> ThreadPoolExecutor:
+    # Ringkasan bergulir memanggil Gemini; dijalankan di luar thread skrip agar pesan berikutnya tidak menunggu
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summarize")
+
+def summarize_memory(memory: TokenBudgetMemory, api_key: str) -> None:
     try:
-        num_results = 10
-        results = list(search(query, num_results=num_results, lang="id"))
-        if not results:
-            return f"Maaf, saya tidak dapat menemukan hasil yang relevan di Google untuk '{query}'."
-
-        url_list = "\n".join([f"{i+1}. {url}" for i, url in enumerate(results)])
-        final_answer = (
-            f"Tentu, berikut adalah {len(results)} hasil pencarian teratas untuk '{query}':\n"
-            f"{url_list}\n\n"
-            "**Penting**: Harap evaluasi sendiri kredibilitas dan keakuratan informasi dari situs-situs tersebut."
-        )
-        return final_answer
+        memory.maybe_summarize(make_llm_summarizer(get_chat_model(api_key)))
     except Exception as e:
-        return f"Terjadi kesalahan saat melakukan pencarian Google: {str(e)}"
-
-def run_agent(user_input: str, retriever: FaissRetriever, pdf_content: Optional[str] = None) -> str:
-    gemini_handler = GeminiCallbackHandler()
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        google_api_key=st.session_state.gemini_api_key,
-        temperature=0.2,
-        callbacks=[gemini_handler],
-        convert_system_message_to_human=True
-    )
+        print(f"❌ Gagal meringkas percakapan: {str(e)}")
 
+def get_retriever() -> MultiIndexRetriever:
+    future = start_retriever_warmup()
     try:
-        if pdf_content:
-            prompt = f"""
-            Kamu adalah asisten kesehatan mental. Berdasarkan dokumen berikut, jawab pertanyaan pengguna:
-
-            --- DOKUMEN ---
-            {pdf_content}
-            --- AKHIR DOKUMEN ---
-
-            Pertanyaan: {user_input}
-            """
-            return str(llm.invoke(prompt).content)
-
-        retriever_result = retriever.search(user_input, k=3)
-        context = "\n".join([doc.page_content for doc in retriever_result]) if retriever_result else ""
-
-        if context.strip():
-            prompt = f"""
-            Kamu adalah asisten kesehatan mental. Berdasarkan data berikut, jawab pertanyaan pengguna:
-
-            --- DATABASE ---
-            {context}
-            --- AKHIR DATABASE ---
-
-            Pertanyaan: {user_input}
-            """
-            return str(llm.invoke(prompt).content)
-
-        st.info("🔍 Jawaban tidak ditemukan di database. Mencoba mencari dari internet...")
-        return get_google_search_results(user_input)
-
-    except Exception as e:
-        return f"❌ Terjadi kesalahan: {str(e)}"
+        if not future.done():
+            with st.spinner("Memuat database pengetahuan..."):
+                retriever = future.result()
+        else:
+            retriever = future.result()
+        # Shard yang dibangun ulang (create_index.py --shard ...) dimuat tanpa restart app
+        retriever.reload_if_changed()
+        return retriever
+    except Exception:
+        # Jangan simpan kegagalan di cache: interaksi berikutnya mencoba memuat ulang
+        start_retriever_warmup.clear()
+        raise
+
+def render_debug_panel(limit: int = 10):
+    with st.expander("🛠️ Debug: Timeline Request"):
+        traces = tracing.get_recent_traces(limit)
+        if not traces:
+            st.write("Belum ada request.")
+        for trace in traces:
+            route = trace["attributes"].get("route", "-")
+            st.markdown(f"**{trace['name']}** · `{route}` · {trace['duration'] * 1000:.0f} ms")
+            st.table([
+                {
+                    "tahap": span_record["name"],
+                    "mulai (ms)": round(span_record["start"] * 1000),
+                    "durasi (ms)": round(span_record["duration"] * 1000),
+                    "info": ", ".join(f"{k}={v}" for k, v in span_record["attributes"].items()),
+                }
+                for span_record in trace["spans"]
+            ])
 
 def main():
     st.set_page_config(page_title="Asisten Kesehatan Mental AI", page_icon="🧠", layout="centered")
@@ -117,18 +110,17 @@ Anda bisa bertanya tentang data kesehatan mental umum dari database kami, sepert
 
     if "messages" not in st.session_state:
         st.session_state.messages = [{"role": "assistant", "content": initial_greeting}]
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     if "memory" not in st.session_state:
-        st.session_state.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+        st.session_state.memory = TokenBudgetMemory(session_id=st.session_state.session_id)
     if "processed_file_name" not in st.session_state:
         st.session_state.processed_file_name = None
-    if "pdf_content" not in st.session_state:
-        st.session_state.pdf_content = None
-
-    @st.cache_resource
-    def init_retriever():
-        return FaissRetriever(index_path="data/faiss_index")
+    if "doc_index" not in st.session_state:
+        st.session_state.doc_index = None
 
-    retriever = init_retriever()
+    start_retriever_warmup()
+    tracing.start_metrics_server()
 
     with st.sidebar:
         st.subheader("🔐 API Key Gemini")
@@ -141,33 +133,86 @@ Anda bisa bertanya tentang data kesehatan mental umum dari database kami, sepert
         st.header("Analisis Dokumen")
         uploaded_file = st.file_uploader("Upload PDF Dokumen Kesehatan Mental", type=['pdf'], key="pdf_uploader")
         if uploaded_file and uploaded_file.name != st.session_state.get('processed_file_name'):
-            with st.spinner("Memproses dokumen..."):
-                doc_info = extract_mental_health_document(uploaded_file)
-                if 'error' in doc_info:
-                    st.error(doc_info['error'])
+            with st.spinner("Memproses dokumen..."), tracing.start_trace("pdf_upload", file_bytes=uploaded_file.size):
+                from document_index import build_document_index, get_cached_document_index
+                from mental_health_processor import extract_mental_health_document
+                pdf_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+                # File yang sama pernah diunggah: pakai index yang sudah ada, tanpa ekstraksi ulang
+                doc_index = get_cached_document_index(pdf_hash)
+                error = None
+                if doc_index is None:
+                    progress_bar = st.progress(0.0, text="Membaca halaman PDF...")
+                    doc_info = extract_mental_health_document(
+                        uploaded_file,
+                        on_progress=lambda done, total: progress_bar.progress(
+                            done / total, text=f"Membaca halaman {done}/{total}..."
+                        )
+                    )
+                    progress_bar.empty()
+                    if 'error' in doc_info:
+                        error = doc_info['error']
+                    else:
+                        if doc_info.get('truncated'):
+                            st.warning(f"Dokumen terlalu panjang, hanya {doc_info['pages_read']} halaman pertama yang diproses.")
+                        try:
+                            doc_index = build_document_index(pdf_hash, doc_info.get('full_text'), get_retriever().embeddings)
+                        except Exception as e:
+                            error = f"Gagal mengindeks dokumen: {str(e)}"
+
+                if error:
+                    st.error(error)
                     st.session_state.processed_file_name = None
                 else:
-                    st.session_state.pdf_content = doc_info.get('full_text')
+                    st.session_state.doc_index = doc_index
                     st.session_state.processed_file_name = uploaded_file.name
                     st.success("Dokumen berhasil diproses!")
                     st.session_state.messages.append({"role": "system", "content": f"Dokumen '{uploaded_file.name}' telah diunggah. Anda sekarang bisa bertanya mengenai isinya."})
 
+        st.session_state.include_faq = st.checkbox(
+            "Sertakan database FAQ saat bertanya tentang dokumen",
+            value=st.session_state.get("include_faq", False)
+        )
+
         st.divider()
         with st.expander("📜 Riwayat Percakapan"):
             if not st.session_state.messages:
                 st.write("Belum ada percakapan.")
             else:
-                for msg in st.session_state.messages:
+                # Hanya pesan terbaru yang dirender ulang; riwayat lengkap di disk jika CHAT_HISTORY_PERSIST=true
+                for msg in st.session_state.messages[-HISTORY_PREVIEW_MESSAGES:]:
                     if msg["role"] != "system":
                         st.markdown(f'**{msg["role"].replace("user", "Anda").replace("assistant", "AI")}:** *{msg["content"][:40]}...*')
 
         if st.button("Hapus Riwayat & Dokumen", type="secondary", key="delete_history"):
             st.session_state.messages = [{"role": "assistant", "content": "Riwayat chat dan dokumen telah dihapus. Silakan mulai percakapan baru."}]
             st.session_state.memory.clear()
-            st.session_state.pdf_content = None
+            st.session_state.doc_index = None
             st.session_state.processed_file_name = None
             st.rerun()
 
+        with st.expander("📊 Statistik Cache Jawaban"):
+            cache_stats = get_answer_cache().get_stats()
+            st.caption(
+                f"Hit: {cache_stats['hits']} (exact {cache_stats['exact_hits']}, semantik {cache_stats['semantic_hits']}) · "
+                f"Miss: {cache_stats['misses']} · Hit rate: {cache_stats['hit_rate']:.0%} · Entri: {cache_stats['size']}"
+            )
+            client_stats = get_client_stats()
+            st.caption(
+                f"Client dibuat: {client_stats['created']} · dipakai ulang: {client_stats['reused']} · "
+                f"waktu setup dihemat: {client_stats['saved_seconds']:.2f} dtk"
+            )
+            from tools.google_tools import get_web_search_service
+            search_stats = get_web_search_service().get_stats()
+            st.caption(
+                f"Pencarian web — hit: {search_stats['hits']} · miss: {search_stats['misses']} · "
+                f"digabung: {search_stats['coalesced']} · timeout: {search_stats['timeouts']} · "
+                f"circuit: {search_stats['circuit']}"
+            )
+
+        # Panel debug tersembunyi: buka dengan ?debug=1 di URL atau DEBUG_PANEL=true
+        if st.query_params.get("debug") == "1" or os.getenv("DEBUG_PANEL", "false").lower() == "true":
+            render_debug_panel()
+
     for message in st.session_state.messages:
         if message.get("role") != "system":
             avatar = "🧑‍💻" if message["role"] == "user" else "🧠"
@@ -182,10 +227,28 @@ Anda bisa bertanya tentang data kesehatan mental umum dari database kami, sepert
         with st.chat_message("assistant", avatar="🧠"):
             with st.spinner("Asisten sedang berpikir..."):
                 try:
-                    pdf_context = st.session_state.get("pdf_content")
-                    response_text = run_agent(user_input, retriever, pdf_content=pdf_context)
-                    st.markdown(response_text)
+                    memory = st.session_state.memory
+                    gemini_handler = GeminiCallbackHandler()
+                    response_text = run_agent(
+                        user_input, get_retriever(),
+                        doc_index=st.session_state.get("doc_index"),
+                        include_faq=st.session_state.get("include_faq", False),
+                        callback_handler=gemini_handler,
+                        conversation_context=memory.get_prompt_context(),
+                        api_key=st.session_state.gemini_api_key,
+                        notify=st.info
+                    )
+                    # Jawaban streaming sudah dirender oleh handler; sisanya (cache, Google) dirender di sini
+                    if not gemini_handler.rendered:
+                        st.markdown(response_text)
                     st.session_state.messages.append({"role": "assistant", "content": response_text})
+                    # Pesan di session_state dibatasi; yang lebih lama hanya ada di disk & ringkasan
+                    st.session_state.messages = st.session_state.messages[-MAX_SESSION_MESSAGES:]
+
+                    memory.add_turn("user", user_input)
+                    memory.add_turn("assistant", response_text)
+                    # Ringkasan bergulir dibuat di latar belakang, jadi tidak menambah latensi
+                    get_summarizer_executor().submit(summarize_memory, memory, st.session_state.gemini_api_key)
                 except Exception as e:
                     st.error(f"Maaf, terjadi kesalahan fatal: {e}")
                     st.session_state.messages.pop()
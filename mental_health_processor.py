@@ -1,109 +1,282 @@
 # mental_health_chatbot/mental_health_processor.py
-import PyPDF2
-import pdfplumber
-from typing import Dict, Union
+# pdfplumber/PyPDF2 diimpor saat PDF pertama diproses, bukan saat aplikasi start
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import re
-import io
+import tempfile
+import threading
+
+import tracing
+
+# Batas default agar upload besar tidak memblokir Streamlit terlalu lama / menghabiskan memori
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "300"))
+MAX_PDF_BYTES = int(os.getenv("MAX_PDF_BYTES", str(50 * 1024 * 1024)))
+PAGES_PER_TASK = 8
+PARALLEL_MIN_PAGES = 16  # di bawah ini, overhead process pool lebih mahal dari ekstraksinya
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+_pool_lock = threading.Lock()
+_page_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Process pool dipakai ulang antar upload (membuat proses baru itu mahal). Worker dimulai dengan
+    "spawn": fork di server Streamlit yang multithread bisa mewarisi lock yang sedang dipegang thread lain"""
+    global _page_pool
+    with _pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return _page_pool
+
+def _count_pages(pdf_path: str) -> int:
+    import pdfplumber
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+    except Exception as pdfplumber_error:
+        print(f"pdfplumber error: {pdfplumber_error}, trying PyPDF2...")
+        import PyPDF2
+        return len(PyPDF2.PdfReader(pdf_path).pages)
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Ekstrak teks halaman [start, end) - dijalankan di proses worker"""
+    import pdfplumber
+    try:
+        # Coba dengan pdfplumber terlebih dahulu untuk presisi
+        with pdfplumber.open(pdf_path) as pdf:
+            return [(i + 1, pdf.pages[i].extract_text() or "") for i in range(start, end)]
+    except Exception as pdfplumber_error:
+        print(f"pdfplumber error: {pdfplumber_error}, trying PyPDF2...")
+        # Fallback ke PyPDF2
+        import PyPDF2
+        pdf_reader = PyPDF2.PdfReader(pdf_path)
+        return [(i + 1, pdf_reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+def iter_pdf_pages(pdf_path: str, max_pages: int = MAX_PDF_PAGES,
+                   on_progress: Optional[Callable[[int, int], None]] = None,
+                   page_count: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Generator (nomor_halaman, teks) berurutan; halaman diekstrak paralel per rentang"""
+    if page_count is None:
+        page_count = _count_pages(pdf_path)
+    total_pages = min(page_count, max_pages)
+    ranges = [(start, min(start + PAGES_PER_TASK, total_pages))
+              for start in range(0, total_pages, PAGES_PER_TASK)]
+
+    if total_pages < PARALLEL_MIN_PAGES:
+        results = (_extract_page_range(pdf_path, start, end) for start, end in ranges)
+    else:
+        pool = _get_page_pool()
+        futures = [pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+        results = (future.result() for future in futures)
+
+    done = 0
+    for pages in results:
+        for page_no, page_text in pages:
+            done += 1
+            if on_progress:
+                on_progress(done, total_pages)
+            yield page_no, page_text
+
+def _format_size(num_bytes: int) -> str:
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.1f} MB"
+    return f"{num_bytes / 1024:.1f} KB"
+
+def spool_to_tempfile(file_stream, max_bytes: int = MAX_PDF_BYTES) -> str:
+    """Salin stream ke file sementara per potongan, tanpa memuat semuanya ke memori"""
+    written = 0
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        try:
+            while True:
+                chunk = file_stream.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ValueError(f"Ukuran file melebihi batas {_format_size(max_bytes)}")
+                tmp.write(chunk)
+        except Exception:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name
+
+DEFAULT_MENTAL_HEALTH_KEYWORDS = (
+    'mental health', 'depression', 'anxiety', 'stress',
+    'psikologis', 'depresi', 'kecemasan', 'gangguan mood',
+    'terapi', 'konseling', 'skrining', 'diagnosis', 'DSM-5'
+)
+KEYWORD_LEXICON_PATH = os.getenv("MENTAL_HEALTH_KEYWORDS_PATH")
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+def load_keyword_lexicon(path: str) -> List[str]:
+    """Baca leksikon keyword: satu keyword per baris, baris '#' diabaikan"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def _trie_regex(keywords: List[str]) -> str:
+    """Gabungkan keyword jadi satu regex berbentuk trie (prefix bersama difaktorkan),
+    sehingga biaya pencocokan per karakter tidak naik linear dengan jumlah keyword"""
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Keyword yang berakhir di sini bersifat opsional; regex serakah memilih kecocokan terpanjang
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+class KeywordMatcher:
+    """Pencocok multi-keyword yang dikompilasi sekali (satu regex, satu kali lewat per teks)"""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self._canonical = {k.lower(): k for k in self.keywords}
+        self.pattern = re.compile(_trie_regex(self.keywords), re.IGNORECASE) if self.keywords else None
+
+    def contains(self, text: str) -> bool:
+        return bool(self.pattern and self.pattern.search(text))
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in self.pattern.finditer(text)) if self.pattern else 0
+
+    def highlight(self, text: str) -> str:
+        if not self.pattern:
+            return text
+        return self.pattern.sub(lambda m: f"**{self._canonical.get(m.group(0).lower(), m.group(0)).upper()}**", text)
+
+    def analyze(self, text: str, max_sentences: int = 3) -> Tuple[int, List[str]]:
+        """Satu kali lewat: skor relevansi (jumlah kecocokan) + kalimat relevan pertama"""
+        score = 0
+        relevant_sentences = []
+        for sentence in SENTENCE_SPLIT.split(text):
+            hits = self.count(sentence)
+            if hits:
+                score += hits
+                if len(relevant_sentences) < max_sentences:
+                    relevant_sentences.append(sentence)
+        return score, relevant_sentences
+
+_matcher_lock = threading.Lock()
+_matcher_cache: Dict[Tuple[str, ...], KeywordMatcher] = {}
+
+def get_keyword_matcher(keywords) -> KeywordMatcher:
+    """Matcher dipakai ulang antar dokumen untuk leksikon yang sama"""
+    key = tuple(keywords)
+    with _matcher_lock:
+        if key not in _matcher_cache:
+            _matcher_cache[key] = KeywordMatcher(key)
+        return _matcher_cache[key]
 
 class MentalHealthDocumentProcessor:
     """Processor khusus untuk dokumen kesehatan mental (PDF)"""
     
-    def __init__(self):
-        self.mental_health_keywords = [
-            'mental health', 'depression', 'anxiety', 'stress', 
-            'psikologis', 'depresi', 'kecemasan', 'gangguan mood',
-            'terapi', 'konseling', 'skrining', 'diagnosis', 'DSM-5'
-        ]
-
-    def extract_text_from_pdf(self, file_stream) -> Dict[str, Union[str, dict]]:
+    def __init__(self, keywords: Optional[List[str]] = None, lexicon_path: Optional[str] = KEYWORD_LEXICON_PATH):
+        if keywords is None:
+            keywords = load_keyword_lexicon(lexicon_path) if lexicon_path else list(DEFAULT_MENTAL_HEALTH_KEYWORDS)
+        self.mental_health_keywords = keywords
+        self.matcher = get_keyword_matcher(keywords)
+
+    @tracing.traced("pdf_extract")
+    def extract_text_from_pdf(self, file_stream, on_progress: Optional[Callable[[int, int], None]] = None,
+                              max_pages: int = MAX_PDF_PAGES,
+                              max_bytes: int = MAX_PDF_BYTES) -> Dict[str, Union[str, dict]]:
         """Ekstrak teks dari PDF dengan prioritas konten kesehatan mental"""
         try:
-            # Coba dengan pdfplumber terlebih dahulu untuk presisi
-            with pdfplumber.open(file_stream) as pdf:
-                full_text = ""
-                mental_health_pages = {}
-                
-                for i, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                        
-                        # Deteksi halaman relevan
-                        if self._is_mental_health_content(page_text):
-                            mental_health_pages[i+1] = self._summarize_page(page_text)
-                
-                # Jika menemukan konten spesifik kesehatan mental
-                if mental_health_pages:
-                    highlighted_content = self._highlight_keywords(full_text)
-                    return {
-                        'status': 'success',
-                        'full_text': full_text,
-                        'mental_health_pages': mental_health_pages,
-                        'highlighted_content': highlighted_content,
-                        'summary': self._generate_summary(full_text)
-                    }
-                else:
-                    return {
-                        'status': 'success',
-                        'full_text': full_text,
-                        'summary': self._generate_summary(full_text)
-                    }
-
-        except Exception as pdfplumber_error:
-            print(f"pdfplumber error: {pdfplumber_error}, trying PyPDF2...")
-            try:
-                # Fallback ke PyPDF2
-                file_stream.seek(0)
-                pdf_reader = PyPDF2.PdfReader(file_stream)
-                full_text = ""
-                
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                
-                return {
-                    'status': 'success',
-                    'full_text': full_text,
-                    'summary': self._generate_summary(full_text)
-                }
-                
-            except Exception as e:
-                return {
-                    'status': 'error',
-                    'error': f"Gagal memproses PDF: {str(e)}"
-                }
+            pdf_path = spool_to_tempfile(file_stream, max_bytes=max_bytes)
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f"Gagal memproses PDF: {str(e)}"
+            }
+
+        try:
+            text_parts = []
+            mental_health_pages = {}
+            page_scores = {}
+            relevant_paras = []
+            pages_read = 0
+            page_count = _count_pages(pdf_path)
+
+            for page_no, page_text in iter_pdf_pages(pdf_path, max_pages=max_pages,
+                                                     on_progress=on_progress, page_count=page_count):
+                pages_read += 1
+                if page_text:
+                    text_parts.append(page_text)
+
+                    # Deteksi halaman relevan + skor + ringkasan dalam satu kali lewat
+                    score, sentences = self.matcher.analyze(page_text)
+                    if score:
+                        page_scores[page_no] = score
+                        mental_health_pages[page_no] = " ".join(sentences) + "..."
+                        if len(relevant_paras) < 3:
+                            relevant_paras.extend(self._relevant_paragraphs(page_text, 3 - len(relevant_paras)))
+
+            full_text = "\n".join(text_parts) + "\n" if text_parts else ""
+            result = {
+                'status': 'success',
+                'full_text': full_text,
+                'summary': self._format_summary(relevant_paras),
+                'pages_read': pages_read
+            }
+            if page_count > max_pages:
+                result['truncated'] = True
+            tracing.set_attributes(pages=pages_read, chars=len(full_text))
+
+            # Jika menemukan konten spesifik kesehatan mental
+            if mental_health_pages:
+                result['mental_health_pages'] = mental_health_pages
+                result['page_scores'] = page_scores
+                result['highlighted_content'] = self._highlight_keywords(full_text)
+            return result
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f"Gagal memproses PDF: {str(e)}"
+            }
+        finally:
+            os.remove(pdf_path)
 
     def _is_mental_health_content(self, text: str) -> bool:
         """Deteksi apakah teks mengandung konten kesehatan mental"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.mental_health_keywords)
+        return self.matcher.contains(text)
 
     def _highlight_keywords(self, text: str) -> str:
         """Highlight keyword kesehatan mental dalam teks"""
-        highlighted = text
-        for keyword in self.mental_health_keywords:
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            highlighted = pattern.sub(f"**{keyword.upper()}**", highlighted)
-        return highlighted
+        return self.matcher.highlight(text)
 
     def _summarize_page(self, page_text: str) -> str:
         """Ringkas halaman yang relevan"""
-        sentences = re.split(r'(?<=[.!?])\s+', page_text)
-        relevant_sentences = [
-            s for s in sentences 
-            if any(keyword.lower() in s.lower() for keyword in self.mental_health_keywords)
-        ]
-        return " ".join(relevant_sentences[:3]) + "..." if relevant_sentences else ""
+        _, relevant_sentences = self.matcher.analyze(page_text)
+        return " ".join(relevant_sentences) + "..." if relevant_sentences else ""
+
+    def _relevant_paragraphs(self, text: str, limit: int = 3) -> List[str]:
+        relevant_paras = []
+        for para in text.split('\n'):
+            if len(relevant_paras) >= limit:
+                break
+            if para.strip() and self.matcher.contains(para):
+                relevant_paras.append(para)
+        return relevant_paras
 
     def _generate_summary(self, text: str) -> str:
         """Buat ringkasan dokumen yang fokus pada aspek kesehatan mental"""
-        paragraphs = [p for p in text.split('\n') if p.strip()]
-        relevant_paras = [
-            p for p in paragraphs 
-            if self._is_mental_health_content(p)
-        ][:3]
-        
+        return self._format_summary(self._relevant_paragraphs(text))
+
+    @staticmethod
+    def _format_summary(relevant_paras: List[str]) -> str:
         if not relevant_paras:
             return "Dokumen ini tidak memiliki konten kesehatan mental yang terdeteksi."
         
@@ -117,7 +290,8 @@ class MentalHealthDocumentProcessor:
         ])
 
 # Fungsi untuk kompatibilitas dengan Streamlit
-def extract_mental_health_document(uploaded_file):
+def extract_mental_health_document(uploaded_file, on_progress: Optional[Callable[[int, int], None]] = None):
     processor = MentalHealthDocumentProcessor()
-    file_stream = io.BytesIO(uploaded_file.read())
-    return processor.extract_text_from_pdf(file_stream)
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    return processor.extract_text_from_pdf(uploaded_file, on_progress=on_progress)
@@ -0,0 +1,166 @@
+# mmap_store.py
+# Format index "aman": vektor FAISS dibuka via mmap + teks/metadata chunk di SQLite (tanpa pickle)
+
+import os
+import json
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+# langchain_community (berat) hanya dibutuhkan saat build index dan MMR, jadi diimpor di fungsinya;
+# jalur pencarian biasa di app cukup faiss + sqlite
+FAISS_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+
+
+def is_mmap_index(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, DOCSTORE_FILE))
+
+
+def save_mmap_index(vectorstore: "FAISS", index_dir: str) -> None:
+    """Tulis LangChain FAISS ke format aman: index.faiss + docstore.sqlite"""
+    os.makedirs(index_dir, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(index_dir, FAISS_FILE))
+
+    docstore_path = os.path.join(index_dir, DOCSTORE_FILE)
+    if os.path.exists(docstore_path):
+        os.remove(docstore_path)
+    conn = sqlite3.connect(docstore_path)
+    try:
+        with conn:
+            conn.execute(
+                "CREATE TABLE chunks (pos INTEGER PRIMARY KEY, doc_id TEXT UNIQUE NOT NULL, "
+                "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            rows = []
+            for pos, doc_id in sorted(vectorstore.index_to_docstore_id.items()):
+                doc = vectorstore.docstore.search(doc_id)
+                rows.append((pos, doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False)))
+            conn.executemany("INSERT INTO chunks (pos, doc_id, text, metadata) VALUES (?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+
+
+def load_mmap_index_as_faiss(index_dir: str, embeddings: Embeddings) -> "FAISS":
+    """Muat format aman sebagai LangChain FAISS biasa (di RAM) - dipakai build inkremental"""
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    index = faiss.read_index(os.path.join(index_dir, FAISS_FILE))
+    conn = sqlite3.connect(os.path.join(index_dir, DOCSTORE_FILE))
+    try:
+        rows = conn.execute("SELECT pos, doc_id, text, metadata FROM chunks ORDER BY pos").fetchall()
+    finally:
+        conn.close()
+
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=text, metadata=json.loads(metadata)) for _, doc_id, text, metadata in rows
+    })
+    index_to_docstore_id = {pos: doc_id for pos, doc_id, _, _ in rows}
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def search_index(index: faiss.Index, embeddings, k: int,
+                 params: Optional[faiss.SearchParameters] = None) -> List[List[Tuple[int, float]]]:
+    """(posisi, jarak) per query; params (nprobe/efSearch) hanya berlaku untuk panggilan ini"""
+    scores, positions = index.search(np.asarray(embeddings, dtype=np.float32), k, params=params)
+    return [
+        [(int(pos), float(score)) for pos, score in zip(row_pos, row_scores) if pos != -1]
+        for row_pos, row_scores in zip(positions, scores)
+    ]
+
+
+def select_mmr(index: faiss.Index, embedding, hits: List[Tuple[int, float]], k: int,
+               lambda_mult: float) -> List[Tuple[int, float]]:
+    """Pilih k hasil yang beragam (MMR) dari kandidat hits, memakai vektor yang disimpan di index"""
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance
+    if not hits:
+        return []
+    candidates = np.vstack([index.reconstruct(pos) for pos, _ in hits])
+    selected = maximal_marginal_relevance(
+        np.asarray(embedding, dtype=np.float32), candidates, k=k, lambda_mult=lambda_mult
+    )
+    return [hits[i] for i in selected if i != -1]
+
+
+class MmapFaissStore:
+    """Vector store read-only: vektor di-mmap (dibagi antar proses lewat page cache),
+    teks chunk dibaca dari SQLite hanya untuk hasil yang dikembalikan"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.index = self._read_index(os.path.join(index_dir, FAISS_FILE))
+
+        docstore_uri = f"file:{os.path.abspath(os.path.join(index_dir, DOCSTORE_FILE))}?mode=ro"
+        self._conn = sqlite3.connect(docstore_uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_index(path: str) -> faiss.Index:
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError as e:
+            # Tipe index yang belum mendukung mmap tetap bisa dimuat biasa
+            print(f"⚠️ mmap tidak didukung untuk index ini ({str(e)}), memuat ke memori...")
+            return faiss.read_index(path)
+
+    # ---------- lookup dokumen ----------
+    def _fetch(self, column: str, keys: Iterable) -> Dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {column}, doc_id, text, metadata FROM chunks WHERE {column} IN ({placeholders})", keys
+            ).fetchall()
+        return {
+            key: Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+            for key, doc_id, text, metadata in rows
+        }
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        found = self._fetch("doc_id", ids)
+        return [found[doc_id] for doc_id in ids if doc_id in found]
+
+    # ---------- pencarian (API sama dengan LangChain FAISS) ----------
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4,
+                                               params: Optional[faiss.SearchParameters] = None,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        hits = search_index(self.index, [embedding], k, params)[0]
+        docs = self._fetch("pos", (pos for pos, _ in hits))
+        return [(docs[pos], score) for pos, score in hits if pos in docs]
+
+    def similarity_search_with_score_by_vectors(self, embeddings, k: int = 4,
+                                                params: Optional[faiss.SearchParameters] = None
+                                                ) -> List[List[Tuple[Document, float]]]:
+        """Banyak query sekaligus: satu pencarian matriks dan satu lookup SQLite"""
+        if len(embeddings) == 0:
+            return []
+        batches = search_index(self.index, embeddings, k, params)
+        docs = self._fetch("pos", {pos for hits in batches for pos, _ in hits})
+        return [[(docs[pos], score) for pos, score in hits if pos in docs] for hits in batches]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def max_marginal_relevance_search_with_score_by_vector(self, embedding, k: int = 4, fetch_k: int = 20,
+                                                           lambda_mult: float = 0.5,
+                                                           params: Optional[faiss.SearchParameters] = None,
+                                                           **kwargs) -> List[Tuple[Document, float]]:
+        hits = search_index(self.index, [embedding], fetch_k, params)[0]
+        chosen = select_mmr(self.index, embedding, hits, k, lambda_mult)
+        docs = self._fetch("pos", (pos for pos, _ in chosen))
+        return [(docs[pos], score) for pos, score in chosen if pos in docs]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
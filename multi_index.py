@@ -0,0 +1,223 @@
+# multi_index.py
+# Retriever multi-shard: beberapa index FAISS bernama (FAQ, pedoman klinis, daftar layanan bantuan)
+# dicari paralel dengan satu embedding query bersama, hasil digabung berdasarkan skor
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from bm25_index import CorpusStats, tokenize
+from clients import get_cohere_embeddings
+from index_pointer import resolve_index_dir
+from faq_index import FAQ_INDEX_DIR, FAQ_MATCH_THRESHOLD, FaqMatch
+from retriever import DEFAULT_SCORE_THRESHOLD, RRF_FETCH_K, USE_HYBRID, FaissRetriever
+import tracing
+
+SHARDS_DIR = "data/shards"
+FAQ_SHARD = "faq"
+DEFAULT_SHARDS = {
+    FAQ_SHARD: "data/faiss_index",
+    "guidelines": os.path.join(SHARDS_DIR, "guidelines"),
+    "resources": os.path.join(SHARDS_DIR, "resources"),
+}
+
+
+def _dir_signature(path: str) -> Optional[Tuple[int, int]]:
+    # create_index.py menerbitkan tiap build sebagai folder versi baru, jadi inode/mtime ikut berubah
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class MultiIndexRetriever:
+    """API pencarian sama dengan FaissRetriever (embed_query, hybrid_search, match_faq, ...),
+    sehingga agent tidak perlu tahu berapa shard yang ada"""
+
+    def __init__(self, shards: Optional[Dict[str, str]] = None, embeddings: Optional[Embeddings] = None,
+                 max_workers: Optional[int] = None):
+        if embeddings is None:
+            cohere_api_key = os.getenv("COHERE_API_KEY")
+            if not cohere_api_key:
+                load_dotenv()
+                cohere_api_key = os.getenv("COHERE_API_KEY")
+            if not cohere_api_key:
+                raise ValueError("❌ COHERE_API_KEY tidak ditemukan di .env")
+            embeddings = get_cohere_embeddings(cohere_api_key)
+        self.embeddings = embeddings
+
+        self.shard_paths = dict(shards or DEFAULT_SHARDS)
+        self._lock = threading.Lock()
+        self._shards: Dict[str, FaissRetriever] = {}
+        self._signatures: Dict[str, Optional[Tuple[int, int]]] = {}
+        for name in self.shard_paths:
+            self._load_shard(name)
+        if not self._shards:
+            raise FileNotFoundError(f"❌ Tidak ada shard index yang bisa dimuat: {self.shard_paths}")
+
+        # FAISS melepas GIL saat search, jadi thread pool cukup untuk paralelisme antar shard
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(4, 2 * len(self.shard_paths)),
+                                            thread_name_prefix="shard-search")
+
+    # ---------- shard ----------
+    @property
+    def shards(self) -> Dict[str, FaissRetriever]:
+        with self._lock:
+            return dict(self._shards)
+
+    def reload_shard(self, name: str, path: Optional[str] = None) -> bool:
+        """Muat ulang satu shard (mis. setelah create_index.py) tanpa restart; shard lain tetap melayani"""
+        if path is not None:
+            self.shard_paths[name] = path
+        return self._load_shard(name)
+
+    def reload_if_changed(self) -> List[str]:
+        """Cek murah (os.stat per shard); shard yang foldernya berganti dimuat ulang"""
+        reloaded = []
+        for name, path in list(self.shard_paths.items()):
+            if _dir_signature(resolve_index_dir(path)) != self._signatures.get(name) and self._load_shard(name):
+                reloaded.append(name)
+        return reloaded
+
+    def _load_shard(self, name: str) -> bool:
+        # Resolusi sekali: signature dan isi shard berasal dari versi yang sama
+        path = resolve_index_dir(self.shard_paths[name])
+        signature = _dir_signature(path)
+        if signature is None:
+            print(f"⚠️ Shard '{name}' dilewati: folder {path} tidak ditemukan")
+            self._signatures[name] = None
+            return False
+        try:
+            # Index jawaban FAQ hanya relevan untuk shard FAQ
+            shard = FaissRetriever(path, embeddings=self.embeddings,
+                                   faq_index_path=FAQ_INDEX_DIR if name == FAQ_SHARD else None)
+        except Exception as e:
+            print(f"❌ Gagal memuat shard '{name}': {str(e)}")
+            self._signatures[name] = signature  # dicoba lagi saat folder berganti, bukan tiap rerun
+            return False
+        # Pencarian yang sedang berjalan tetap memakai objek lama sampai selesai
+        with self._lock:
+            self._shards[name] = shard
+            self._signatures[name] = signature
+        print(f"✅ Shard '{name}' dimuat dari {path}")
+        return True
+
+    def warm_up(self) -> None:
+        for shard in self.shards.values():
+            shard.warm_up()
+
+    # ---------- API FaissRetriever ----------
+    def embed_query(self, query: str):
+        if not query:
+            raise ValueError("Query tidak boleh kosong")
+        return self.embeddings.embed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is not None:
+            return embed_queries(queries)
+        return [self.embeddings.embed_query(query) for query in queries]
+
+    def match_faq(self, embedding, threshold: float = FAQ_MATCH_THRESHOLD) -> Optional[FaqMatch]:
+        faq = self.shards.get(FAQ_SHARD)
+        return faq.match_faq(embedding, threshold) if faq is not None else None
+
+    def search(self, query: str, k: int = 3,
+               score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD) -> List[Document]:
+        return self.search_by_vector(self.embed_query(query), k, score_threshold)
+
+    def search_by_vector(self, embedding, k: int = 3,
+                         score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD) -> List[Document]:
+        return [doc for doc, _ in self.search_by_vector_with_scores(embedding, k, score_threshold)]
+
+    def search_by_vector_with_scores(self, embedding, k: int = 3,
+                                     score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD
+                                     ) -> List[Tuple[Document, float]]:
+        """Jarak L2 dari model embedding yang sama, jadi skor antar shard bisa dibandingkan langsung"""
+        results = self._fan_out(
+            lambda shard: shard.search_by_vector_with_scores(embedding, k, score_threshold), "vector"
+        )
+        return sorted(results, key=lambda item: item[1])[:k]
+
+    def hybrid_search(self, query: str, k: int = 3, embedding=None,
+                      score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD) -> List[Document]:
+        """Satu RRF atas peringkat gabungan semua shard: vektor (jarak L2) + BM25 (statistik korpus
+        gabungan). RRF per shard tidak bisa dibandingkan: hasil teratas tiap shard selalu bernilai sama."""
+        if embedding is None:
+            return [doc for doc, _ in self.keyword_search_with_scores(query, k)]
+        hybrid = USE_HYBRID and self._has_bm25()
+        dense = self.search_by_vector_with_scores(embedding, RRF_FETCH_K if hybrid else k, score_threshold)
+        if not hybrid:
+            return [doc for doc, _ in dense]
+        sparse = self.keyword_search_with_scores(query, RRF_FETCH_K)
+        return FaissRetriever.fuse([doc for doc, _ in dense], [doc for doc, _ in sparse], k)
+
+    def keyword_search_with_scores(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """BM25 di semua shard dengan IDF & panjang rata-rata gabungan, jadi skornya bisa diurutkan bersama"""
+        stats = self._bm25_stats(query)
+        results = self._fan_out(
+            lambda shard: [(doc, doc.metadata["bm25_score"]) for doc in shard.keyword_search(query, k, stats=stats)],
+            "bm25"
+        )
+        return sorted(results, key=lambda item: item[1], reverse=True)[:k]
+
+    def search_batch_by_vectors(self, embeddings, k: int = 3,
+                                score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD
+                                ) -> List[List[Tuple[Document, float]]]:
+        per_shard = self._fan_out_raw(lambda shard: shard.search_batch_by_vectors(embeddings, k, score_threshold))
+        merged: List[List[Tuple[Document, float]]] = [[] for _ in range(len(embeddings))]
+        for name, batches in per_shard:
+            for i, results in enumerate(batches):
+                merged[i].extend((self._tag(doc, name), score) for doc, score in results)
+        return [sorted(results, key=lambda item: item[1])[:k] for results in merged]
+
+    def hybrid_search_batch(self, queries: List[str], embeddings, k: int = 3,
+                            score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD) -> List[List[Document]]:
+        hybrid = USE_HYBRID and self._has_bm25()
+        dense = self.search_batch_by_vectors(embeddings, RRF_FETCH_K if hybrid else k, score_threshold)
+        if not hybrid:
+            return [[doc for doc, _ in results] for results in dense]
+        return [
+            FaissRetriever.fuse([doc for doc, _ in results],
+                                [doc for doc, _ in self.keyword_search_with_scores(query, RRF_FETCH_K)], k)
+            for query, results in zip(queries, dense)
+        ]
+
+    # ---------- internal ----------
+    def _fan_out_raw(self, search: Callable[[FaissRetriever], list]) -> List[Tuple[str, list]]:
+        shards = self.shards
+        futures = {name: self._executor.submit(tracing.wrap_context(search), shard)
+                   for name, shard in shards.items()}
+        results = []
+        for name, future in futures.items():
+            try:
+                results.append((name, future.result()))
+            except Exception as e:
+                # Satu shard bermasalah tidak menggagalkan pencarian di shard lain
+                print(f"❌ Error saat mencari di shard '{name}': {str(e)}")
+        return results
+
+    def _fan_out(self, search: Callable[[FaissRetriever], List[Tuple[Document, float]]],
+                 mode: str) -> List[Tuple[Document, float]]:
+        with tracing.span("shard_search", mode=mode) as search_span:
+            per_shard = self._fan_out_raw(search)
+            search_span["attributes"].update({name: len(results) for name, results in per_shard})
+        return [(self._tag(doc, name), score) for name, results in per_shard for doc, score in results]
+
+    def _has_bm25(self) -> bool:
+        return any(shard.bm25 is not None for shard in self.shards.values())
+
+    def _bm25_stats(self, query: str) -> Optional[CorpusStats]:
+        indexes = [shard.bm25 for shard in self.shards.values() if shard.bm25 is not None]
+        return CorpusStats.combine(indexes, tokenize(query)) if indexes else None
+
+    @staticmethod
+    def _tag(doc: Document, shard: str) -> Document:
+        doc.metadata["shard"] = shard  # dokumen hasil search sudah berupa salinan
+        return doc
@@ -1,53 +1,265 @@
 # ✅ retriever.py (FINAL AMAN – fix error client/async_client)
 
 import os
+from typing import List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
-import cohere
-from langchain_cohere import CohereEmbeddings
-from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from clients import get_cohere_embeddings
+from mmap_store import MmapFaissStore, is_mmap_index, search_index, select_mmr
+from index_types import enable_reconstruct, search_parameters, set_search_params
+from index_pointer import resolve_index_dir
+from bm25_index import BM25_FILE, BM25Index, CorpusStats
+from faq_index import FAQ_INDEX_DIR, FAQ_MATCH_THRESHOLD, FaqAnswerIndex, FaqMatch
+import tracing
 
-class FaissRetriever:
-    def __init__(self, index_path: str):
-        load_dotenv()
+# Jarak L2 kuadrat antar embedding Cohere ternormalisasi (0 = identik, 4 = berlawanan).
+# 1.2 setara cosine similarity >= 0.4; query di atas batas ini dianggap tidak ada di database.
+DEFAULT_SCORE_THRESHOLD = float(os.getenv("RETRIEVER_SCORE_THRESHOLD", "1.2"))
+USE_MMR = os.getenv("RETRIEVER_USE_MMR", "false").lower() == "true"
+MMR_FETCH_K = 20
+MMR_LAMBDA = 0.5
+
+# Parameter pencarian untuk index IVF (nprobe) / HNSW (efSearch); diabaikan untuk index flat
+NPROBE = int(os.getenv("RETRIEVER_NPROBE", "8"))
+EF_SEARCH = int(os.getenv("RETRIEVER_EF_SEARCH", "64"))
+
+# Pencarian hybrid: BM25 lokal + vektor, digabung dengan reciprocal-rank fusion (RRF)
+USE_HYBRID = os.getenv("RETRIEVER_HYBRID", "true").lower() == "true"
+BM25_MIN_SCORE = float(os.getenv("RETRIEVER_BM25_MIN_SCORE", "3.0"))
+RRF_K = 60
+RRF_FETCH_K = 10
 
+class FaissRetriever:
+    def __init__(self, index_path: str, embeddings: Optional[Embeddings] = None,
+                 faq_index_path: Optional[str] = FAQ_INDEX_DIR):
+        # .env hanya dibaca jika key belum ada di environment (main.py sudah memuatnya saat start)
         cohere_api_key = os.getenv("COHERE_API_KEY")
-        if not cohere_api_key:
+        if embeddings is None and not cohere_api_key:
+            load_dotenv()
+            cohere_api_key = os.getenv("COHERE_API_KEY")
+        if embeddings is None and not cohere_api_key:
             raise ValueError("❌ COHERE_API_KEY tidak ditemukan di .env")
 
+        # Versi aktif dari create_index.py; semua file (vektor, docstore, BM25) dibaca dari versi yang sama
+        index_path = resolve_index_dir(index_path)
         if not os.path.exists(index_path):
             raise FileNotFoundError(f"❌ Index FAISS tidak ditemukan di: {index_path}")
 
         # Set user agent via environment
         os.environ["LANGCHAIN_USER_AGENT"] = "mental-health-chatbot"
 
-        # ✅ Gunakan client eksplisit (hindari error client/async_client)
-        cohere_client = cohere.Client(api_key=cohere_api_key)
-        self.embeddings = CohereEmbeddings(
-            client=cohere_client,
-            model="embed-multilingual-v3.0"
-        )
+        # ✅ Client Cohere eksplisit dari registry (hindari error client/async_client),
+        # dibungkus cache agar query yang berulang tidak memanggil API Cohere lagi
+        # (embeddings bisa diganti, mis. stub lokal untuk benchmark offline)
+        self.embeddings = embeddings or get_cohere_embeddings(cohere_api_key)
 
         try:
-            self.vectorstore = FAISS.load_local(
-                index_path,
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            if is_mmap_index(index_path):
+                # ✅ Format aman: vektor di-mmap, teks dari SQLite, tanpa pickle
+                self.vectorstore = MmapFaissStore(index_path)
+            else:
+                # Format pickle lama: langchain_community (berat) hanya dimuat untuk format ini
+                from langchain_community.vectorstores import FAISS
+                self.vectorstore = FAISS.load_local(
+                    index_path,
+                    self.embeddings,
+                    allow_dangerous_deserialization=True
+                )
         except Exception as e:
             raise RuntimeError(f"Gagal memuat FAISS index: {str(e)}")
 
-    def search(self, query: str, k: int = 3):
+        # Index IVF lama (dibangun sebelum direct map disimpan) tetap bisa dipakai MMR
+        enable_reconstruct(self.vectorstore.index)
+        self.set_search_params(nprobe=NPROBE, ef_search=EF_SEARCH)
+
+        # Index BM25 opsional, dibangun oleh create_index.py di folder yang sama
+        bm25_path = os.path.join(index_path, BM25_FILE)
+        self.bm25 = BM25Index.load(bm25_path) if os.path.exists(bm25_path) else None
+
+        # Index jawaban FAQ opsional (create_index.py) untuk jawaban langsung tanpa LLM
+        self.faq_answers = FaqAnswerIndex.load(faq_index_path) if faq_index_path else None
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Atur default trade-off recall vs latensi untuk index IVF/HNSW (sebelum dipakai bersama;
+        untuk satu pencarian saja, pakai argumen nprobe/ef_search di search_by_vector_with_scores)"""
+        set_search_params(self.vectorstore.index, nprobe=nprobe, ef_search=ef_search)
+
+    def warm_up(self) -> None:
+        """Sentuh index sekali agar halaman mmap & struktur FAISS sudah hangat sebelum query pertama"""
+        self.search_batch_by_vectors([[0.0] * self.vectorstore.index.d], k=1, score_threshold=None)
+
+    def embed_query(self, query: str):
+        """Embedding query sekali saja, agar bisa dipakai ulang (cache semantik + pencarian)"""
+        if not query:
+            raise ValueError("Query tidak boleh kosong")
+        return self.embeddings.embed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embedding banyak query dalam satu panggilan API (mode batch/offline)"""
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is not None:
+            return embed_queries(queries)
+        return [self.embeddings.embed_query(query) for query in queries]
+
+    def match_faq(self, embedding, threshold: float = FAQ_MATCH_THRESHOLD) -> Optional[FaqMatch]:
+        """Pertanyaan FAQ yang hampir sama dengan query (cosine >= threshold), jika ada"""
+        if self.faq_answers is None or embedding is None:
+            return None
+        with tracing.span("faq_match") as match_span:
+            match = self.faq_answers.match(embedding, threshold)
+            match_span["attributes"]["matched"] = match is not None
+        return match
+
+    def search(self, query: str, k: int = 3, score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD,
+               use_mmr: bool = USE_MMR) -> List[Document]:
         try:
-            if not query:
-                raise ValueError("Query tidak boleh kosong")
-            return self.vectorstore.similarity_search(query, k=k)
+            return [doc for doc, _ in self.search_with_scores(query, k, score_threshold, use_mmr)]
         except Exception as e:
             print(f"❌ Error saat mencari: {str(e)}")
             return []
 
+    def search_by_vector(self, embedding, k: int = 3, score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD,
+                         use_mmr: bool = USE_MMR) -> List[Document]:
+        """Sama seperti search(), tetapi memakai embedding query yang sudah dihitung"""
+        try:
+            return [doc for doc, _ in self.search_by_vector_with_scores(embedding, k, score_threshold, use_mmr)]
+        except Exception as e:
+            print(f"❌ Error saat mencari: {str(e)}")
+            return []
+
+    def search_with_scores(self, query: str, k: int = 3, score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD,
+                           use_mmr: bool = USE_MMR) -> List[Tuple[Document, float]]:
+        """Cari dokumen beserta jarak L2 (semakin kecil semakin relevan)"""
+        return self.search_by_vector_with_scores(self.embed_query(query), k, score_threshold, use_mmr)
+
+    def search_by_vector_with_scores(self, embedding, k: int = 3,
+                                     score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD,
+                                     use_mmr: bool = USE_MMR, nprobe: Optional[int] = None,
+                                     ef_search: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """Hasil di atas score_threshold dibuang, agar konteks tidak relevan tidak dikirim ke LLM.
+        use_mmr memilih hasil yang beragam (MMR) dari MMR_FETCH_K kandidat terdekat.
+        nprobe/ef_search hanya berlaku untuk panggilan ini (faiss.SearchParameters, index tidak diubah)."""
+        params = search_parameters(self.vectorstore.index, nprobe=nprobe, ef_search=ef_search)
+        with tracing.span("faiss_search", k=k, mmr=use_mmr) as search_span:
+            if isinstance(self.vectorstore, MmapFaissStore):
+                if use_mmr:
+                    results = self.vectorstore.max_marginal_relevance_search_with_score_by_vector(
+                        embedding, k=k, fetch_k=MMR_FETCH_K, lambda_mult=MMR_LAMBDA, params=params
+                    )
+                else:
+                    results = self.vectorstore.similarity_search_with_score_by_vector(embedding, k=k, params=params)
+            else:
+                # LangChain FAISS tidak menerima SearchParameters: cari langsung di index, lalu docstore
+                hits = search_index(self.vectorstore.index, [embedding], MMR_FETCH_K if use_mmr else k, params)[0]
+                if use_mmr:
+                    hits = select_mmr(self.vectorstore.index, embedding, hits, k, MMR_LAMBDA)
+                results = self._docstore_results(hits)
+
+            if score_threshold is not None:
+                results = [(doc, score) for doc, score in results if score <= score_threshold]
+            search_span["attributes"]["hits"] = len(results)
+        # Salin dokumen agar skor tidak menempel di docstore yang dipakai bersama
+        return [(self._with_score(doc, score), float(score)) for doc, score in results]
+
+    def search_batch_by_vectors(self, embeddings: Sequence, k: int = 3,
+                                score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD
+                                ) -> List[List[Tuple[Document, float]]]:
+        """Pencarian banyak query sebagai satu query matriks FAISS (tanpa MMR)"""
+        if len(embeddings) == 0:
+            return []
+        with tracing.span("faiss_search_batch", k=k, queries=len(embeddings)):
+            if isinstance(self.vectorstore, MmapFaissStore):
+                batches = self.vectorstore.similarity_search_with_score_by_vectors(embeddings, k)
+            else:
+                batches = [self._docstore_results(hits) for hits in search_index(self.vectorstore.index, embeddings, k)]
+        return [
+            [(self._with_score(doc, score), float(score)) for doc, score in results
+             if score_threshold is None or score <= score_threshold]
+            for results in batches
+        ]
+
+    def keyword_search(self, query: str, k: int = 3, min_score: float = BM25_MIN_SCORE,
+                       stats: Optional[CorpusStats] = None) -> List[Document]:
+        """Jalur cepat tanpa API embedding: hanya BM25 lokal (stats: statistik korpus gabungan antar index)"""
+        if self.bm25 is None or not query:
+            return []
+        with tracing.span("bm25_search", k=k) as search_span:
+            hits = self.bm25.search(query, k=k, min_score=min_score, stats=stats)
+            docs = self._get_documents_by_ids([doc_id for doc_id, _ in hits])
+            search_span["attributes"]["hits"] = len(hits)
+        return [self._with_score(docs[doc_id], score, "bm25_score") for doc_id, score in hits if doc_id in docs]
+
+    def hybrid_search(self, query: str, k: int = 3, embedding=None,
+                      score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD) -> List[Document]:
+        """BM25 + vektor digabung dengan RRF. Tanpa embedding (API lambat/mati) -> BM25 saja."""
+        if embedding is None:
+            return self.keyword_search(query, k)
+        if self.bm25 is None or not USE_HYBRID:
+            return self.search_by_vector(embedding, k, score_threshold)
+
+        try:
+            dense = [doc for doc, _ in self.search_by_vector_with_scores(embedding, RRF_FETCH_K, score_threshold)]
+        except Exception as e:
+            print(f"❌ Error saat mencari: {str(e)}")
+            dense = []
+        return self.fuse(dense, self.keyword_search(query, RRF_FETCH_K), k)
+
+    def hybrid_search_batch(self, queries: List[str], embeddings: Sequence, k: int = 3,
+                            score_threshold: Optional[float] = DEFAULT_SCORE_THRESHOLD) -> List[List[Document]]:
+        """hybrid_search untuk banyak query: bagian vektor dijalankan sebagai satu query matriks"""
+        fetch_k = RRF_FETCH_K if self.bm25 is not None and USE_HYBRID else k
+        dense = self.search_batch_by_vectors(embeddings, fetch_k, score_threshold)
+        if self.bm25 is None or not USE_HYBRID:
+            return [[doc for doc, _ in results] for results in dense]
+        return [
+            self.fuse([doc for doc, _ in results], self.keyword_search(query, RRF_FETCH_K), k)
+            for query, results in zip(queries, dense)
+        ]
+
+    @staticmethod
+    def fuse(dense: List[Document], sparse: List[Document], k: int) -> List[Document]:
+        """Reciprocal-rank fusion dua peringkat (vektor & BM25) dari korpus yang sama"""
+        fused, docs = {}, {}
+        for ranking in (dense, sparse):
+            for rank, doc in enumerate(ranking):
+                key = FaissRetriever._doc_key(doc)
+                fused[key] = fused.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+                docs.setdefault(key, doc)
+        best = sorted(fused, key=fused.get, reverse=True)[:k]
+        return [FaissRetriever._with_score(docs[key], fused[key], "rrf_score") for key in best]
+
+    def _docstore_results(self, hits: List[Tuple[int, float]]) -> List[Tuple[Document, float]]:
+        """(posisi, jarak) dari index -> (dokumen, jarak) lewat docstore format pickle"""
+        results = []
+        for pos, score in hits:
+            doc_id = self.vectorstore.index_to_docstore_id.get(pos)
+            doc = self.vectorstore.docstore.search(doc_id) if doc_id is not None else None
+            if isinstance(doc, Document):
+                results.append((Document(id=doc_id, page_content=doc.page_content, metadata=doc.metadata), score))
+        return results
+
+    def _get_documents_by_ids(self, ids: List[str]) -> dict:
+        if isinstance(self.vectorstore, MmapFaissStore):
+            return {doc.id: doc for doc in self.vectorstore.get_by_ids(ids)}
+        docs = {}
+        for doc_id in ids:
+            doc = self.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                docs[doc_id] = doc
+        return docs
+
+    @staticmethod
+    def _doc_key(doc: Document) -> str:
+        return doc.id or doc.metadata.get("chunk_id") or doc.page_content
+
+    @staticmethod
+    def _with_score(doc: Document, score: float, key: str = "score") -> Document:
+        return Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, key: float(score)})
+
 # Contoh penggunaan
 if __name__ == '__main__':
     retriever = FaissRetriever(index_path="data/faiss_index")
     hasil = retriever.search("apa penyebab depresi?", k=3)
     for i, doc in enumerate(hasil):
-        print(f"\n--- Hasil {i+1} ---\n{doc.page_content[:200]}...")
+        print(f"\n--- Hasil {i+1} (jarak {doc.metadata['score']:.3f}) ---\n{doc.page_content[:200]}...")
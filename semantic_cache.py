@@ -0,0 +1,158 @@
+# semantic_cache.py
+# Cache jawaban semantik di depan run_agent: exact-match dulu, lalu kemiripan embedding (FAISS)
+
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def normalize_query(query: str) -> str:
+    """Normalisasi query untuk exact-match (huruf kecil, tanpa tanda baca & spasi ganda)"""
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+@dataclass
+class CacheEntry:
+    entry_id: int
+    context_key: str
+    normalized_query: str
+    answer: str
+    created_at: float = field(default_factory=time.time)
+
+
+class SemanticCache:
+    """Cache jawaban LLM per proses, dipartisi per sumber konteks (database / hash PDF)"""
+
+    def __init__(self, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()  # urutan = LRU
+        self._exact: Dict[tuple, int] = {}
+        self._indexes: Dict[str, faiss.IndexIDMap2] = {}
+        self._next_id = 0
+
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+    # ---------- lookup ----------
+    def get_exact(self, query: str, context_key: str) -> Optional[str]:
+        """Cari jawaban dengan query ternormalisasi yang sama persis"""
+        normalized = normalize_query(query)
+        with self._lock:
+            entry_id = self._exact.get((context_key, normalized))
+            entry = self._live_entry(entry_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(entry_id)
+            self.stats["exact_hits"] += 1
+            return entry.answer
+
+    def get_similar(self, embedding: List[float], context_key: str) -> Optional[str]:
+        """Cari jawaban dari query lain yang embedding-nya cukup mirip"""
+        with self._lock:
+            index = self._indexes.get(context_key)
+            if index is None or index.ntotal == 0:
+                self.stats["misses"] += 1
+                return None
+
+            scores, ids = index.search(self._as_vector(embedding), 1)
+            entry_id, score = int(ids[0][0]), float(scores[0][0])
+            entry = self._live_entry(entry_id) if entry_id != -1 else None
+            if entry is None or score < self.similarity_threshold:
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self.stats["semantic_hits"] += 1
+            return entry.answer
+
+    # ---------- insert ----------
+    def put(self, query: str, embedding: Optional[List[float]], context_key: str, answer: str) -> None:
+        """Simpan jawaban; embedding opsional (tanpa embedding hanya bisa exact-match)"""
+        normalized = normalize_query(query)
+        with self._lock:
+            old_id = self._exact.get((context_key, normalized))
+            if old_id is not None:
+                self._remove(old_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CacheEntry(entry_id, context_key, normalized, answer)
+            self._exact[(context_key, normalized)] = entry_id
+
+            if embedding is not None:
+                vector = self._as_vector(embedding)
+                index = self._indexes.get(context_key)
+                if index is None:
+                    index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                    self._indexes[context_key] = index
+                index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, context_key: Optional[str] = None) -> None:
+        """Hapus semua entri, atau hanya entri untuk satu sumber konteks"""
+        with self._lock:
+            for entry_id in [i for i, e in self._entries.items()
+                             if context_key is None or e.context_key == context_key]:
+                self._remove(entry_id)
+
+    # ---------- metrics ----------
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            total = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hits": hits,
+                "hit_rate": hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+    # ---------- internal ----------
+    def _live_entry(self, entry_id: Optional[int]) -> Optional[CacheEntry]:
+        if entry_id is None:
+            return None
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        if self.ttl_seconds and time.time() - entry.created_at > self.ttl_seconds:
+            self._remove(entry_id)
+            return None
+        return entry
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        if self._exact.get((entry.context_key, entry.normalized_query)) == entry_id:
+            del self._exact[(entry.context_key, entry.normalized_query)]
+        index = self._indexes.get(entry.context_key)
+        if index is not None:
+            index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    @staticmethod
+    def _as_vector(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1).copy()
+        faiss.normalize_L2(vector)  # inner product = cosine similarity
+        return vector
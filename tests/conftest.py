@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Modul aplikasi berada di root repo (tanpa package), jadi root ditambahkan ke sys.path
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
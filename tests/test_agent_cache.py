@@ -0,0 +1,110 @@
+# tests/test_agent_cache.py
+# Cache jawaban dipakai bersama semua sesi: jawaban yang dibangun dari riwayat tidak boleh bocor,
+# dan jawaban yang sering dipakai ulang tetap kedaluwarsa sesuai TTL
+
+import time
+
+import pytest
+
+from langchain_core.documents import Document
+
+import agent
+from semantic_cache import SemanticCache
+
+QUESTION = "Bagaimana cara mengatasi depresi?"
+
+
+class FakeRetriever:
+    def embed_query(self, query):
+        return [1.0, 0.0, 0.0]
+
+    def match_faq(self, embedding):
+        return None
+
+    def hybrid_search(self, query, k, embedding=None, score_threshold=None):
+        return [Document(page_content="Depresi dapat ditangani dengan konseling dan dukungan sosial.")]
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+
+
+class HistoryEchoLLM:
+    """Jawaban menyebut nama dari riwayat di prompt, sehingga kebocoran antar sesi terlihat"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, prompt, config=None):
+        self.calls += 1
+        names = [name for name in ("Budi", "Sari") if name in prompt]
+        yield _Chunk(f"Jawaban untuk {' '.join(names) or 'anda'}")
+
+
+@pytest.fixture
+def answer_cache(monkeypatch):
+    cache = SemanticCache()
+    monkeypatch.setattr(agent, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(agent, "get_google_search_results", lambda query: None)
+    return cache
+
+
+def test_sessions_with_different_history_do_not_share_answers(answer_cache):
+    llm = HistoryEchoLLM()
+    first = agent.run_agent(QUESTION, FakeRetriever(), llm=llm,
+                            conversation_context="Pengguna: Nama saya Budi, saya baru kehilangan pekerjaan.")
+    second = agent.run_agent(QUESTION, FakeRetriever(), llm=llm,
+                             conversation_context="Pengguna: Nama saya Sari.")
+
+    assert "Budi" in first
+    assert "Budi" not in second and "Sari" in second
+    assert llm.calls == 2
+    assert answer_cache.get_stats()["size"] == 0
+
+
+def test_history_answer_is_not_served_to_fresh_session(answer_cache):
+    llm = HistoryEchoLLM()
+    agent.run_agent(QUESTION, FakeRetriever(), llm=llm, conversation_context="Pengguna: Nama saya Budi.")
+    fresh = agent.run_agent(QUESTION, FakeRetriever(), llm=llm)
+
+    assert "Budi" not in fresh
+    assert llm.calls == 2
+
+
+def test_turns_without_history_still_use_cache(answer_cache):
+    llm = HistoryEchoLLM()
+    first = agent.run_agent(QUESTION, FakeRetriever(), llm=llm)
+    second = agent.run_agent(QUESTION, FakeRetriever(), llm=llm)
+
+    assert first == second
+    assert llm.calls == 1
+
+
+def test_semantic_hit_does_not_extend_ttl(monkeypatch):
+    cache = SemanticCache(ttl_seconds=0.5)
+    monkeypatch.setattr(agent, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(agent, "get_google_search_results", lambda query: None)
+    llm = HistoryEchoLLM()
+    paraphrase = "Gimana cara mengatasi depresi?"  # embedding FakeRetriever sama -> hit semantik
+
+    agent.run_agent(QUESTION, FakeRetriever(), llm=llm)
+    time.sleep(0.3)
+    agent.run_agent(paraphrase, FakeRetriever(), llm=llm)
+    assert llm.calls == 1
+    time.sleep(0.3)
+    # Umur jawaban asli sudah melewati TTL: hit semantik sebelumnya tidak boleh menyegarkannya
+    agent.run_agent(paraphrase, FakeRetriever(), llm=llm)
+    assert llm.calls == 2
+
+
+def test_follow_up_turn_reads_history_free_answer(answer_cache):
+    llm = HistoryEchoLLM()
+    fresh = agent.run_agent(QUESTION, FakeRetriever(), llm=llm)
+    follow_up = agent.run_agent(QUESTION, FakeRetriever(), llm=llm,
+                                conversation_context="Pengguna: Nama saya Budi.")
+
+    assert follow_up == fresh and "Budi" not in follow_up
+    assert llm.calls == 1
+    assert answer_cache.get_stats()["size"] == 1
@@ -0,0 +1,128 @@
+# tests/test_agent_retrieval.py
+# Pencarian web (kuota Google) hanya dipakai jika retrieval database gagal; jawaban dari retrieval
+# yang gagal sebagian tidak masuk cache jawaban
+
+import asyncio
+import time
+
+import pytest
+
+from langchain_core.documents import Document
+
+import agent
+from semantic_cache import SemanticCache
+
+
+class SlowRetriever:
+    def __init__(self, docs, embed_seconds=0.0, embedding=(1.0, 0.0, 0.0)):
+        self.docs = docs
+        self.embed_seconds = embed_seconds
+        self.embedding = embedding
+
+    def embed_query(self, query):
+        time.sleep(self.embed_seconds)
+        if self.embedding is None:
+            raise RuntimeError("embedding API mati")
+        return list(self.embedding)
+
+    def match_faq(self, embedding):
+        return None
+
+    def hybrid_search(self, query, k, embedding=None, score_threshold=None):
+        return self.docs
+
+
+@pytest.fixture
+def web_calls(monkeypatch):
+    calls = []
+
+    def fake_search(query):
+        calls.append(query)
+        return "hasil web"
+
+    monkeypatch.setattr(agent, "get_google_search_results", fake_search)
+    return calls
+
+
+def _retrieve(retriever):
+    return asyncio.run(agent.retrieve_context_async("apa itu depresi?", retriever, None, False, "database",
+                                                    use_cache=False))
+
+
+def test_slow_embedding_with_context_does_not_search_web(web_calls):
+    # Embedding lebih lambat dari jeda hedging lama (1 detik) tetapi database punya jawaban
+    result = _retrieve(SlowRetriever([Document(page_content="Depresi adalah gangguan suasana hati.")],
+                                     embed_seconds=1.2))
+    assert result.faq_docs and result.fallback_answer is None
+    assert web_calls == []
+
+
+def test_no_context_falls_back_to_web_once(web_calls):
+    result = _retrieve(SlowRetriever([]))
+    assert result.fallback_answer == "hasil web"
+    assert len(web_calls) == 1
+
+
+def test_failed_embedding_searches_web_alongside_bm25(web_calls):
+    result = _retrieve(SlowRetriever([], embedding=None))
+    assert result.fallback_answer == "hasil web"
+    assert len(web_calls) == 1
+
+
+class FakeDocumentIndex:
+    content_hash = "abc123"
+
+    def search_by_vector(self, embedding, k):
+        return [Document(page_content="Isi dokumen tentang kecemasan.")]
+
+
+class CountingLLM:
+    def __init__(self, content="Jawaban"):
+        self.prompts = []
+        self.content = content
+
+    def stream(self, prompt, config=None):
+        self.prompts.append(prompt)
+        yield type("Chunk", (), {"content": self.content, "usage_metadata": None})()
+
+
+@pytest.fixture
+def answer_cache(monkeypatch, web_calls):
+    cache = SemanticCache()
+    monkeypatch.setattr(agent, "get_answer_cache", lambda: cache)
+    return cache
+
+
+def test_document_question_without_embedding_skips_llm_and_cache(answer_cache):
+    llm = CountingLLM()
+    answer = agent.run_agent("apa isi dokumen?", SlowRetriever([], embedding=None), FakeDocumentIndex(), llm=llm)
+
+    assert "tidak bisa dicari" in answer
+    assert llm.prompts == []
+    assert answer_cache.get_stats()["size"] == 0
+
+
+def test_document_question_with_embedding_is_cached(answer_cache):
+    llm = CountingLLM()
+    agent.run_agent("apa isi dokumen?", SlowRetriever([]), FakeDocumentIndex(), llm=llm)
+
+    assert "Isi dokumen tentang kecemasan." in llm.prompts[0]
+    assert answer_cache.get_stats()["size"] == 1
+
+
+def test_bm25_only_answer_is_not_cached(answer_cache):
+    llm = CountingLLM()
+    retriever = SlowRetriever([Document(page_content="Depresi adalah gangguan suasana hati.")], embedding=None)
+    agent.run_agent("apa itu depresi?", retriever, llm=llm)
+
+    assert len(llm.prompts) == 1
+    assert answer_cache.get_stats()["size"] == 0
+
+
+def test_empty_stream_returns_displayed_fallback_and_is_not_cached(answer_cache):
+    llm = CountingLLM(content=" ")
+    answer = agent.run_agent("apa itu depresi?", SlowRetriever([Document(page_content="Depresi adalah gangguan.")]),
+                             llm=llm)
+
+    assert answer == agent.EMPTY_ANSWER
+    assert answer_cache.get_stats()["size"] == 0
@@ -0,0 +1,54 @@
+# tests/test_batch_qa.py
+# Mode batch memakai rute yang sama dengan agent: pertanyaan FAQ dijawab langsung tanpa LLM
+
+import json
+
+from langchain_core.documents import Document
+
+import agent
+import batch_qa
+from faq_index import FaqMatch
+
+FAQ_MATCH = FaqMatch("7", "What is depression?", "Depression is a common mood disorder.", 0.97,
+                     {agent.FAQ_ANSWER_LANGUAGE: ("Depresi adalah gangguan suasana hati.", "Apa itu depresi?")})
+
+
+class FakeRetriever:
+    """Pertanyaan yang mengandung 'depression' cocok dengan FAQ; sisanya lewat pencarian shard"""
+
+    def embed_queries(self, queries):
+        return [[1.0, 0.0] if "depression" in query else [0.0, 1.0] for query in queries]
+
+    def match_faq(self, embedding):
+        return FAQ_MATCH if embedding[0] == 1.0 else None
+
+    def hybrid_search_batch(self, queries, embeddings, k=3):
+        docs = [Document(page_content="Sleep hygiene means keeping a regular bedtime.", metadata={"shard": "guidelines"})]
+        return [docs for _ in queries]
+
+
+class CountingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return type("Message", (), {"content": "Jaga jam tidur yang teratur."})()
+
+
+def test_faq_questions_skip_the_llm(tmp_path):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("\n".join(json.dumps({"id": qid, "question": q}) for qid, q in [
+        ("a", "What is depression?"), ("b", "How can I sleep better?")
+    ]), encoding="utf-8")
+    output = tmp_path / "answers.jsonl"
+    llm = CountingLLM()
+
+    counts = batch_qa.run_batch(str(questions), str(output), retriever=FakeRetriever(), llm=llm, rate_per_second=0)
+
+    records = {r["id"]: r for r in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert records["a"]["route"] == "faq_direct"
+    assert records["a"]["answer"].startswith("Depresi adalah gangguan suasana hati.")
+    assert records["b"]["route"] == "llm_database"
+    assert len(llm.prompts) == 1 and "How can I sleep better?" in llm.prompts[0]
+    assert counts["faq_direct"] == 1 and counts["answered"] == 2
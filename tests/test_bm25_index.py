@@ -0,0 +1,70 @@
+# tests/test_bm25_index.py
+# BM25 lokal: istilah persis (DSM-5, nomor hotline), simpan/muat JSON, statistik korpus gabungan antar shard
+
+import pytest
+
+from bm25_index import BM25Index, CorpusStats, tokenize
+
+DOCS = [
+    ("d1", "Kriteria DSM-5 untuk gangguan depresi mayor."),
+    ("d2", "Hubungi hotline 119.1 jika dalam keadaan darurat."),
+    ("d3", "Depresi dan kecemasan sering muncul bersamaan."),
+    ("d4", "Tidur cukup membantu suasana hati dan mengurangi kecemasan."),
+    ("d5", "Depresi ringan bisa membaik dengan olahraga dan tidur teratur."),
+]
+
+
+def test_tokenize_keeps_compound_terms_and_drops_stopwords():
+    assert tokenize("Apa itu DSM-5 dan hotline 119.1?") == ["dsm-5", "hotline", "119.1"]
+
+
+def test_exact_terms_rank_their_document_first():
+    index = BM25Index.build(DOCS)
+
+    assert index.search("dsm-5", k=1)[0][0] == "d1"
+    assert index.search("nomor hotline 119.1", k=1)[0][0] == "d2"
+    assert index.search("apa itu", k=3) == []  # hanya stopword
+
+
+def test_rarer_terms_score_higher():
+    index = BM25Index.build(DOCS)
+    scores = dict(index.search("depresi kecemasan tidur olahraga", k=5))
+
+    # d5 memuat "olahraga" (hanya muncul sekali di korpus), d3 hanya term yang umum
+    assert scores["d5"] > scores["d3"]
+
+
+def test_k_and_min_score_limit_results():
+    index = BM25Index.build(DOCS)
+    hits = index.search("depresi kecemasan", k=2)
+
+    assert len(hits) == 2
+    assert hits[0][1] >= hits[1][1]
+    assert index.search("depresi kecemasan", k=5, min_score=hits[0][1] + 1) == []
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    index = BM25Index.build(DOCS, k1=1.2, b=0.5)
+    path = str(tmp_path / "bm25.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+
+    assert (loaded.k1, loaded.b) == (1.2, 0.5)
+    assert loaded.search("depresi tidur", k=5) == index.search("depresi tidur", k=5)
+
+
+def test_combined_stats_make_shard_scores_match_single_index():
+    query = "depresi kecemasan tidur"
+    whole = dict(BM25Index.build(DOCS).search(query, k=10))
+    shards = [BM25Index.build(DOCS[:2]), BM25Index.build(DOCS[2:])]
+    stats = CorpusStats.combine(shards, tokenize(query))
+
+    merged = {doc_id: score for shard in shards for doc_id, score in shard.search(query, k=10, stats=stats)}
+
+    assert merged.keys() == whole.keys()
+    for doc_id, score in whole.items():
+        assert merged[doc_id] == pytest.approx(score)
+
+
+def test_empty_index():
+    assert BM25Index.build([]).search("depresi") == []
@@ -0,0 +1,63 @@
+# tests/test_chunking.py
+# pack_units: chunk tidak melewati batas token, overlap berupa kalimat utuh, tidak ada teks yang hilang
+
+import random
+
+import pytest
+
+from chunking import MIN_CHUNK_TOKENS, pack_units, split_sentences
+from tokens import count_tokens
+
+WORDS = "sleep stress anxiety therapy support family routine breathing exercise journal".split()
+
+
+def _sentences(rng, n):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25))).capitalize() + "." for _ in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_chunks_respect_budget_and_keep_every_unit(seed):
+    rng = random.Random(seed)
+    units = _sentences(rng, rng.randint(1, 40))
+    chunks = pack_units(units, max_tokens=60, overlap_tokens=15)
+
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks[:-1])
+    # Sisa pendek di akhir boleh digabung ke chunk terakhir
+    assert count_tokens(chunks[-1]) <= 60 + MIN_CHUNK_TOKENS
+    joined = " ".join(chunks)
+    assert all(unit in joined for unit in units)
+
+
+def test_overlap_repeats_whole_trailing_sentences():
+    units = [f"Sentence number {i} talks about sleep and stress." for i in range(12)]
+    chunks = pack_units(units, max_tokens=40, overlap_tokens=15)
+
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        carried = split_sentences(current)[0]
+        assert carried in units
+        assert previous.endswith(carried)
+
+
+def test_no_overlap_when_disabled():
+    units = [f"Sentence number {i} talks about sleep and stress." for i in range(12)]
+    chunks = pack_units(units, max_tokens=40, overlap_tokens=0)
+
+    assert sum(len(split_sentences(chunk)) for chunk in chunks) == len(units)
+
+
+def test_oversized_unit_is_split():
+    long_unit = " ".join(["therapy"] * 400)
+    chunks = pack_units([long_unit], max_tokens=50, overlap_tokens=0)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 50 + MIN_CHUNK_TOKENS for chunk in chunks)
+    assert " ".join(chunks).split() == long_unit.split()
+
+
+def test_short_tail_is_merged_into_previous_chunk():
+    units = [f"Sentence number {i} talks about sleep and stress." for i in range(4)] + ["Ok."]
+    chunks = pack_units(units, max_tokens=40, overlap_tokens=0)
+
+    assert chunks[-1].endswith("Ok.")
+    assert all(chunk != "Ok." for chunk in chunks)
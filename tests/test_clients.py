@@ -0,0 +1,19 @@
+# tests/test_clients.py
+# Registry client: dipakai ulang per key, dan dibatasi LRU supaya tidak tumbuh tanpa batas
+
+import clients
+
+
+def test_registry_reuses_and_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(clients, "MAX_CLIENTS", 2)
+    monkeypatch.setattr(clients, "_clients", clients.OrderedDict())
+    monkeypatch.setattr(clients, "_setup_seconds", {})
+
+    a = clients._get_or_create(("a",), object)
+    clients._get_or_create(("b",), object)
+    assert clients._get_or_create(("a",), object) is a  # "a" jadi paling baru dipakai
+    clients._get_or_create(("c",), object)
+
+    assert list(clients._clients) == [("a",), ("c",)]
+    assert set(clients._setup_seconds) == {("a",), ("c",)}
+    assert clients.get_client_stats()["evicted"] >= 1
@@ -0,0 +1,71 @@
+# tests/test_context_builder.py
+# Perakitan konteks prompt: anggaran token tidak pernah terlewati, kalimat overlap dikirim sekali,
+# query lintas bahasa tetap mendapat kalimat awal chunk
+
+import random
+
+import pytest
+from langchain_core.documents import Document
+
+from context_builder import build_context
+from tokens import count_tokens
+
+WORDS = "depression therapy sleep anxiety support people often feel tired when stress grows".split()
+FILLER = [f"Paragraph {i} describes routine clinic paperwork and opening hours in detail." for i in range(12)]
+
+
+def _random_docs(rng):
+    docs = []
+    for _ in range(rng.randint(1, 6)):
+        sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))).capitalize() + "."
+                     for _ in range(rng.randint(1, 8))]
+        docs.append(Document(page_content=" ".join(sentences)))
+    return docs
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_budget_is_never_exceeded(seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        budget = rng.randint(0, 200)
+        built = build_context("depression therapy", _random_docs(rng), max_tokens=budget)
+
+        assert count_tokens(built.text) <= budget
+        assert built.tokens == count_tokens(built.text)
+
+
+def test_oversized_first_sentence_is_truncated_to_budget():
+    built = build_context("therapy", [Document(page_content="therapy " * 200)], max_tokens=10)
+
+    assert built.text
+    assert count_tokens(built.text) <= 10
+
+
+def test_overlapping_sentences_are_sent_once():
+    shared = "Therapy helps people manage depression over time."
+    docs = [
+        Document(page_content=f"Depression is common. {shared}"),
+        Document(page_content=f"{shared} Sleep problems often come with depression."),
+    ]
+    built = build_context("depression therapy", docs)
+
+    assert built.text.count(shared) == 1
+    assert "Sleep problems often come with depression." in built.text
+    assert built.docs_used == 2
+
+
+def test_only_matching_sentences_are_kept_from_long_chunks():
+    text = " ".join(["What helps with insomnia?"] + FILLER[:6] + ["Insomnia improves with a fixed wake time."]
+                    + FILLER[6:])
+    built = build_context("insomnia", [Document(page_content=text)])
+
+    assert built.text == "What helps with insomnia? Insomnia improves with a fixed wake time."
+    assert built.tokens < built.source_tokens
+
+
+def test_cross_language_query_falls_back_to_leading_sentences():
+    # Query berbahasa Indonesia tanpa kata yang sama dengan chunk FAQ berbahasa Inggris
+    text = " ".join(["How do I cope with panic attacks?"] + FILLER)
+    built = build_context("bagaimana mengatasi serangan panik", [Document(page_content=text)], max_sentences=2)
+
+    assert built.text == " ".join(["How do I cope with panic attacks?"] + FILLER[:2])
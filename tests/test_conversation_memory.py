@@ -0,0 +1,66 @@
+# tests/test_conversation_memory.py
+# Ringkasan bergulir berjalan di thread latar belakang (main.py), bersamaan dengan giliran berikutnya
+
+import threading
+
+from conversation_memory import TokenBudgetMemory
+from tools.save_history import ChatHistoryStore
+
+
+def _memory_with_pending_turns() -> TokenBudgetMemory:
+    memory = TokenBudgetMemory("tes", window_tokens=20, persist=False)
+    for i in range(80):
+        memory.add_turn("user", f"Giliran lama nomor {i} tentang masalah tidur dan kecemasan.")
+    return memory
+
+
+def test_pending_turns_stay_in_prompt_while_summarizing():
+    memory = _memory_with_pending_turns()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_summarizer(previous, turns):
+        started.set()
+        release.wait(5)
+        return "Pengguna sering cemas dan sulit tidur."
+
+    worker = threading.Thread(target=memory.maybe_summarize, args=(slow_summarizer,))
+    worker.start()
+    assert started.wait(5)
+    # Selama ringkasan dibuat, giliran lama masih terwakili (ringkasan ekstraktif sementara)
+    assert "Giliran lama nomor 78" in memory.get_prompt_context()
+    # Ringkasan kedua tidak berjalan bersamaan untuk memori yang sama
+    assert memory.maybe_summarize(slow_summarizer, force=True) is False
+
+    release.set()
+    worker.join(5)
+    context = memory.get_prompt_context()
+    assert "Pengguna sering cemas dan sulit tidur." in context
+    assert "Giliran lama nomor 78" not in context
+
+
+def test_clear_discards_summary_in_progress():
+    memory = _memory_with_pending_turns()
+
+    def summarizer(previous, turns):
+        memory.clear()
+        return "Ringkasan riwayat yang sudah dihapus."
+
+    assert memory.maybe_summarize(summarizer) is False
+    assert memory.get_prompt_context() == ""
+
+
+def test_clear_deletes_persisted_history(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "chat_history.sqlite"))
+    try:
+        memory = TokenBudgetMemory("sesi", history_store=store, persist=True)
+        memory.add_turn("user", "Saya sedang merasa sangat cemas.")
+        memory.clear()
+
+        assert store.get_session("sesi") == []
+        assert memory.get_prompt_context() == ""
+    finally:
+        store.close()
+
+
+def test_history_is_not_persisted_by_default(tmp_path):
+    assert TokenBudgetMemory("sesi").history_store is None
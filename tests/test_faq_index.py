@@ -0,0 +1,100 @@
+# tests/test_faq_index.py
+# Jawaban FAQ langsung: terjemahan dibuat saat build index, jalur jawaban tidak menunggu API terjemahan
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import agent
+from faq_index import FaqAnswerIndex
+from tools.translate_tools import StubTranslateBackend, TranslationService
+
+ROWS = [
+    ("1", "What is depression?", "Depression is a common mood disorder."),
+    ("2", "How can I sleep better?", "Keep a regular bedtime."),
+]
+VECTORS = [[1.0, 0.0], [0.0, 1.0]]
+
+
+def _service(**backend_options):
+    return TranslationService(StubTranslateBackend(**backend_options), cache_path=None, rate_per_second=0)
+
+
+def test_translations_are_built_saved_and_matched(tmp_path):
+    index = FaqAnswerIndex.build(ROWS, VECTORS)
+    assert index.add_translations("id", _service().try_translate_batch) == 2
+    index.save(str(tmp_path / "faq"))
+
+    match = FaqAnswerIndex.load(str(tmp_path / "faq")).match([0.0, 1.0], threshold=0.9)
+
+    assert match.translations == {"id": ("[id] Keep a regular bedtime.", "[id] How can I sleep better?")}
+
+
+def test_failed_translations_are_not_stored():
+    index = FaqAnswerIndex.build(ROWS, VECTORS)
+    service = _service(fail_rate=1.0)
+    service.BASE_DELAY = 0
+
+    assert index.add_translations("id", service.try_translate_batch) == 0
+    assert index.match([1.0, 0.0]).translations == {}
+
+
+class IdentityBackend:
+    """Terjemahan yang sama persis dengan teks asli (mis. nama obat atau istilah)"""
+
+    def translate(self, text, target):
+        return text
+
+
+def test_translation_equal_to_source_counts_as_success():
+    index = FaqAnswerIndex.build(ROWS, VECTORS)
+    service = TranslationService(IdentityBackend(), cache_path=None, rate_per_second=0)
+
+    assert index.add_translations("id", service.try_translate_batch) == 2
+    assert index.match([1.0, 0.0]).translations == {"id": (ROWS[0][2], ROWS[0][1])}
+
+
+def test_failed_live_translation_is_not_localized(monkeypatch):
+    service = _service(fail_rate=1.0)
+    service.BASE_DELAY = 0
+    monkeypatch.setattr(agent, "get_translation_service", lambda: service)
+
+    answer, localized = agent.format_faq_answer(FaqAnswerIndex.build(ROWS, VECTORS).match([1.0, 0.0]), "id")
+
+    assert answer.startswith("Depression is a common mood disorder.")
+    assert not localized
+
+
+def test_prebuilt_translation_needs_no_api_call(monkeypatch):
+    index = FaqAnswerIndex.build(ROWS, VECTORS)
+    index.add_translations("id", _service().try_translate_batch)
+    monkeypatch.setattr(agent, "get_translation_service", lambda: pytest.fail("API terjemahan dipanggil"))
+
+    answer, localized = agent.format_faq_answer(index.match([1.0, 0.0]), "id")
+
+    assert answer.startswith("[id] Depression is a common mood disorder.")
+    assert localized
+
+
+def test_slow_translation_falls_back_to_original(monkeypatch):
+    monkeypatch.setattr(agent, "get_translation_service", lambda: _service(latency=1.0))
+    monkeypatch.setattr(agent, "FAQ_TRANSLATE_TIMEOUT", 0.1)
+    match = FaqAnswerIndex.build(ROWS, VECTORS).match([1.0, 0.0])
+
+    start = time.perf_counter()
+    answer, localized = agent.format_faq_answer(match, "id")
+
+    assert time.perf_counter() - start < 0.5
+    assert answer.startswith("Depression is a common mood disorder.")
+    assert not localized
+
+
+def test_serving_path_does_not_import_pandas():
+    # pandas hanya untuk build index (create_index.py); startup app tidak boleh memuatnya
+    code = "import sys, agent, multi_index, callback_handler; print('pandas' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,115 @@
+# tests/test_google_tools.py
+# Fallback pencarian web dengan provider palsu: penggabungan query identik, cache TTL,
+# batas waktu, dan circuit breaker (open -> half-open -> closed)
+
+import threading
+import time
+
+import pytest
+
+from tools import google_tools
+from tools.google_tools import CircuitBreaker, FakeSearchProvider, WebSearchService
+
+
+class FakeClock:
+    """Pengganti modul `time` di google_tools agar TTL & cooldown bisa dimajukan tanpa menunggu"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(google_tools, "time", fake)
+    return fake
+
+
+def test_concurrent_identical_queries_make_one_provider_call():
+    provider = FakeSearchProvider(latency=0.2)
+    service = WebSearchService(provider, num_results=2, timeout=5, rate_per_second=0)
+    barrier = threading.Barrier(4)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(service.search("Cara mengatasi  STRES"))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert provider.calls == 1
+    assert results == [["https://example.org/1", "https://example.org/2"]] * 4
+    assert service.get_stats()["coalesced"] == 3
+
+
+def test_cache_hit_within_ttl_and_refetch_after(clock):
+    provider = FakeSearchProvider()
+    service = WebSearchService(provider, num_results=1, ttl_seconds=60, rate_per_second=0)
+
+    first = service.search("cara tidur nyenyak")
+    clock.advance(59)
+    assert service.search("Cara tidur nyenyak?") == first
+    assert provider.calls == 1
+    assert service.get_stats()["hits"] == 1
+
+    clock.advance(2)
+    service.search("cara tidur nyenyak")
+    assert provider.calls == 2
+
+
+def test_timeout_returns_fallback(monkeypatch):
+    monkeypatch.setattr(google_tools, "_service", None)  # service global dipulihkan setelah tes
+    service = google_tools.set_search_provider(FakeSearchProvider(latency=0.5), timeout=0.05, rate_per_second=0)
+
+    start = time.perf_counter()
+    answer = google_tools.get_google_search_results("layanan konseling terdekat")
+    assert time.perf_counter() - start < 0.4
+    assert answer.startswith("Maaf, pencarian internet sedang lambat")
+    assert service.get_stats()["timeouts"] == 1
+
+
+def test_breaker_opens_after_failures_and_half_opens_after_cooldown(clock):
+    provider = FakeSearchProvider(fail=True)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    service = WebSearchService(provider, num_results=1, rate_per_second=0, breaker=breaker)
+
+    assert service.search("query satu") is None
+    assert breaker.state == "closed"
+    assert service.search("query dua") is None
+    assert breaker.state == "open"
+
+    # Terbuka: provider tidak dipanggil sama sekali
+    assert service.search("query tiga") is None
+    assert provider.calls == 2
+    assert service.get_stats()["rejected"] == 1
+
+    # Setelah cooldown hanya satu percobaan; jika gagal, breaker terbuka lagi
+    clock.advance(30)
+    assert breaker.state == "half_open"
+    assert service.search("query empat") is None
+    assert provider.calls == 3
+    assert breaker.state == "open"
+
+    # Percobaan berikutnya berhasil: breaker tertutup dan permintaan normal kembali
+    clock.advance(30)
+    provider.fail = False
+    assert service.search("query lima") == ["https://example.org/1"]
+    assert breaker.state == "closed"
+    assert service.search("query enam") == ["https://example.org/1"]
+    assert provider.calls == 5
@@ -0,0 +1,62 @@
+# tests/test_index_pointer.py
+# Publikasi index lewat file penunjuk: pembaca tidak pernah melihat index yang hilang
+
+import os
+import threading
+
+from index_pointer import new_version_dir, pointer_path, publish_index_dir, resolve_index_dir
+
+
+def _build(index_dir: str, content: str, **kwargs) -> str:
+    version_dir = new_version_dir(index_dir)
+    with open(os.path.join(version_dir, "index.faiss"), "w") as f:
+        f.write(content)
+    publish_index_dir(version_dir, index_dir, **kwargs)
+    return version_dir
+
+
+def test_without_pointer_uses_index_dir(tmp_path):
+    index_dir = str(tmp_path / "faiss_index")
+    assert resolve_index_dir(index_dir) == index_dir
+
+
+def test_publish_switches_version_and_keeps_previous(tmp_path):
+    index_dir = str(tmp_path / "faiss_index")
+    os.makedirs(index_dir)  # index lama (mis. yang ikut di repo) tidak disentuh
+    first = _build(index_dir, "v1")
+    second = _build(index_dir, "v2")
+    third = _build(index_dir, "v3")
+
+    assert resolve_index_dir(index_dir) == third
+    assert os.path.isdir(second)         # versi sebelumnya mungkin masih dimuat proses lain
+    assert not os.path.exists(first)
+    assert os.path.isdir(index_dir)
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_dangling_pointer_falls_back_to_index_dir(tmp_path):
+    index_dir = str(tmp_path / "faiss_index")
+    with open(pointer_path(index_dir), "w") as f:
+        f.write("faiss_index.v1")
+    assert resolve_index_dir(index_dir) == index_dir
+
+
+def test_readers_never_see_missing_index_during_rebuilds(tmp_path):
+    index_dir = str(tmp_path / "faiss_index")
+    _build(index_dir, "v0")
+    stop, missing = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            path = os.path.join(resolve_index_dir(index_dir), "index.faiss")
+            if not os.path.exists(path):
+                missing.append(path)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for i in range(50):
+        # Versi lama tidak dihapus di sini: yang diuji hanya celah saat pergantian versi
+        _build(index_dir, f"v{i + 1}", keep=100)
+    stop.set()
+    thread.join()
+    assert missing == []
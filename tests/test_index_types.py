@@ -0,0 +1,81 @@
+# tests/test_index_types.py
+# Index IVF: MMR (reconstruct) tetap berfungsi, termasuk index lama tanpa direct map;
+# nprobe per panggilan tidak bocor ke pencarian lain yang berjalan bersamaan
+
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.stubs import StubEmbeddings
+from create_index import save_index
+from index_types import build_index, index_factory_string
+from retriever import NPROBE, FaissRetriever
+
+TOPICS = ["sleep", "anxiety", "therapy", "stress", "panic", "grief", "exercise", "diet",
+          "family", "work", "school", "habit", "mood", "focus", "trauma", "support"]
+TEXTS = [f"Note {i} about {TOPICS[i % 16]} {TOPICS[(i * 3) % 13]} and {TOPICS[(i * 7) % 11]} care"
+         for i in range(400)]
+
+
+def _vectors(vectorstore):
+    return vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+
+
+def _save_ivf(path, index_format, with_direct_map=True):
+    embeddings = StubEmbeddings(dim=64)
+    vectorstore = FAISS.from_texts(TEXTS, embeddings, ids=[f"doc-{i}" for i in range(len(TEXTS))])
+    vectors = _vectors(vectorstore)
+    if with_direct_map:
+        vectorstore.index = build_index("ivf-flat", vectors)
+    else:
+        # Seperti index IVF yang dibangun sebelum direct map disimpan
+        index = faiss.index_factory(vectors.shape[1], index_factory_string("ivf-flat", *vectors.shape))
+        index.train(vectors)
+        index.add(vectors)
+        vectorstore.index = index
+    save_index(vectorstore, str(path), index_format)
+    return FaissRetriever(str(path), embeddings=embeddings, faq_index_path=None), embeddings
+
+
+@pytest.mark.parametrize("index_format", ["mmap", "pickle"])
+@pytest.mark.parametrize("with_direct_map", [True, False])
+def test_mmr_search_on_ivf_index(tmp_path, index_format, with_direct_map):
+    retriever, embeddings = _save_ivf(tmp_path / "ivf", index_format, with_direct_map)
+    query = embeddings.embed_query("anxiety therapy care")
+
+    results = retriever.search_by_vector_with_scores(query, k=3, score_threshold=None, use_mmr=True)
+
+    assert len(results) == 3
+    assert len({doc.id for doc, _ in results}) == 3
+
+
+def test_build_index_keeps_positions():
+    vectors = np.asarray(StubEmbeddings(dim=64).embed_documents(TEXTS), dtype=np.float32)
+    index = build_index("ivf-flat", vectors)
+
+    assert np.allclose(index.reconstruct(7), vectors[7])
+
+
+@pytest.mark.parametrize("index_format", ["mmap", "pickle"])
+def test_per_call_nprobe_is_thread_safe(tmp_path, index_format):
+    retriever, embeddings = _save_ivf(tmp_path / "ivf", index_format)
+    queries = [embeddings.embed_query(f"{topic} care") for topic in TOPICS]
+    # None = default NPROBE dari index; pencarian default berjalan bersamaan dengan override
+    nprobe_values = (None, 1)
+
+    def ids(query, nprobe):
+        return [doc.id for doc, _ in retriever.search_by_vector_with_scores(
+            query, k=10, score_threshold=None, use_mmr=False, nprobe=nprobe)]
+
+    expected = {(i, nprobe): ids(query, nprobe) for i, query in enumerate(queries) for nprobe in nprobe_values}
+    assert any(expected[i, nprobe_values[0]] != expected[i, nprobe_values[1]] for i in range(len(queries)))
+
+    calls = [(i, nprobe) for _ in range(20) for i in range(len(queries)) for nprobe in nprobe_values]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        found = list(pool.map(lambda call: ids(queries[call[0]], call[1]), calls))
+
+    assert found == [expected[call] for call in calls]
+    assert faiss.extract_index_ivf(retriever.vectorstore.index).nprobe == NPROBE
@@ -0,0 +1,55 @@
+# tests/test_keyword_matcher.py
+# Regex trie untuk leksikon keyword: hasil sama dengan alternasi biasa (kecocokan terpanjang dulu)
+
+import random
+import re
+
+import pytest
+
+from mental_health_processor import KeywordMatcher, _trie_regex
+
+
+def _naive_spans(keywords, text):
+    alternation = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return [m.span() for m in re.finditer(alternation, text, re.IGNORECASE)]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_trie_regex_matches_like_longest_first_alternation(seed):
+    rng = random.Random(seed)
+    keywords = list({"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))})
+    text = "".join(rng.choice("abcAB ") for _ in range(60))
+
+    trie_spans = [m.span() for m in re.finditer(_trie_regex(keywords), text, re.IGNORECASE)]
+    assert trie_spans == _naive_spans(keywords, text)
+
+
+def test_prefix_keywords_prefer_longest_match():
+    matcher = KeywordMatcher(["stress", "stressor", "depresi"])
+
+    assert matcher.highlight("Stressor kerja memicu stress.") == "**STRESSOR** kerja memicu **STRESS**."
+    assert matcher.count("stress, stressor, STRESS") == 3
+
+
+def test_special_characters_are_escaped():
+    matcher = KeywordMatcher(["dsm-5", "c++", "a.b"])
+
+    assert matcher.contains("Kriteria DSM-5 terbaru")
+    assert matcher.count("c++ dan a.b, bukan axb") == 2
+
+
+def test_analyze_scores_and_collects_relevant_sentences():
+    matcher = KeywordMatcher(["cemas", "tidur"])
+    score, sentences = matcher.analyze("Saya sering cemas. Cuaca cerah. Sulit tidur karena cemas.", max_sentences=1)
+
+    assert score == 3
+    assert sentences == ["Saya sering cemas."]
+
+
+def test_empty_keywords_match_nothing():
+    matcher = KeywordMatcher(["", ""])
+
+    assert not matcher.contains("apa saja")
+    assert matcher.count("apa saja") == 0
+    assert matcher.highlight("apa saja") == "apa saja"
+    assert matcher.analyze("apa saja.") == (0, [])
@@ -0,0 +1,71 @@
+# tests/test_kv_cache.py
+# Cache dua lapis bersama (memori + SQLite) dan dua pemakainya: embedding & terjemahan
+
+from benchmarks.stubs import StubEmbeddings
+from embedding_cache import CachedEmbeddings
+from kv_cache import KeyValueCache
+from tools.translate_tools import StubTranslateBackend, TranslationService
+
+
+def test_memory_lru_and_disk_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = KeyValueCache(path, table="items", column="value", max_memory_items=2)
+    cache.put_many({"a": "1", "b": "2", "c": "3"})
+
+    assert cache.get_stats()["memory_size"] == 2
+    assert cache.get_many(["a", "c", "x"]) == {"a": "1", "c": "3"}
+    assert cache.get_stats() == {"memory_hits": 1, "disk_hits": 1, "misses": 1, "memory_size": 2}
+
+    reopened = KeyValueCache(path, table="items", column="value")
+    assert reopened.get_many(["a", "b", "c"]) == {"a": "1", "b": "2", "c": "3"}
+
+
+def test_memory_only_without_path():
+    cache = KeyValueCache(None, table="items", column="value")
+    cache.put_many({"a": "1"})
+    assert cache.get_many(["a"]) == {"a": "1"}
+
+
+def test_cached_embeddings_reuse_disk_cache(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    first = StubEmbeddings(dim=16)
+    vectors = CachedEmbeddings(first, "stub", cache_path=path).embed_documents(["satu", "dua", "satu"])
+
+    second = StubEmbeddings(dim=16)
+    cached = CachedEmbeddings(second, "stub", cache_path=path)
+    assert cached.embed_documents(["dua", "satu"]) == [vectors[1], vectors[0]]
+    assert second.calls == 0
+    assert cached.get_stats()["disk_hits"] == 2
+
+
+def test_translation_cache_and_failures(tmp_path):
+    path = str(tmp_path / "translations.sqlite")
+    backend = StubTranslateBackend()
+    service = TranslationService(backend, cache_path=path, rate_per_second=0)
+
+    assert service.translate_batch(["halo", "halo", ""], "en") == ["[en] halo", "[en] halo", ""]
+    assert service.translate("halo", "en") == "[en] halo"
+    assert backend.calls == 1
+
+    reopened = TranslationService(StubTranslateBackend(fail_rate=1.0), cache_path=path, rate_per_second=0)
+    reopened.BASE_DELAY = 0
+    assert reopened.translate("halo", "en") == "[en] halo"
+    assert reopened.translate("baru", "en") == "baru"
+    stats = reopened.get_stats()
+    assert (stats["hits"], stats["failures"]) == (1, 1)
+
+
+def test_translation_batch_runs_tasks_in_parallel():
+    service = TranslationService(StubTranslateBackend(latency=0.05), cache_path=None, rate_per_second=0)
+    texts = [f"kalimat {i}" for i in range(8)]
+
+    assert service.translate_batch(texts, "en") == [f"[en] {text}" for text in texts]
+
+
+def test_static_translation_helpers_use_shared_service(monkeypatch):
+    from tools import translate_tools
+    service = TranslationService(StubTranslateBackend(), cache_path=None, rate_per_second=0)
+    monkeypatch.setattr(translate_tools, "_default_service", service)
+
+    assert TranslationService.translate_to_indonesian("hello") == "[id] hello"
+    assert TranslationService.translate_to_english("halo") == "[en] halo"
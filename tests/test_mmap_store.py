@@ -0,0 +1,62 @@
+# tests/test_mmap_store.py
+# Format index aman (index.faiss + docstore.sqlite): round-trip simpan/muat dan deteksi format otomatis
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.stubs import StubEmbeddings
+from create_index import save_index
+from mmap_store import MmapFaissStore, is_mmap_index, load_mmap_index_as_faiss
+from retriever import FaissRetriever
+
+TEXTS = [
+    "Depression treatment often combines therapy and medication.",
+    "Sleep hygiene means keeping a regular bedtime.",
+    "Call the local hotline for emergency support.",
+]
+
+
+def _vectorstore(embeddings):
+    ids = [f"doc-{i}" for i in range(len(TEXTS))]
+    return FAISS.from_texts(TEXTS, embeddings, metadatas=[{"chunk_id": i, "lang": "en"} for i in ids], ids=ids)
+
+
+def test_mmap_round_trip_keeps_vectors_and_documents(tmp_path):
+    embeddings = StubEmbeddings()
+    original = _vectorstore(embeddings)
+    save_index(original, str(tmp_path), index_format="mmap")
+    assert is_mmap_index(str(tmp_path))
+
+    loaded = load_mmap_index_as_faiss(str(tmp_path), embeddings)
+    assert loaded.index.ntotal == len(TEXTS)
+    assert loaded.index_to_docstore_id == original.index_to_docstore_id
+    for doc_id in original.index_to_docstore_id.values():
+        loaded_doc, original_doc = loaded.docstore.search(doc_id), original.docstore.search(doc_id)
+        assert (loaded_doc.page_content, loaded_doc.metadata) == (original_doc.page_content, original_doc.metadata)
+
+    store = MmapFaissStore(str(tmp_path))
+    try:
+        query = embeddings.embed_query(TEXTS[2])
+        [(doc, _)] = store.similarity_search_with_score_by_vector(query, k=1)
+        assert (doc.id, doc.page_content, doc.metadata) == ("doc-2", TEXTS[2], {"chunk_id": "doc-2", "lang": "en"})
+        assert [d.id for d in store.get_by_ids(["doc-1", "missing"])] == ["doc-1"]
+    finally:
+        store.close()
+
+
+def test_retriever_detects_index_format(tmp_path):
+    embeddings = StubEmbeddings()
+    mmap_dir, pickle_dir = tmp_path / "mmap", tmp_path / "pickle"
+    save_index(_vectorstore(embeddings), str(mmap_dir), index_format="mmap")
+    save_index(_vectorstore(embeddings), str(pickle_dir), index_format="pickle")
+    assert not is_mmap_index(str(pickle_dir))
+
+    mmap_retriever = FaissRetriever(str(mmap_dir), embeddings=embeddings, faq_index_path=None)
+    pickle_retriever = FaissRetriever(str(pickle_dir), embeddings=embeddings, faq_index_path=None)
+    assert isinstance(mmap_retriever.vectorstore, MmapFaissStore)
+    assert isinstance(pickle_retriever.vectorstore, FAISS)
+
+    query = "therapy for depression"
+    mmap_hits = mmap_retriever.search_with_scores(query, k=3, score_threshold=None, use_mmr=False)
+    pickle_hits = pickle_retriever.search_with_scores(query, k=3, score_threshold=None, use_mmr=False)
+    assert [(d.page_content, round(s, 5)) for d, s in mmap_hits] == \
+        [(d.page_content, round(s, 5)) for d, s in pickle_hits]
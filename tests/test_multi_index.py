@@ -0,0 +1,63 @@
+# tests/test_multi_index.py
+# Penggabungan hasil antar shard: shard yang lebih relevan tidak boleh kehilangan slot top-k
+# hanya karena shard lain juga punya "hasil teratas"
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.stubs import StubEmbeddings
+from create_index import save_index
+from multi_index import FAQ_SHARD, MultiIndexRetriever
+
+FAQ_TEXTS = [
+    "Depression treatment often combines therapy and medication.",
+    "Therapy for depression helps people change negative thinking.",
+    "Depression treatment with therapy works well for most people.",
+    "Untreated depression can get worse without therapy.",
+]
+OTHER_TEXTS = {
+    "guidelines": ["Sleep hygiene means keeping a regular bedtime.", "Limit caffeine in the afternoon."],
+    "resources": ["Call the local hotline for emergency support.", "Community centers offer free yoga."],
+}
+
+
+def _build_shard(embeddings, path, texts):
+    ids = [f"{path.name}-{i}" for i in range(len(texts))]
+    vectorstore = FAISS.from_texts(texts, embeddings, metadatas=[{"chunk_id": i} for i in ids], ids=ids)
+    save_index(vectorstore, str(path))
+    return str(path)
+
+
+def _retriever(tmp_path):
+    embeddings = StubEmbeddings()
+    shards = {FAQ_SHARD: _build_shard(embeddings, tmp_path / "faq", FAQ_TEXTS)}
+    for name, texts in OTHER_TEXTS.items():
+        shards[name] = _build_shard(embeddings, tmp_path / name, texts)
+    return MultiIndexRetriever(shards, embeddings=embeddings), embeddings
+
+
+def test_hybrid_search_ranks_across_shards(tmp_path):
+    retriever, embeddings = _retriever(tmp_path)
+    query = "depression treatment therapy"
+    docs = retriever.hybrid_search(query, k=3, embedding=embeddings.embed_query(query), score_threshold=None)
+
+    assert [doc.metadata["shard"] for doc in docs] == [FAQ_SHARD] * 3
+    assert all("rrf_score" in doc.metadata for doc in docs)
+
+
+def test_hybrid_search_batch_matches_single_query(tmp_path):
+    retriever, embeddings = _retriever(tmp_path)
+    queries = ["depression treatment therapy", "hotline emergency support"]
+    batch = retriever.hybrid_search_batch(queries, retriever.embed_queries(queries), k=2, score_threshold=None)
+
+    assert [doc.metadata["shard"] for doc in batch[0]] == [FAQ_SHARD] * 2
+    assert batch[1][0].metadata["shard"] == "resources"
+
+
+def test_keyword_only_search_uses_shared_idf(tmp_path):
+    retriever, _ = _retriever(tmp_path)
+    # Tanpa embedding (API mati): skor BM25 antar shard dihitung dengan statistik korpus gabungan
+    docs = retriever.hybrid_search("change negative thinking, free community support", k=3, embedding=None)
+
+    assert [doc.metadata["shard"] for doc in docs] == [FAQ_SHARD, "resources"]
+    scores = [doc.metadata["bm25_score"] for doc in docs]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,35 @@
+# tests/test_pdf_processing.py
+# Upload PDF: spool ke file sementara dengan batas ukuran, worker ekstraksi dimulai dengan "spawn"
+
+import io
+import os
+
+import pytest
+
+import mental_health_processor
+from mental_health_processor import spool_to_tempfile
+
+
+def test_spool_writes_stream_to_tempfile():
+    path = spool_to_tempfile(io.BytesIO(b"%PDF-1.4 isi"), max_bytes=1024)
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 isi"
+    finally:
+        os.remove(path)
+
+
+@pytest.mark.parametrize("max_bytes, shown", [(512 * 1024, "512.0 KB"), (int(2.5 * 1024 * 1024), "2.5 MB")])
+def test_spool_limit_message_shows_readable_size(max_bytes, shown):
+    with pytest.raises(ValueError, match=f"batas {shown}"):
+        spool_to_tempfile(io.BytesIO(b"x" * (max_bytes + 1)), max_bytes=max_bytes)
+
+
+def test_page_pool_uses_spawn(monkeypatch):
+    monkeypatch.setattr(mental_health_processor, "_page_pool", None)
+    pool = mental_health_processor._get_page_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+        assert pool.submit(os.getpid).result(timeout=60) != os.getpid()
+    finally:
+        pool.shutdown()
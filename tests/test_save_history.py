@@ -0,0 +1,71 @@
+# tests/test_save_history.py
+# ChatHistoryStore: append non-blocking, baca per sesi, append_messages inkremental, retensi
+
+import time
+
+import pytest
+
+from tools.save_history import ChatHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "chat_history.sqlite"), flush_interval=0.05)
+    yield store
+    store.close()
+
+
+def test_append_and_get_session(store):
+    store.append("a", "user", "halo")
+    store.append("b", "user", "sesi lain")
+    store.append("a", "assistant", "halo juga")
+
+    assert [m["content"] for m in store.get_session("a")] == ["halo", "halo juga"]
+    assert [m["content"] for m in store.get_session("a", limit=1)] == ["halo juga"]
+    assert {s["session_id"]: s["messages"] for s in store.list_sessions()} == {"a": 2, "b": 1}
+
+
+def test_append_messages_only_saves_new_messages(store):
+    messages = [{"role": "user", "content": "satu"}]
+    store.append_messages("s", messages)
+    messages.append({"role": "assistant", "content": "dua"})
+    store.append_messages("s", messages)
+    store.append_messages("s", messages)
+
+    assert [m["content"] for m in store.get_session("s")] == ["satu", "dua"]
+
+
+def test_append_messages_past_trim(store):
+    # Seperti main.py: daftar di session_state dipangkas ke N pesan terakhir setiap giliran
+    max_messages, messages = 5, []
+    for i in range(12):
+        messages.append({"role": "user", "content": f"pesan {i}"})
+        messages = messages[-max_messages:]
+        store.append_messages("s", messages)
+
+    assert [m["content"] for m in store.get_session("s")] == [f"pesan {i}" for i in range(12)]
+
+
+def test_append_messages_after_list_replaced(store):
+    store.append_messages("s", [{"role": "user", "content": "lama"}])
+    # Riwayat dihapus: daftar baru yang lebih pendek tetap tersimpan seluruhnya, tanpa duplikat
+    store.append_messages("s", [{"role": "assistant", "content": "baru"}])
+
+    assert [m["content"] for m in store.get_session("s")] == ["lama", "baru"]
+
+
+def test_compact_removes_old_messages(store):
+    store.append("s", "user", "lama", ts=time.time() - 40 * 86400)
+    store.append("s", "user", "baru")
+
+    assert store.compact(retention_days=30) == 1
+    assert [m["content"] for m in store.get_session("s")] == ["baru"]
+
+
+def test_delete_session_removes_queued_and_saved_messages(store):
+    store.append_messages("a", [{"role": "user", "content": "rahasia"}])
+    store.append("b", "user", "sesi lain")
+
+    assert store.delete_session("a") == 1
+    assert store.get_session("a") == []
+    assert [m["content"] for m in store.get_session("b")] == ["sesi lain"]
@@ -0,0 +1,22 @@
+# tests/test_tracing.py
+# Trace yang selesai benar-benar tercetak sebagai satu baris JSON (bukan dibuang logger tanpa handler)
+
+import io
+import json
+
+import tracing
+
+
+def test_finished_trace_is_logged_as_json(monkeypatch):
+    assert tracing.logger.handlers, "TRACE_LOG aktif secara default: logger harus punya handler"
+    stream = io.StringIO()
+    monkeypatch.setattr(tracing.logger.handlers[0], "stream", stream)
+
+    with tracing.start_trace("chat_turn", query_chars=12):
+        with tracing.span("faiss_search", k=3):
+            tracing.set_attributes(hits=2)
+
+    record = json.loads(stream.getvalue().strip().splitlines()[-1])
+    assert record["event"] == "trace" and record["name"] == "chat_turn"
+    assert record["attributes"] == {"query_chars": 12}
+    assert [(s["name"], s["attributes"]) for s in record["spans"]] == [("faiss_search", {"k": 3, "hits": 2})]
@@ -0,0 +1,40 @@
+# tokens.py
+# Penghitung token (tiktoken) untuk anggaran prompt; perkiraan, karena tokenizer Gemini berbeda
+
+from functools import lru_cache
+
+import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        # File BPE tiktoken diunduh saat pertama dipakai; tanpa jaringan pakai perkiraan kasar
+        print(f"⚠️ tiktoken tidak tersedia ({str(e)}), memakai perkiraan 4 karakter per token")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Potong teks ke max_tokens (dari awal, atau dari akhir jika keep_end)"""
+    encoding = _get_encoding()
+    if encoding is None:
+        max_chars = max_tokens * 4
+        return text[-max_chars:] if keep_end else text[:max_chars]
+    token_ids = encoding.encode(text, disallowed_special=())
+    if len(token_ids) <= max_tokens:
+        return text
+    token_ids = token_ids[-max_tokens:] if keep_end else token_ids[:max_tokens]
+    return encoding.decode(token_ids)
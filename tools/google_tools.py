@@ -0,0 +1,229 @@
+# tools/google_tools.py
+# Fallback pencarian web: provider bisa diganti (Google / palsu untuk tes), cache TTL, penggabungan
+# query identik yang berjalan bersamaan, batas waktu keras, rate limit, dan circuit breaker
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Protocol
+
+import tracing
+from semantic_cache import normalize_query
+from tools.translate_tools import RateLimiter
+
+NUM_RESULTS = int(os.getenv("WEB_SEARCH_RESULTS", "5"))
+SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_PROVIDER_TIMEOUT", "6"))
+SEARCH_TTL_SECONDS = int(os.getenv("WEB_SEARCH_TTL_SECONDS", "3600"))
+SEARCH_RATE_PER_SECOND = float(os.getenv("WEB_SEARCH_RATE_PER_SECOND", "1"))
+
+
+class SearchProvider(Protocol):
+    name: str
+
+    def search(self, query: str, num_results: int) -> List[str]:
+        ...
+
+
+class GoogleSearchProvider:
+    name = "google"
+
+    def __init__(self, lang: str = "id", request_timeout: float = SEARCH_TIMEOUT):
+        self.lang = lang
+        self.request_timeout = request_timeout
+
+    def search(self, query: str, num_results: int) -> List[str]:
+        from googlesearch import search
+        return list(search(query, num_results=num_results, lang=self.lang, timeout=self.request_timeout))
+
+
+class FakeSearchProvider:
+    """Provider lokal tanpa jaringan untuk tes/benchmark"""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def search(self, query: str, num_results: int) -> List[str]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("fake search failure")
+        return [f"https://example.org/{i + 1}" for i in range(num_results)]
+
+
+class CircuitBreaker:
+    """Setelah `failure_threshold` kegagalan beruntun, tolak permintaan selama `reset_timeout` detik,
+    lalu izinkan satu percobaan (half-open) sebelum menutup kembali"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class WebSearchService:
+    def __init__(self, provider: Optional[SearchProvider] = None, num_results: int = NUM_RESULTS,
+                 timeout: float = SEARCH_TIMEOUT, ttl_seconds: int = SEARCH_TTL_SECONDS,
+                 max_entries: int = 512, rate_per_second: float = SEARCH_RATE_PER_SECOND,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.provider = provider or GoogleSearchProvider()
+        self.num_results = num_results
+        self.timeout = timeout
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.breaker = breaker or CircuitBreaker()
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # kunci -> (waktu, url)
+        self._inflight: Dict[str, Future] = {}
+        # Thread yang macet melewati timeout ditinggalkan; pool kecil membatasi jumlahnya
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web-search")
+
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "timeouts": 0, "errors": 0, "rejected": 0}
+
+    def search(self, query: str) -> Optional[List[str]]:
+        """Daftar URL; None jika gagal, timeout, atau circuit breaker sedang terbuka"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.time() - entry[0] <= self.ttl_seconds:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                tracing.increment("web_search_cache", result="hit")
+                return list(entry[1])
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                if not self.breaker.allow():
+                    self.stats["rejected"] += 1
+                    tracing.increment("web_search_cache", result="circuit_open")
+                    return None
+                future = self._inflight[key] = self._executor.submit(self._fetch, query)
+                self.stats["misses"] += 1
+                tracing.increment("web_search_cache", result="miss")
+            else:
+                # Query identik sedang dicari: tunggu hasil yang sama, jangan kirim permintaan baru
+                self.stats["coalesced"] += 1
+                tracing.increment("web_search_cache", result="coalesced")
+
+        try:
+            urls = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            urls = None
+            if leader:
+                self._record_failure("timeouts")
+                print(f"⏱️ Pencarian web melewati batas {self.timeout} detik")
+        except Exception as e:
+            urls = None
+            if leader:
+                self._record_failure("errors")
+                print(f"❌ Pencarian web gagal: {str(e)}")
+        else:
+            if leader:
+                self.breaker.record_success()
+                self._store(key, urls)
+        finally:
+            if leader:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        return list(urls) if urls is not None else None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "size": len(self._cache), "circuit": self.breaker.state,
+                    "provider": self.provider.name}
+
+    def _fetch(self, query: str) -> List[str]:
+        self.rate_limiter.acquire()
+        return self.provider.search(query, self.num_results)
+
+    def _record_failure(self, stat: str) -> None:
+        self.breaker.record_failure()
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _store(self, key: str, urls: List[str]) -> None:
+        with self._lock:
+            self._cache[key] = (time.time(), list(urls))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+
+_service: Optional[WebSearchService] = None
+_service_lock = threading.Lock()
+
+
+def get_web_search_service() -> WebSearchService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WebSearchService()
+        return _service
+
+
+def set_search_provider(provider: SearchProvider, **kwargs) -> WebSearchService:
+    """Ganti provider (mis. FakeSearchProvider untuk tes); cache & breaker ikut diatur ulang"""
+    global _service
+    with _service_lock:
+        _service = WebSearchService(provider=provider, **kwargs)
+        return _service
+
+
+def format_search_results(query: str, urls: List[str]) -> str:
+    if not urls:
+        return f"Maaf, saya tidak dapat menemukan hasil yang relevan di Google untuk '{query}'."
+    url_list = "\n".join([f"{i+1}. {url}" for i, url in enumerate(urls)])
+    return (
+        f"Tentu, berikut adalah {len(urls)} hasil pencarian teratas untuk '{query}':\n"
+        f"{url_list}\n\n"
+        "**Penting**: Harap evaluasi sendiri kredibilitas dan keakuratan informasi dari situs-situs tersebut."
+    )
+
+
+@tracing.traced("web_search")
+def get_google_search_results(query: str) -> str:
+    urls = get_web_search_service().search(query)
+    if urls is None:
+        return "Maaf, pencarian internet sedang lambat atau tidak tersedia. Silakan coba lagi sebentar lagi."
+    return format_search_results(query, urls)
@@ -1,13 +1,192 @@
 # mental_health_chatbot/tools/save_history_tool.py
-import json
-from datetime import datetime
+# Riwayat chat inkremental di SQLite (WAL): giliran diantrikan lalu ditulis per batch oleh thread
+# latar belakang, sehingga menyimpan tidak pernah memblokir giliran chat
 
-def save_chat_history(messages):
+import os
+import time
+import uuid
+import queue
+import atexit
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_HISTORY_PATH = "data/chat_history.sqlite"
+FLUSH_INTERVAL = 1.0          # detik maksimum sebuah giliran menunggu di antrean
+WRITE_BATCH_SIZE = 100
+RETENTION_DAYS = int(os.getenv("CHAT_HISTORY_RETENTION_DAYS", "30"))
+
+_FLUSH = object()
+_STOP = object()
+
+
+class ChatHistoryStore:
+    """Penyimpanan riwayat per sesi; append() non-blocking, dibaca lewat get_session()"""
+
+    def __init__(self, db_path: str = DEFAULT_HISTORY_PATH, flush_interval: float = FLUSH_INTERVAL,
+                 batch_size: int = WRITE_BATCH_SIZE):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._last_saved_ids: Dict[str, str] = {}
+        self._saved_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="chat-history-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, session_id: str, role: str, content: str, ts: Optional[float] = None) -> None:
+        self._queue.put((session_id, ts or time.time(), role, content))
+
+    def append_messages(self, session_id: str, messages: List[Dict]) -> None:
+        """Tambahkan hanya pesan yang belum pernah disimpan untuk sesi ini. Pesan diberi "id" stabil
+        (dict milik pemanggil), karena posisi di daftar bergeser saat daftar dipangkas dari depan."""
+        for msg in messages:
+            msg.setdefault("id", uuid.uuid4().hex)
+        with self._saved_lock:
+            last_id = self._last_saved_ids.get(session_id)
+            # Pesan terakhir yang tersimpan sudah terpangkas (atau daftar baru): semua pesan belum tersimpan
+            start = next((i + 1 for i in range(len(messages) - 1, -1, -1) if messages[i]["id"] == last_id), 0)
+            new_messages = messages[start:]
+            if messages:
+                self._last_saved_ids[session_id] = messages[-1]["id"]
+        for msg in new_messages:
+            self.append(session_id, msg.get("role", ""), msg.get("content", ""))
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Tunggu sampai semua giliran di antrean tertulis ke disk"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def get_session(self, session_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """Riwayat satu sesi urut waktu; `limit` mengambil N giliran terakhir"""
+        self.flush()
+        query = "SELECT ts, role, content FROM messages WHERE session_id = ? ORDER BY id DESC"
+        params: Tuple = (session_id,)
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._read_lock:
+            rows = self._read_conn.execute(query, params).fetchall()
+        return [{"ts": ts, "role": role, "content": content} for ts, role, content in reversed(rows)]
+
+    def list_sessions(self) -> List[Dict]:
+        self.flush()
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT session_id, COUNT(*), MIN(ts), MAX(ts) FROM messages GROUP BY session_id ORDER BY MAX(ts) DESC"
+            ).fetchall()
+        return [{"session_id": s, "messages": n, "first_ts": first, "last_ts": last} for s, n, first, last in rows]
+
+    def delete_session(self, session_id: str) -> int:
+        """Hapus seluruh riwayat satu sesi dari disk (permintaan pengguna); kembalikan jumlah baris"""
+        self.flush()  # giliran yang masih di antrean ikut terhapus, tidak tertulis setelahnya
+        with self._saved_lock:
+            self._last_saved_ids.pop(session_id, None)
+        with self._read_lock:
+            with self._read_conn:
+                return self._read_conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,)).rowcount
+
+    def compact(self, retention_days: int = RETENTION_DAYS, vacuum: bool = False) -> int:
+        """Hapus giliran yang lebih tua dari masa retensi; kembalikan jumlah baris yang dihapus"""
+        self.flush()
+        cutoff = time.time() - retention_days * 86400
+        with self._read_lock:
+            with self._read_conn:
+                deleted = self._read_conn.execute("DELETE FROM messages WHERE ts < ?", (cutoff,)).rowcount
+            if vacuum:
+                self._read_conn.execute("VACUUM")
+        if deleted:
+            print(f"✅ {deleted} pesan riwayat lama dihapus (retensi {retention_days} hari)")
+        return deleted
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=5.0)
+        with self._read_lock:
+            self._read_conn.close()
+
+    # ---------- internal ----------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                ts REAL NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages (ts)")
+        return conn
+
+    def _writer_loop(self) -> None:
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch, waiters = [], []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            # Kumpulkan giliran yang datang berdekatan menjadi satu transaksi
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, tuple) and item[0] is _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO messages (session_id, ts, role, content) VALUES (?, ?, ?, ?)", batch
+                        )
+                except sqlite3.Error as e:
+                    print(f"❌ Gagal menyimpan riwayat chat: {str(e)}")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+
+_default_store: Optional[ChatHistoryStore] = None
+_default_lock = threading.Lock()
+
+
+def get_history_store() -> ChatHistoryStore:
+    """Satu store bersama per proses (satu thread penulis)"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ChatHistoryStore()
+            atexit.register(_default_store.close)
+            # Kompaksi retensi sekali per proses, di luar jalur request
+            threading.Thread(target=_default_store.compact, name="chat-history-compact", daemon=True).start()
+        return _default_store
+
+
+def save_chat_history(messages, session_id: str = "default"):
+    """Kompatibilitas: dulu menyalin seluruh daftar ke file JSON baru, kini append inkremental"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"chat_history_{timestamp}.json"
-        
-        with open(filename, "w") as f:
-            json.dump(messages, f, indent=2)
+        get_history_store().append_messages(session_id, messages)
     except Exception as e:
         print(f"Error saving chat history: {str(e)}")
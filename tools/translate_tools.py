@@ -1,31 +1,189 @@
-from deep_translator import GoogleTranslator
-from time import sleep
+# tools/translate_tools.py
+# Terjemahan batch: dedupe input, cache disk per (teks, bahasa tujuan), miss diterjemahkan paralel
+# di bawah rate limiter, backoff eksponensial hanya saat gagal. Backend bisa diganti (stub untuk tes).
+
+import os
+import time
 import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Protocol
+
+from kv_cache import KeyValueCache
+import tracing
+
+DEFAULT_CACHE_PATH = "data/translation_cache.sqlite"
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "4"))
+TRANSLATE_RATE_PER_SECOND = float(os.getenv("TRANSLATE_RATE_PER_SECOND", "5"))
+
+
+class TranslationBackend(Protocol):
+    name: str
+
+    def translate(self, text: str, target: str) -> str:
+        ...
+
+
+class GoogleTranslateBackend:
+    """deep_translator.GoogleTranslator; satu instance per (thread, bahasa) alih-alih per panggilan"""
+
+    name = "google"
+
+    def __init__(self, source: str = "auto"):
+        self.source = source
+        self._local = threading.local()
+
+    def translate(self, text: str, target: str) -> str:
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        if target not in translators:
+            from deep_translator import GoogleTranslator
+            translators[target] = GoogleTranslator(source=self.source, target=target)
+        return translators[target].translate(text)
+
+
+class StubTranslateBackend:
+    """Backend lokal tanpa jaringan untuk tes/benchmark"""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.calls = 0
+
+    def translate(self, text: str, target: str) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError("stub translation failure")
+        return f"[{target}] {text}"
+
+
+class RateLimiter:
+    """Token bucket: rata-rata `rate` permintaan per detik dengan lonjakan maksimal `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
 
 class TranslationService:
     MAX_RETRIES = 3
     BASE_DELAY = 1.5
 
+    def __init__(self, backend: Optional[TranslationBackend] = None,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 max_workers: int = TRANSLATE_WORKERS,
+                 rate_per_second: float = TRANSLATE_RATE_PER_SECOND,
+                 max_memory_items: int = 2048):
+        self.backend = backend or GoogleTranslateBackend()
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_per_second)
+
+        self._cache = KeyValueCache(cache_path, table="translations", column="translated",
+                                    max_memory_items=max_memory_items, label="cache terjemahan")
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+
+        self.stats = {"failures": 0}
+
+    # API lama (statis) tetap didukung: didelegasikan ke service bersama per proses
     @staticmethod
     def translate_to_indonesian(text: str) -> str:
-        return TranslationService._translate(text, target='id')
+        return get_translation_service().translate(text, target='id')
 
     @staticmethod
     def translate_to_english(text: str) -> str:
-        return TranslationService._translate(text, target='en')
+        return get_translation_service().translate(text, target='en')
 
-    @staticmethod
-    def _translate(text: str, target: str) -> str:
-        if not text:
-            return ""
-        
-        for attempt in range(TranslationService.MAX_RETRIES):
+    def translate(self, text: str, target: str) -> str:
+        return self.translate_batch([text], target)[0]
+
+    def translate_batch(self, texts: List[str], target: str) -> List[str]:
+        """Terjemahkan banyak teks sekaligus; teks yang gagal dikembalikan apa adanya (tidak di-cache)"""
+        results = self.try_translate_batch(texts, target)
+        return [text if result is None else result for text, result in zip(texts, results)]
+
+    def try_translate_batch(self, texts: List[str], target: str) -> List[Optional[str]]:
+        """Seperti translate_batch, tetapi teks yang gagal diterjemahkan menjadi None. Terjemahan yang
+        kebetulan sama dengan teks asli (nama, istilah) tetap dianggap berhasil"""
+        with tracing.span("translate", target=target, texts=len(texts)) as translate_span:
+            keys = [self._key(text, target) for text in texts]
+            found = self._cache.get_many(keys)
+
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if text and key not in found and key not in missing:
+                    missing[key] = text
+
+            translate_span["attributes"]["cache_misses"] = len(missing)
+            tracing.increment("translation_cache", sum(1 for key in keys if key in found), result="hit")
+            tracing.increment("translation_cache", len(missing), result="miss")
+            if missing:
+                # Satu salinan context per tugas: Context yang sama tidak bisa dimasuki dua thread sekaligus
+                futures = [self._executor.submit(tracing.wrap_context(self._translate_with_backoff), text, target)
+                           for text in missing.values()]
+                results = [future.result() for future in futures]
+                translated = {key: result for key, result in zip(missing.keys(), results) if result is not None}
+                self._cache.put_many(translated)
+                found.update(translated)
+
+        return [found.get(key) if text else "" for key, text in zip(keys, texts)]
+
+    def get_stats(self) -> Dict[str, int]:
+        cache = self._cache.get_stats()
+        with self._lock:
+            failures = self.stats["failures"]
+        return {"hits": cache["memory_hits"] + cache["disk_hits"], "misses": cache["misses"],
+                "failures": failures, "memory_size": cache["memory_size"]}
+
+    # ---------- internal ----------
+    def _translate_with_backoff(self, text: str, target: str) -> Optional[str]:
+        for attempt in range(self.MAX_RETRIES):
+            self.rate_limiter.acquire()
             try:
-                # Translate using Google Translator
-                translated_text = GoogleTranslator(target=target).translate(text)
-                sleep(random.uniform(TranslationService.BASE_DELAY, TranslationService.BASE_DELAY * 2))
-                return translated_text
+                return self.backend.translate(text, target)
             except Exception as e:
-                print(f"Translation failed on attempt {attempt + 1}: {e}")
-                sleep(TranslationService.BASE_DELAY)
-        return "Translation failed after multiple attempts."
+                print(f"❌ Terjemahan gagal (percobaan {attempt + 1}): {e}")
+                if attempt < self.MAX_RETRIES - 1:
+                    time.sleep(self.BASE_DELAY * (2 ** attempt) + random.uniform(0, 0.5))
+        with self._lock:
+            self.stats["failures"] += 1
+        return None
+
+    def _key(self, text: str, target: str) -> str:
+        return hashlib.sha256(f"{target}\x00{text}".encode("utf-8")).hexdigest()
+
+
+_default_service: Optional[TranslationService] = None
+_default_lock = threading.Lock()
+
+
+def get_translation_service() -> TranslationService:
+    """Satu TranslationService bersama per proses (cache & rate limiter dipakai bersama)"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = TranslationService()
+        return _default_service
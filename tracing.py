@@ -0,0 +1,250 @@
+# tracing.py
+# Instrumentasi ringan: span per tahap (context manager / decorator), counter, log JSON terstruktur,
+# ekspor format teks Prometheus / JSON, dan riwayat N timeline request terakhir untuk panel debug
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("mental_health_chatbot.tracing")
+
+MAX_RECENT_TRACES = int(os.getenv("TRACE_HISTORY_SIZE", "50"))
+LOG_TRACES = os.getenv("TRACE_LOG", "true").lower() == "true"
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _configure_logger() -> None:
+    """Satu baris JSON per trace ke stderr. Tanpa handler, logger.info dibuang (level root = WARNING);
+    handler yang sudah dipasang aplikasi (mis. lewat logging.config) dibiarkan"""
+    if not LOG_TRACES or logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))  # pesan sudah berupa JSON
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+_configure_logger()
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("current_span", default=None)
+
+_lock = threading.Lock()
+_recent_traces: deque = deque(maxlen=MAX_RECENT_TRACES)
+_span_metrics: Dict[str, Dict[str, Any]] = {}
+_counters: Dict[tuple, float] = {}
+
+
+class Trace:
+    """Satu timeline request (mis. satu giliran chat) berisi span-span tahapnya"""
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attributes = dict(attributes)
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def offset(self) -> float:
+        return time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Mulai timeline baru; span di dalamnya (termasuk di thread lain via copy_context) ikut tercatat"""
+    trace = Trace(name, **attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.duration = trace.offset()
+        _current_trace.reset(token)
+        _observe(name, trace.duration, error=False)
+        with _lock:
+            _recent_traces.append(trace)
+        if LOG_TRACES:
+            logger.info(json.dumps({"event": "trace", **trace.to_dict()}, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Catat durasi satu tahap; atribut bisa ditambah selama span berjalan lewat set_attributes()"""
+    trace = _current_trace.get()
+    record = {"name": name, "start": trace.offset() if trace else 0.0, "duration": None,
+              "attributes": dict(attributes), "error": None}
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - start
+        _current_span.reset(token)
+        _observe(name, record["duration"], error=record["error"] is not None)
+        if trace is not None:
+            trace.add_span(record)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: bungkus seluruh fungsi dalam satu span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_attributes(**attributes) -> None:
+    """Tambahkan atribut ke span aktif (atau ke trace jika tidak ada span)"""
+    record = _current_span.get()
+    if record is not None:
+        record["attributes"].update(attributes)
+        return
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def increment(name: str, value: float = 1.0, **labels) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def wrap_context(func):
+    """Bawa trace/span aktif ke thread lain (run_in_executor tidak menyalin contextvars)"""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, func)
+
+
+def _observe(name: str, seconds: float, error: bool) -> None:
+    with _lock:
+        metric = _span_metrics.setdefault(name, {
+            "count": 0, "errors": 0, "sum": 0.0, "buckets": [0] * len(HISTOGRAM_BUCKETS)
+        })
+        metric["count"] += 1
+        metric["sum"] += seconds
+        metric["errors"] += int(error)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                metric["buckets"][i] += 1
+
+
+# ---------- ekspor ----------
+def get_recent_traces(limit: int = MAX_RECENT_TRACES) -> List[Dict[str, Any]]:
+    with _lock:
+        traces = list(_recent_traces)[-limit:]
+    return [trace.to_dict() for trace in reversed(traces)]
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "spans": {name: {k: (list(v) if isinstance(v, list) else v) for k, v in m.items()}
+                      for name, m in _span_metrics.items()},
+            "counters": {name + (json.dumps(dict(labels)) if labels else ""): value
+                         for (name, labels), value in _counters.items()},
+        }
+
+
+def _prom_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def render_prometheus() -> str:
+    """Metrik dalam format teks eksposisi Prometheus"""
+    lines = ["# TYPE chatbot_stage_seconds histogram"]
+    with _lock:
+        for name, metric in sorted(_span_metrics.items()):
+            for bound, count in zip(HISTOGRAM_BUCKETS, metric["buckets"]):
+                lines.append(f'chatbot_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'chatbot_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {metric["count"]}')
+            lines.append(f'chatbot_stage_seconds_sum{{stage="{name}"}} {metric["sum"]:.6f}')
+            lines.append(f'chatbot_stage_seconds_count{{stage="{name}"}} {metric["count"]}')
+            lines.append(f'chatbot_stage_errors_total{{stage="{name}"}} {metric["errors"]}')
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"chatbot_{name}_total{_prom_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def dump_json(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"metrics": get_metrics(), "traces": get_recent_traces()}, f, indent=2, default=str)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body, content_type = render_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.startswith("/traces"):
+            body, content_type = json.dumps(get_recent_traces(), default=str), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Endpoint /metrics (Prometheus) dan /traces (JSON); aktif jika METRICS_PORT diset"""
+    global _server
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:
+                print(f"❌ Gagal membuka endpoint metrik di port {port}: {str(e)}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server